@@ -1,10 +1,10 @@
-from typing import AsyncGenerator, Dict, Any, List
+from typing import AsyncGenerator, Dict, List
 import json
 import re
 from langchain.llms.base import BaseLLM
 from core.logger import setup_logger
 from core.constants import PromptConstants
-from retrieval_service.app.core.enums import DocSource
+from core.exceptions import RetrievalOverloadedError
 from utils.retrieval_manager import PipelineManager
 
 class QAAgent:
@@ -153,9 +153,28 @@ class QAAgent:
                     "content": sources
                 }) + "\n"
             
+            # Answers only depend on the retrieved context without chat history
+            cache_id = results.get('cache_id') if not chat_history else None
+            cached_answer = await self.pipeline_manager.get_cached_answer(
+                self.index_name,
+                cache_id,
+                self.model_name
+            )
+            if cached_answer:
+                self.logger.info("Serving cached answer")
+                yield json.dumps({
+                    "type": "markdown",
+                    "content": cached_answer
+                }) + "\n"
+                yield json.dumps({
+                    "type": "end"
+                }) + "\n"
+                return
+            
             prompt = self._create_markdown_prompt(query, context, chat_history)
             
             current_chunk = ""
+            answer = ""
             try:
                 async for chunk in self.llm.astream(prompt):
                     # Extract token from chunk based on its type
@@ -175,6 +194,7 @@ class QAAgent:
                         continue
                         
                     current_chunk += token
+                    answer += token
                     
                     # Only yield complete sentences or markdown blocks
                     if any(token.endswith(p) for p in ['.', '!', '?', '\n']) and current_chunk.strip():
@@ -191,6 +211,13 @@ class QAAgent:
                         "content": current_chunk.strip()
                     }) + "\n"
 
+                await self.pipeline_manager.cache_answer(
+                    self.index_name,
+                    cache_id,
+                    self.model_name,
+                    answer.strip()
+                )
+
                 # Signal completion
                 yield json.dumps({
                     "type": "end"
@@ -203,6 +230,9 @@ class QAAgent:
                     "content": f"Streaming error: {str(e)}"
                 }) + "\n"
             
+        except RetrievalOverloadedError:
+            # Surfaced to the client as RESOURCE_EXHAUSTED
+            raise
         except Exception as e:
             self.logger.error(f"Error in answer_query_stream: {str(e)}")
             yield json.dumps({
@@ -11,6 +11,16 @@ class Settings(BaseSettings):
     GRPC_PORT: int = 50051
     MAX_WORKERS: int = 10
     
+    # Retrieval Settings
+    # Concurrent queries are searched together; a max batch of 1 disables batching
+    RETRIEVAL_BATCH_WINDOW_MS: float = 5.0
+    RETRIEVAL_MAX_BATCH: int = 16
+    # Searches run on their own threads; beyond the queue size requests are rejected
+    RETRIEVAL_WORKERS: int = 4
+    RETRIEVAL_QUEUE_SIZE: int = 32
+    # Worker processes sharing memory-mapped indexes; 0 searches on threads in-process
+    RETRIEVAL_PROCESSES: int = 0
+    
     # Model Settings
     DEFAULT_MODEL_NAME: str = "llama3.1"
     ENABLED_MODELS: str = '["llama2", "llama3.1"]'
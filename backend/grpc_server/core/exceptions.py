@@ -16,4 +16,8 @@ class ModelInitializationError(Exception):
 
 class SearchError(Exception):
     """Raised when document search fails."""
-    pass 
\ No newline at end of file
+    pass 
+
+class RetrievalOverloadedError(Exception):
+    """Raised when too many document searches are already queued."""
+    pass
\ No newline at end of file
@@ -0,0 +1,6 @@
+from .lru import LRUCache
+from .embedding_cache import EmbeddingCache
+from .result_cache import ResultCache
+from .semantic_cache import SemanticCache
+
+__all__ = ['LRUCache', 'EmbeddingCache', 'ResultCache', 'SemanticCache']
\ No newline at end of file
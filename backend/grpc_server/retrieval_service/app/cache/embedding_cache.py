@@ -0,0 +1,188 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+from ..utils.logger import logger
+from .lru import LRUCache
+
+class EmbeddingCache:
+    """Query-embedding cache with an in-memory LRU over a sqlite store.
+
+    Entries are keyed by a hash of the model name and query text, so hot
+    queries skip model inference even right after a restart. Values are
+    stored as bytes produced by ``serialize`` and read back with
+    ``deserialize``. The store keeps at most ``max_disk_entries`` rows;
+    every ``PRUNE_EVERY`` writes the least recently used rows beyond that
+    are deleted.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(
+        self,
+        model_name: str,
+        serialize: Callable[[Any], bytes],
+        deserialize: Callable[[bytes], Any],
+        path: Optional[Union[str, Path]] = None,
+        max_entries: int = 10000,
+        max_disk_entries: Optional[int] = None
+    ):
+        self.model_name = model_name
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.max_disk_entries = max_disk_entries
+
+        self.memory = LRUCache(max_entries=max_entries, sizeof=lambda value: 1)
+
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = self._open(path) if path else None
+        if self._db is not None:
+            self._prune()
+
+    @staticmethod
+    def _open(path: Union[str, Path]) -> Optional[sqlite3.Connection]:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+            # WAL lets several server processes read while one writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL DEFAULT 0)"
+            )
+            # Stores written before rows were evicted lack the access time
+            columns = [row[1] for row in db.execute("PRAGMA table_info(embeddings)")]
+            if "accessed" not in columns:
+                db.execute("ALTER TABLE embeddings ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+            db.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache running without disk store: {str(e)}")
+            return None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[Any]:
+        key = self.key(text)
+
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        if self._db is not None:
+            try:
+                with self._lock:
+                    row = self._db.execute(
+                        "SELECT value FROM embeddings WHERE key = ?",
+                        (key,)
+                    ).fetchone()
+                    if row is not None and self.max_disk_entries:
+                        # Hot keys are served from memory, so this runs once per load
+                        self._db.execute(
+                            "UPDATE embeddings SET accessed = ? WHERE key = ?",
+                            (time.time(), key)
+                        )
+                        self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache read error: {str(e)}")
+                row = None
+
+            if row is not None:
+                value = self.deserialize(row[0])
+                self.memory.put(key, value)
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, text: str, value: Any) -> None:
+        key = self.key(text)
+        self.memory.put(key, value)
+
+        if self._db is None:
+            return
+
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, value, accessed) VALUES (?, ?, ?)",
+                    (key, sqlite3.Binary(self.serialize(value)), time.time())
+                )
+                self._db.commit()
+                self._writes += 1
+                prune = self._writes % self.PRUNE_EVERY == 0
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache write error: {str(e)}")
+            return
+
+        if prune:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete the least recently used rows beyond ``max_disk_entries``."""
+        if not self.max_disk_entries:
+            return
+
+        try:
+            with self._lock:
+                count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                excess = count - self.max_disk_entries
+                if excess <= 0:
+                    return
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY accessed LIMIT ?)",
+                    (excess,)
+                )
+                self._db.commit()
+            logger.info(f"Evicted {excess} rows from the embedding cache store")
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache prune error: {str(e)}")
+
+    def get_or_compute(self, text: str, compute: Callable[[str], Any]) -> Any:
+        """Return the cached value for ``text``, computing it on a miss."""
+        value = self.get(text)
+        if value is None:
+            value = compute(text)
+            self.put(text, value)
+        return value
+
+    def get_or_compute_batch(
+        self,
+        texts: List[str],
+        compute: Callable[[List[str]], List[Any]]
+    ) -> List[Any]:
+        """Batch version of :meth:`get_or_compute`; misses are computed in one call."""
+        values = [self.get(text) for text in texts]
+
+        missing = list(dict.fromkeys(
+            text for text, value in zip(texts, values) if value is None
+        ))
+        if missing:
+            computed = dict(zip(missing, compute(missing)))
+            for text, value in computed.items():
+                self.put(text, value)
+            values = [
+                computed[text] if value is None else value
+                for text, value in zip(texts, values)
+            ]
+
+        return values
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self.memory)
+        }
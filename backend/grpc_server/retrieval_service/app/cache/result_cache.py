@@ -0,0 +1,112 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+from ..core.config import Config
+from ..core.singleton import Singleton
+from ..utils.logger import logger
+from .lru import LRUCache
+
+def normalize_query(query: str) -> str:
+    """Fold case and whitespace so trivially different queries share a key."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+class ResultCache(metaclass=Singleton):
+    """Two-tier cache of ``search_documents`` results.
+
+    Results are keyed by normalized query, source and index version. The
+    first tier is an in-process LRU; the optional second tier is the Redis
+    instance the gateway already uses, shared by every replica. A rebuilt
+    source gets a new index version, so stale entries are never served.
+    """
+
+    PREFIX = "retrieval"
+
+    def __init__(self):
+        self.config = Config()
+        cache_config = self.config.serving_configs["result_cache"]
+
+        self.enabled = cache_config["enabled"]
+        self.ttl = cache_config["ttl_seconds"]
+
+        self.local = LRUCache(
+            max_entries=cache_config["max_entries"],
+            max_bytes=int(cache_config["max_mb"] * 2**20),
+            ttl=self.ttl
+        )
+        self.redis = self._connect(cache_config.get("redis"))
+
+    @staticmethod
+    def _connect(redis_config: Optional[Dict[str, Any]]):
+        """Connect to the shared Redis tier, if configured."""
+        if not redis_config:
+            return None
+
+        try:
+            from redis import Redis
+
+            client = Redis(**redis_config, socket_timeout=0.25)
+            client.ping()
+            logger.info(f"Result cache using Redis at {redis_config['host']}")
+            return client
+        except Exception as e:
+            logger.warning(f"Result cache running without Redis: {str(e)}")
+            return None
+
+    def key(self, source: str, version: str, query: str) -> str:
+        digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.PREFIX}:{source}:{version}:{digest}"
+
+    def get(self, source: str, version: str, query: str) -> Optional[Dict]:
+        """Return a cached result, checking the local tier first."""
+        if not self.enabled:
+            return None
+
+        key = self.key(source, version, query)
+        payload = self.local.get(key)
+
+        if payload is None and self.redis is not None:
+            try:
+                payload = self.redis.get(key)
+            except Exception as e:
+                logger.error(f"Redis get error: {str(e)}")
+
+            if payload is not None:
+                payload = payload.decode("utf-8") if isinstance(payload, bytes) else payload
+                self.local.put(key, payload)
+
+        # Results are stored serialized so callers always get a private copy
+        return json.loads(payload) if payload is not None else None
+
+    def put(self, source: str, version: str, query: str, result: Dict) -> None:
+        if not self.enabled:
+            return
+
+        key = self.key(source, version, query)
+        payload = json.dumps(result)
+        self.local.put(key, payload)
+
+        if self.redis is not None:
+            try:
+                self.redis.set(key, payload, ex=self.ttl)
+            except Exception as e:
+                logger.error(f"Redis set error: {str(e)}")
+
+    def invalidate(self, source: str) -> None:
+        """Drop every cached result of a source."""
+        prefix = f"{self.PREFIX}:{source}:"
+        removed = self.local.discard(lambda key: key.startswith(prefix))
+
+        if self.redis is not None:
+            try:
+                keys = list(self.redis.scan_iter(match=f"{prefix}*", count=500))
+                if keys:
+                    self.redis.delete(*keys)
+                removed += len(keys)
+            except Exception as e:
+                logger.error(f"Redis invalidate error: {str(e)}")
+
+        logger.info(f"Invalidated {removed} cached results for {source}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.local.stats(), "redis": self.redis is not None}
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+import faiss
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..core.config import Config
+from ..core.singleton import Singleton
+from ..utils.logger import logger
+
+class _SourceBucket:
+    """Recent query embeddings of one source and what they resolved to."""
+
+    def __init__(self, dimension: int):
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        # id -> {"version", "result", "answers", "expires_at"}
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.next_id = 0
+
+    def remove(self, entry_id: int) -> None:
+        self.entries.pop(entry_id, None)
+        self.index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+class SemanticCache(metaclass=Singleton):
+    """Per-source cache that matches paraphrased queries by embedding.
+
+    A new query reuses the retrieval result, and optionally the generated
+    answer, of a recent query whose embedding has a cosine similarity of
+    at least ``threshold`` with it.
+    """
+
+    # Neighbours inspected per lookup, to skip stale or expired entries
+    SEARCH_DEPTH = 4
+
+    def __init__(self):
+        self.config = Config()
+        cache_config = self.config.serving_configs["semantic_cache"]
+
+        self.enabled = cache_config["enabled"]
+        self.threshold = cache_config["threshold"]
+        self.max_entries = cache_config["max_entries"]
+        self.ttl = cache_config["ttl_seconds"]
+
+        self._buckets: Dict[str, _SourceBucket] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(
+        self,
+        source: str,
+        version: str,
+        embedding: np.ndarray
+    ) -> Optional[Dict[str, Any]]:
+        """Return ``{"id", "similarity", "result"}`` of the closest match."""
+        if not self.enabled:
+            return None
+
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            bucket = self._buckets.get(source)
+            if bucket is None or bucket.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            depth = min(self.SEARCH_DEPTH, bucket.index.ntotal)
+            scores, ids = bucket.index.search(vector, depth)
+
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+
+                entry = bucket.entries[int(entry_id)]
+                if entry["version"] != version or entry["expires_at"] <= time.monotonic():
+                    bucket.remove(int(entry_id))
+                    continue
+
+                bucket.entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return {
+                    "id": int(entry_id),
+                    "similarity": float(score),
+                    "result": json.loads(entry["result"])
+                }
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        source: str,
+        version: str,
+        embedding: np.ndarray,
+        result: Dict
+    ) -> Optional[int]:
+        """Remember the result of a query; returns the entry id."""
+        if not self.enabled:
+            return None
+
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            bucket = self._buckets.get(source)
+            if bucket is None:
+                bucket = self._buckets[source] = _SourceBucket(vector.shape[1])
+
+            entry_id = bucket.next_id
+            bucket.next_id += 1
+
+            bucket.index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            bucket.entries[entry_id] = {
+                "version": version,
+                "result": json.dumps(result),
+                "answers": {},
+                "expires_at": time.monotonic() + self.ttl
+            }
+
+            while len(bucket.entries) > self.max_entries:
+                bucket.remove(next(iter(bucket.entries)))
+
+            return entry_id
+
+    def get_answer(self, source: str, entry_id: int, model: str) -> Optional[str]:
+        """Return the answer a model generated for a cached entry."""
+        with self._lock:
+            bucket = self._buckets.get(source)
+            entry = bucket.entries.get(entry_id) if bucket else None
+            return entry["answers"].get(model) if entry else None
+
+    def put_answer(self, source: str, entry_id: int, model: str, answer: str) -> None:
+        """Attach a generated answer to a cached entry, if it still exists."""
+        with self._lock:
+            bucket = self._buckets.get(source)
+            entry = bucket.entries.get(entry_id) if bucket else None
+            if entry is not None:
+                entry["answers"][model] = answer
+
+    def invalidate(self, source: str) -> None:
+        """Forget every cached query of a source."""
+        with self._lock:
+            bucket = self._buckets.pop(source, None)
+
+        if bucket is not None:
+            logger.info(f"Invalidated {len(bucket.entries)} semantic cache entries for {source}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": sum(len(bucket.entries) for bucket in self._buckets.values()),
+                "hits": self.hits,
+                "misses": self.misses
+            }
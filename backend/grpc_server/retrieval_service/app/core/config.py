@@ -1,6 +1,7 @@
+import os
 import torch
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .singleton import Singleton
 
 class Config(metaclass=Singleton):
@@ -13,13 +14,29 @@ class Config(metaclass=Singleton):
         self.model_configs = {
             "dense": {
                 "model_name": "BAAI/bge-small-en-v1.5",
-                "device": self.device
+                "device": self.device,
+                # FAISS index-factory string and search-time knobs
+                "index": {
+                    "factory": "Flat",
+                    "ef_search": 64,
+                    "nprobe": 16,
+                    "train_size": 100000,
+                    # float32 | int8 | binary codes for first-stage search
+                    "storage": "float32",
+                    # Keep an fp16 copy to rescore the top k * rescore_factor
+                    "rescore": False,
+                    "rescore_factor": 4
+                },
+                # Per-source index overrides, e.g. {"flutter": {"factory": "HNSW32"}}
+                "source_indexes": {}
             },
             "sparse": {
                 "model_name": "prithivida/Splade_PP_en_v1"
             },
             "reranker": {
-                "model_name": "Xenova/ms-marco-MiniLM-L-6-v2"
+                "model_name": "Xenova/ms-marco-MiniLM-L-6-v2",
+                # (query, passage) pairs per cross-encoder call
+                "batch_size": 64
             }
         }
         
@@ -27,15 +44,113 @@ class Config(metaclass=Singleton):
             "chunk_size": 512,
             "chunk_overlap": 128,
             "request_timeout": 15,
-            "max_retries": 3
+            "max_retries": 3,
+            # Pooled connections of a crawl and limits per host
+            "crawl": {
+                "max_connections": 64,
+                "per_host_concurrency": 8,
+                # Requests per second to one host; 0 disables the limit
+                "per_host_rate": 10.0,
+                # Retries wait a random time up to base * 2 ** attempt,
+                # or as long as a Retry-After header asks, capped at max
+                "backoff_base": 0.5,
+                "backoff_max": 60.0,
+                "user_agent": "OmniDocs-Crawler/1.0"
+            },
+            # Stages of document ingestion, connected by bounded queues
+            "ingestion": {
+                # Items waiting between two stages
+                "queue_size": 64,
+                "chunk_workers": 2,
+                "dense_workers": 1,
+                "sparse_workers": 1,
+                # New chunks per embedding batch
+                "batch_size": 256,
+                # Chunks held in memory before they are written as a segment
+                "segment_chunks": 20000
+            },
+            # None or "zstd"; compressed chunk texts are stored in blocks of chunks
+            "chunk_compression": None,
+            "chunk_block_size": 64
         }
         
         self.scoring_configs = {
             "dense_weight": 0.7,
             "sparse_weight": 0.3,
             "rerank_weight": 0.5,
+            "sparse_candidates": 50,
             "relevance_threshold": 0.6,
-            "term_overlap_threshold": 0.25
+            "term_overlap_threshold": 0.25,
+            # Top fused candidates that are reranked and returned
+            "final_results": 10,
+            # Skip the cross-encoder when dense and sparse agree on the top
+            # candidate and it leads the runner-up by this combined margin
+            "rerank_skip_margin": 0.2,
+            # Default per-request search budget; None searches at full depth
+            "latency_budget_ms": None,
+            # Starting estimate of cross-encoder cost, refined as pairs are scored
+            "rerank_pair_ms": 2.0
+        }
+        
+        self.serving_configs = {
+            # Loaded sources are evicted least-recently-used beyond this budget
+            "memory_budget_mb": 2048,
+            "max_loaded_sources": None,
+            # Map index files read-only instead of copying them into memory
+            "mmap": True,
+            # Threads running the independent stages of a query concurrently
+            "stage_threads": 8,
+            "result_cache": {
+                "enabled": True,
+                "max_entries": 2048,
+                "max_mb": 64,
+                "ttl_seconds": 3600,
+                # Shared second tier, reusing the gateway's Redis settings
+                "redis": {
+                    "host": os.environ["REDIS_HOST"],
+                    "port": int(os.environ.get("REDIS_PORT", 6379)),
+                    "db": int(os.environ.get("REDIS_DB", 0)),
+                    "password": os.environ.get("REDIS_PASSWORD")
+                } if os.environ.get("REDIS_HOST") else None
+            },
+            # Paraphrased queries reuse results above this cosine similarity
+            "semantic_cache": {
+                "enabled": True,
+                "threshold": 0.95,
+                "max_entries": 1024,
+                "ttl_seconds": 3600,
+                # Also reuse LLM answers for queries without chat history
+                "cache_answers": False
+            },
+            # Background merging of the segments left by incremental updates
+            "compaction": {
+                "enabled": True,
+                # Merge runs of at least this many adjacent small segments
+                "merge_factor": 4,
+                "small_segment_rows": 5000,
+                # Rewrite segments once this fraction of their chunks is deleted
+                "max_deleted_ratio": 0.3
+            },
+            # Versions of a source kept on disk for rollback
+            "snapshots": {
+                "keep_versions": 3,
+                # Reject a version that keeps fewer live chunks than this
+                # fraction of the current one, e.g. after a failed crawl
+                "min_live_ratio": 0.5
+            },
+            # Cross-encoder scores per (query, chunk, index version)
+            "rerank_cache": {
+                "enabled": True,
+                "max_entries": 100000
+            },
+            # Query embeddings survive restarts in a sqlite store
+            "embedding_cache": {
+                "enabled": True,
+                "max_entries": 10000,
+                # Rows kept in the sqlite store, shared by the dense and sparse models
+                "max_disk_entries": 200000,
+                "path": "data/query_embeddings.sqlite"
+            }
         }
         
         # Create base data directory
@@ -50,9 +165,22 @@ class Config(metaclass=Singleton):
         data_dir.mkdir(exist_ok=True)
         return data_dir
     
+    def get_index_config(self, source: Optional[str] = None) -> Dict[str, Any]:
+        """Get dense index settings for a source, applying its overrides"""
+        dense = self.model_configs["dense"]
+        index_config = dict(dense["index"])
+        if source:
+            index_config.update(dense["source_indexes"].get(source, {}))
+        return index_config
+    
     def update_config(self, section: str, updates: Dict[str, Any]) -> None:
         """Update configuration settings"""
-        if section in ["model_configs", "processing_configs", "scoring_configs"]:
+        if section in [
+            "model_configs",
+            "processing_configs",
+            "scoring_configs",
+            "serving_configs"
+        ]:
             getattr(self, section).update(updates)
         else:
             raise ValueError(f"Unknown config section: {section}")
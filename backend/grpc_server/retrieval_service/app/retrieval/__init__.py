@@ -1,10 +1,18 @@
 from .base import RetrievalPipeline
+from .registry import SourceRegistry
+from .compaction import SegmentCompactor
+from .query_context import QueryContext
+from .source_index import SourceIndex
 from .embeddings import DenseEmbedder, SparseEmbedder
 from .scoring import HybridSearch, RelevanceChecker, Reranker
 from .processing import URLFetcher, TextChunker
 
 __all__ = [
     'RetrievalPipeline',
+    'SourceRegistry',
+    'SegmentCompactor',
+    'QueryContext',
+    'SourceIndex',
     'DenseEmbedder',
     'SparseEmbedder',
     'HybridSearch',
@@ -1,20 +1,33 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from ..core.config import Config
-from ..core.singleton import Singleton
 from ..core.enums import DocSource
 from .processing import URLFetcher, TextChunker
 from .embeddings import DenseEmbedder, SparseEmbedder
 from .scoring import HybridSearch, RelevanceChecker, Reranker
+from .registry import SourceRegistry
+from .query_context import QueryContext
+from .incremental import PreviousBuild, content_hash
+from .ingestion import ChunkBatch, PageChunks, SegmentWriter, Stage, StagePipeline
+from .compaction import SegmentCompactor
+from .source_index import SourceIndex
+from ..cache import ResultCache, SemanticCache
 from ..storage import DataManager
 from ..utils.logger import logger
-import torch
+from fastembed import SparseEmbedding
+from tqdm import tqdm
+import numpy as np
 
-class RetrievalPipeline(metaclass=Singleton):
-    """Main retrieval pipeline that coordinates all components."""
+class RetrievalPipeline:
+    """Main retrieval pipeline that coordinates all components.
     
-    def __init__(self):
+    A pipeline is cheap to create: models are shared singletons and the
+    source data is held by the ``SourceRegistry``.
+    """
+    
+    def __init__(self, source: Optional[DocSource] = None):
         self.config = Config()
         self.data_manager = DataManager()
+        self.registry = SourceRegistry()
         
         # Initialize components
         self.fetcher = URLFetcher()
@@ -23,52 +36,161 @@ class RetrievalPipeline(metaclass=Singleton):
         self.sparse_embedder = SparseEmbedder()
         self.search = HybridSearch()
         self.relevance_checker = RelevanceChecker()
+        self.result_cache = ResultCache()
+        self.semantic_cache = SemanticCache()
+        self.compactor = SegmentCompactor()
         
         # Current state
-        self.current_source: Optional[DocSource] = None
-        self.chunks: List[str] = []
-        self.chunk_to_url: Dict[str, str] = {}
+        self.current_source: Optional[DocSource] = source
+    
+    @property
+    def index(self) -> SourceIndex:
+        """Index of the current source, loaded on demand."""
+        if not self.current_source:
+            raise ValueError("No documentation source loaded")
+        return self.registry.get(self.current_source)
     
-    def process_documents(self, source: DocSource) -> None:
-        """Process documents for a specific source."""
+    def process_documents(self, source: DocSource, incremental: bool = True) -> None:
+        """Process documents for a specific source.
+        
+        With ``incremental``, the crawl is applied to the current build as
+        a delta. Chunks of modified or removed pages are deleted, new chunks
+        are appended as a small segment, and only text the build has not
+        seen before is embedded. Pages that did not change are not touched.
+        Segments are merged later in the background. A new source, or a
+        change of embedding model, gets a full build instead.
+        
+        Either way the result is committed as a new version of the source.
+        The current version keeps serving until the new one has been
+        validated and activated, and a failed build leaves it in place.
+        
+        Pages stream through chunking, dense and sparse embedding on their
+        own threads while the crawl is still running, and embedded chunks
+        are written out as segments of bounded size, so memory does not
+        grow with the size of the site.
+        """
         try:
             logger.info(f"Processing documents for {source.value}")
             
-            # Clear existing data
-            self.data_manager.clear_data(source)
+            previous = None
+            if incremental and self.data_manager.check_data_exists(source):
+                previous = PreviousBuild.load(source, self.registry.get(source))
+                if previous.models and previous.models != self._embedding_models():
+                    logger.info("Embedding models changed, re-embedding all chunks")
+                    previous = None
             
             # Fetch URLs from sitemap
-            urls = self.fetcher.fetch_sitemap(source.sitemap_url)
-            if not urls:
+            sitemap = self.fetcher.fetch_sitemap_entries(source.sitemap_url)
+            if not sitemap:
                 raise ValueError(f"No URLs found for {source.value}")
             
-            # Fetch and process content
-            documents = self.fetcher.fetch_all_contents(urls)
-            chunked_docs = self.chunker.chunk_documents(documents)
+            chunking = {
+                "chunk_size": self.chunker.chunk_size,
+                "chunk_overlap": self.chunker.overlap
+            }
+            # Stored chunks can only stand in for pages chunked the same way
+            if previous and previous.chunking != chunking:
+                previous_pages = None
+            else:
+                previous_pages = previous
+            
+            settings = self.config.processing_configs["ingestion"]
+            reranker = self.search.reranker
+            writer = SegmentWriter(
+                source,
+                previous.index.next_id if previous else 0,
+                settings["segment_chunks"],
+                reranker.model_name
+            )
+            batch: List[PageChunks] = []
             
-            # Prepare chunks and URL mapping
-            self.chunks = []
-            self.chunk_to_url = {}
+            def add_page(page: PageChunks) -> List[ChunkBatch]:
+                batch.append(page)
+                if sum(len(pending.chunks) for pending in batch) < settings["batch_size"]:
+                    return []
+                return flush_batch()
             
-            for url, chunks in chunked_docs.items():
-                for chunk in chunks:
-                    chunk_idx = str(len(self.chunks))
-                    self.chunks.append(chunk)
-                    self.chunk_to_url[chunk_idx] = url
+            def flush_batch() -> List[ChunkBatch]:
+                if not batch:
+                    return []
+                chunk_batch = ChunkBatch(list(batch))
+                batch.clear()
+                if previous:
+                    chunk_batch.known = [previous.chunk_id(chunk_hash) for chunk_hash in chunk_batch.hashes]
+                return [chunk_batch]
             
-            # Generate embeddings
-            dense_embeddings = self.dense_embedder.embed_texts(self.chunks)
-            sparse_embeddings = self.sparse_embedder.embed_texts(self.chunks)
+            # Pages stream through the stages, so downloads overlap with chunking
+            # and inference, and only the segment being filled stays in memory
+            pipeline = StagePipeline([
+                Stage("chunk", lambda item: [self._chunk_page(*item, previous, chunking)], settings["chunk_workers"]),
+                Stage("batch", add_page, 1, flush_batch),
+                Stage("dense", lambda chunk_batch: [self._embed_dense(chunk_batch, previous)], settings["dense_workers"]),
+                Stage("sparse", lambda chunk_batch: [self._embed_sparse(chunk_batch, previous)], settings["sparse_workers"])
+            ], settings["queue_size"])
             
-            # Save all data
-            self.data_manager.save_data(
-                source,
-                self.chunks,
-                self.chunk_to_url,
-                sparse_embeddings,
-                dense_embeddings,
-                self.dense_embedder.index
-            )
+            # Pages of the crawl with their hashes, and chunk ids to delete
+            fetch_ledger: Dict[str, Dict[str, Optional[str]]] = {}
+            pages: Dict[str, str] = {}
+            deleted: List[int] = []
+            unchanged = 0
+            
+            try:
+                pages_iter = self._iter_pages(sitemap, previous, fetch_ledger, conditional=previous_pages is not None)
+                for chunk_batch in pipeline.run(pages_iter):
+                    for page in chunk_batch.pages:
+                        if page.unchanged or page.n_chunks:
+                            pages[page.url] = page.page_hash
+                        unchanged += page.unchanged
+                        deleted.extend(page.removed)
+                    writer.add(chunk_batch)
+                writer.flush()
+                
+                if previous is None and not writer.segments:
+                    raise ValueError(f"No chunks generated for {source.value}")
+                
+                added = writer.next_id - (previous.index.next_id if previous else 0)
+                if previous:
+                    # Only pages the sitemap dropped are removed; a failed fetch is not a removal
+                    removed_pages = set(previous.urls) - set(sitemap)
+                    for url in removed_pages:
+                        deleted.extend(previous.page_ids(url))
+                    logger.info(
+                        f"{unchanged} pages unchanged, {len(pages) - unchanged} new or modified, "
+                        f"{len(removed_pages)} removed: added {added} chunks, deleting {len(deleted)}"
+                    )
+                else:
+                    logger.info(f"Added {added} chunks from {len(pages)} pages in {len(writer.segments)} segments")
+                
+                ingest_state = {
+                    "pages": pages,
+                    "chunking": chunking,
+                    "models": self._embedding_models(),
+                    "fetch": fetch_ledger
+                }
+                
+                def update(manifest: Dict) -> None:
+                    # A full build replaces the segments of the current version
+                    if previous is None:
+                        manifest["segments"] = []
+                        manifest["deleted"] = np.empty(0, dtype=np.int64)
+                    manifest["segments"].extend(writer.segments)
+                    manifest["deleted"] = np.concatenate([
+                        manifest["deleted"],
+                        np.asarray(deleted, dtype=np.int64)
+                    ])
+                    manifest["next_id"] = max(manifest["next_id"], writer.next_id)
+                
+                self.data_manager.commit(source, update, ingest_state)
+            except Exception:
+                # Segments of a build that was never committed are not referenced
+                writer.discard()
+                raise
+            
+            # Serve the new data from the saved, memory-mapped files
+            self.registry.reload(source)
+            self.result_cache.invalidate(source.value)
+            self.semantic_cache.invalidate(source.value)
+            self.compactor.schedule(source)
             
             self.current_source = source
             logger.info(f"Successfully processed documents for {source.value}")
@@ -77,22 +199,203 @@ class RetrievalPipeline(metaclass=Singleton):
             logger.error(f"Error processing documents: {str(e)}")
             raise
     
-    def load_source(self, source: DocSource) -> None:
-        """Load data for a specific source."""
+    def _iter_pages(
+        self,
+        sitemap: Dict[str, Optional[str]],
+        previous: Optional[PreviousBuild],
+        fetch_ledger: Dict[str, Dict[str, Optional[str]]],
+        conditional: bool = True
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """Fetch the pages of a sitemap that may have changed since the last crawl.
+        
+        With ``conditional``, pages whose sitemap ``lastmod`` matches the
+        fetch ledger are not requested, and the others are requested with
+        the validators of their last fetch. Yields the content of each page
+        as it arrives, or ``None`` for pages whose stored chunks are kept:
+        pages known to be unchanged, and pages of the previous build that
+        failed to download. Records the new fetch ledger in ``fetch_ledger``.
+        """
+        ledger = previous.fetch if previous and conditional else {}
+        
+        urls = []
+        validators = {}
+        for url, lastmod in sitemap.items():
+            entry = ledger.get(url)
+            if not (entry and previous.has_page(url)):
+                urls.append(url)
+            elif lastmod and entry.get("lastmod") == lastmod:
+                fetch_ledger[url] = entry
+                yield url, None
+            else:
+                urls.append(url)
+                validators[url] = entry
+        
+        fetched = not_modified = failed = 0
+        for result in tqdm(self.fetcher.iter_pages(urls, validators), total=len(urls), desc="Fetching URLs"):
+            if result.not_modified:
+                not_modified += 1
+            elif result.content:
+                fetched += 1
+            else:
+                # Keep serving what the page had until it can be fetched again
+                if previous and previous.has_page(result.url):
+                    failed += 1
+                    if result.url in previous.fetch:
+                        fetch_ledger[result.url] = previous.fetch[result.url]
+                    yield result.url, None
+                continue
+            
+            fetch_ledger[result.url] = {
+                "lastmod": sitemap[result.url],
+                "etag": result.etag,
+                "last_modified": result.last_modified
+            }
+            yield result.url, result.content
+        
+        logger.info(
+            f"Skipped {len(sitemap) - len(urls)} pages with unchanged lastmod, "
+            f"{not_modified} not modified, fetched {fetched} of {len(urls) - not_modified} other pages"
+        )
+        if failed:
+            logger.warning(f"Kept the stored chunks of {failed} pages that failed to download")
+    
+    def rollback(self, source: DocSource, version: Optional[str] = None) -> str:
+        """Serve an earlier version of a source, by default the one before the current.
+        
+        Returns the version now being served.
+        """
+        try:
+            version = self.data_manager.rollback(source, version)
+            
+            self.registry.reload(source)
+            self.result_cache.invalidate(source.value)
+            self.semantic_cache.invalidate(source.value)
+            
+            return version
+            
+        except Exception as e:
+            logger.error(f"Error rolling back {source.value}: {str(e)}")
+            raise
+    
+    def _chunk_page(
+        self,
+        url: str,
+        content: Optional[str],
+        previous: Optional[PreviousBuild],
+        chunking: Dict
+    ) -> PageChunks:
+        """Chunk a page and match its chunks against the previous build."""
+        if content is None:
+            return PageChunks(url, previous.pages[url], unchanged=True)
+        
+        # Unchanged pages keep their stored chunks as they are
+        page_hash = content_hash(content)
+        if previous and previous.page_unchanged(url, page_hash, chunking):
+            return PageChunks(url, page_hash, unchanged=True)
+        
+        page_chunks = self.chunker.chunk_text(content)
+        if not page_chunks:
+            logger.warning(f"No chunks generated for {url}")
+        hashes = [content_hash(chunk) for chunk in page_chunks]
+        
+        # Chunks a modified page still contains keep their ids
+        if previous:
+            kept, removed = previous.match_page(url, hashes)
+        else:
+            kept, removed = [None] * len(page_chunks), []
+        
+        new = [i for i, chunk_id in enumerate(kept) if chunk_id is None]
+        return PageChunks(
+            url,
+            page_hash,
+            chunks=[page_chunks[i] for i in new],
+            hashes=[hashes[i] for i in new],
+            removed=removed,
+            n_chunks=len(page_chunks)
+        )
+    
+    def _embedding_models(self) -> Dict[str, str]:
+        return {
+            "dense": self.dense_embedder.model_name,
+            "sparse": self.sparse_embedder.model_name
+        }
+    
+    def _embed_dense(self, batch: ChunkBatch, previous: Optional[PreviousBuild]) -> ChunkBatch:
+        """Embed the chunks of a batch densely, reusing exact vectors of the previous build for known hashes."""
+        if not len(batch):
+            return batch
+        
+        # Vectors decoded from quantized codes would be quantized a second time
+        reuse = previous is not None and previous.index.exact_vectors
+        new = [i for i, chunk_id in enumerate(batch.known) if chunk_id is None or not reuse]
+        reused = [i for i, chunk_id in enumerate(batch.known) if chunk_id is not None and reuse]
+        new_dense = self.dense_embedder.embed_texts([batch.texts[i] for i in new]) if new else None
+        dimension = new_dense.shape[1] if new else previous.index.dimension
+        batch.dense = np.empty((len(batch), dimension), dtype=np.float32)
+        if new:
+            batch.dense[new] = new_dense
+        if reused:
+            batch.dense[reused] = previous.dense_vectors([batch.known[i] for i in reused])
+        
+        return batch
+    
+    def _embed_sparse(self, batch: ChunkBatch, previous: Optional[PreviousBuild]) -> ChunkBatch:
+        """Embed and pretokenize the chunks of a batch, reusing the previous build for known hashes."""
+        if not len(batch):
+            return batch
+        
+        new = [i for i, chunk_id in enumerate(batch.known) if chunk_id is None]
+        reused = [i for i, chunk_id in enumerate(batch.known) if chunk_id is not None]
+        reused_ids = [batch.known[i] for i in reused]
+        if reused:
+            logger.info(f"Embedding {len(new)} chunks, reusing {len(reused)} from the previous build")
+        
+        new_texts = [batch.texts[i] for i in new]
+        
+        # Sparse vectors
+        batch.sparse = [None] * len(batch)
+        if new:
+            new_sparse = self.sparse_embedder.embed_texts(new_texts)
+            for j, i in enumerate(new):
+                indices, values = new_sparse.row(j)
+                batch.sparse[i] = SparseEmbedding(indices=indices, values=values)
+        if reused:
+            for i, embedding in zip(reused, previous.sparse_rows(reused_ids)):
+                batch.sparse[i] = embedding
+        
+        # Reranker token ids
+        reranker = self.search.reranker
+        reused_tokens = (
+            previous.tokens(reused_ids, reranker.model_name)
+            if reused and reranker.supports_pretokenized else []
+        )
+        if reused_tokens is None:
+            batch.tokens = reranker.tokenize_documents(batch.texts)
+        else:
+            chunk_tokens = reranker.tokenize_documents(new_texts)
+            if chunk_tokens is not None:
+                batch.tokens = [None] * len(batch)
+                for i, ids in zip(new, chunk_tokens):
+                    batch.tokens[i] = ids
+                for i, ids in zip(reused, reused_tokens):
+                    batch.tokens[i] = ids
+        
+        return batch
+    
+    def load_source(self, source: DocSource, lazy: bool = False) -> None:
+        """Load data for a specific source.
+        
+        With ``lazy`` the data is only loaded by the first search.
+        """
         try:
             if not self.data_manager.check_data_exists(source):
                 logger.info(f"No existing data found for {source.value}")
                 self.process_documents(source)
                 return
             
-            logger.info(f"Loading data for {source.value}")
-            data = self.data_manager.load_data(source)
-            
-            self.chunks = data["chunks"]
-            self.chunk_to_url = data["chunk_to_url"]
-            self.dense_embedder.embeddings = data["dense_embeddings"]
-            self.dense_embedder.index = data["dense_index"]
-            self.sparse_embedder.embeddings = data["sparse_embeddings"]
+            if not lazy:
+                logger.info(f"Loading data for {source.value}")
+                self.registry.get(source)
             
             self.current_source = source
             logger.info(f"Successfully loaded data for {source.value}")
@@ -101,61 +404,241 @@ class RetrievalPipeline(metaclass=Singleton):
             logger.error(f"Error loading source: {str(e)}")
             raise
     
-    def search_documents(self, query: str) -> Dict:
-        """Search documents with relevance checking."""
+    def search_documents(self, query: str, budget_ms: Optional[float] = None) -> Dict:
+        """Search documents with relevance checking.
+        
+        ``budget_ms`` (default ``scoring_configs["latency_budget_ms"]``) is a
+        deadline the search shrinks its depth to fit. Results record the
+        path taken in ``search_path``; results cut short by the deadline
+        are not cached.
+        """
         if not self.current_source:
             raise ValueError("No documentation source loaded")
         
         try:
-            # Perform hybrid search
-            results = self.search.search(query, self.chunks)
+            # Hold one bundle for the whole query, even if it gets evicted
+            index = self.index
             
-            # Check relevance
-            query_embedding = torch.tensor(
-                list(self.dense_embedder.model.embed([query]))[0],
-                device=self.config.device
-            )
+            source, version = index.source.value, index.version
+            
+            cached = self.result_cache.get(source, version, query)
+            if cached is not None:
+                cached["search_path"] = {"exit": "result_cache"}
+                return cached
             
-            is_relevant, confidence = self.relevance_checker.check_relevance(
+            # Every stage shares one encoding of the query per model
+            context = QueryContext(
                 query,
-                results,
-                query_embedding,
-                self.dense_embedder.embeddings
+                self.dense_embedder,
+                self.sparse_embedder,
+                self._budget(budget_ms)
             )
+            # Both encoders and the relevance preprocessing run concurrently
+            context.prefetch(self.search.executor, self.relevance_checker.normalize_text)
             
-            if not is_relevant:
-                return {
-                    "status": "no_results",
-                    "message": "No relevant documents found",
-                    "confidence": f"{confidence:.2f}"
-                }
+            # A paraphrase of a recent query reuses its result
+            hit = self.semantic_cache.lookup(source, version, context.dense_embedding)
+            if hit is not None:
+                logger.info(f"Semantic cache hit (similarity {hit['similarity']:.3f})")
+                result = hit["result"]
+                result["cache_id"] = hit["id"]
+                result["search_path"] = {"exit": "semantic_cache"}
+            else:
+                result = self._search_index(context, index)
+                if context.search_path.get("degraded"):
+                    return result
+                if result["status"] == "success":
+                    cache_id = self.semantic_cache.put(
+                        source,
+                        version,
+                        context.dense_embedding,
+                        result
+                    )
+                    if cache_id is not None:
+                        result["cache_id"] = cache_id
+            
+            self._cache_result(source, version, query, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error searching documents: {str(e)}")
+            raise
+    
+    def search_documents_batch(
+        self,
+        queries: List[str],
+        budget_ms: Optional[float] = None
+    ) -> List[Dict]:
+        """Search many queries at once, e.g. for evaluation or cache warming.
+        
+        Queries are encoded in one batch per model, searched with one
+        multi-row FAISS search and reranked in shared cross-encoder batches.
+        Each result has the same shape as :meth:`search_documents`, and
+        ``budget_ms`` is the deadline of the whole batch.
+        """
+        if not self.current_source:
+            raise ValueError("No documentation source loaded")
+        
+        try:
+            index = self.index
+            source, version = index.source.value, index.version
             
-            # Format results
-            processed_results = []
-            for result in results:
-                processed_results.append({
-                    "text": result["text"][:350] + "..." 
-                           if len(result["text"]) > 350 
-                           else result["text"],
-                    "url": self.chunk_to_url.get(str(result["index"]), ""),
-                    "scores": {
-                        "final": round(result["scores"]["final"], 3),
-                        "dense": round(result["scores"]["dense"], 3),
-                        "sparse": round(result["scores"]["sparse"], 3),
-                        "rerank": round(result["scores"]["rerank"], 3)
-                    }
-                })
+            results: Dict[str, Dict] = {}
+            pending = []
+            for query in dict.fromkeys(queries):
+                cached = self.result_cache.get(source, version, query)
+                if cached is not None:
+                    cached["search_path"] = {"exit": "result_cache"}
+                    results[query] = cached
+                else:
+                    pending.append(query)
             
+            if pending:
+                logger.info(f"Searching {len(pending)} queries in a batch")
+                
+                budget_ms = self._budget(budget_ms)
+                contexts = [
+                    QueryContext(query, self.dense_embedder, self.sparse_embedder, budget_ms)
+                    for query in pending
+                ]
+                # The two encoder batches run concurrently
+                dense_future = self.search.executor.submit(self.dense_embedder.embed_queries, pending)
+                sparse_embeddings = self.sparse_embedder.embed_queries(pending)
+                dense_embeddings = dense_future.result()
+                for context, dense, sparse in zip(contexts, dense_embeddings, sparse_embeddings):
+                    context.dense_embedding = dense
+                    context.sparse_embedding = sparse
+                
+                to_search = []
+                for context in contexts:
+                    hit = self.semantic_cache.lookup(source, version, context.dense_embedding)
+                    if hit is not None:
+                        result = hit["result"]
+                        result["cache_id"] = hit["id"]
+                        result["search_path"] = {"exit": "semantic_cache"}
+                        results[context.query] = result
+                        self._cache_result(source, version, context.query, result)
+                    else:
+                        to_search.append(context)
+                
+                searched = self.search.search_batch(to_search, index)
+                for context, hybrid_results in zip(to_search, searched):
+                    result = self._format_results(context, hybrid_results, index)
+                    results[context.query] = result
+                    if context.search_path.get("degraded"):
+                        continue
+                    if result["status"] == "success":
+                        cache_id = self.semantic_cache.put(
+                            source,
+                            version,
+                            context.dense_embedding,
+                            result
+                        )
+                        if cache_id is not None:
+                            result["cache_id"] = cache_id
+                    self._cache_result(source, version, context.query, result)
+            
+            return [results[query] for query in queries]
+            
+        except Exception as e:
+            logger.error(f"Error searching document batch: {str(e)}")
+            raise
+    
+    def _cache_result(self, source: str, version: str, query: str, result: Dict) -> None:
+        """Store a result in the result cache, which may be shared through Redis."""
+        # Semantic cache ids only mean something to this process's semantic cache
+        self.result_cache.put(
+            source,
+            version,
+            query,
+            {key: value for key, value in result.items() if key != "cache_id"}
+        )
+    
+    def _search_index(self, context: QueryContext, index: SourceIndex) -> Dict:
+        """Run the full search for a query against one source."""
+        # Perform hybrid search
+        results = self.search.search(context, index)
+        return self._format_results(context, results, index)
+    
+    def _format_results(
+        self,
+        context: QueryContext,
+        results: List[Dict],
+        index: SourceIndex
+    ) -> Dict:
+        """Check relevance of hybrid search results and format them."""
+        logger.info(f"Search path: {context.search_path}")
+        
+        # Check relevance
+        is_relevant, confidence = self.relevance_checker.check_relevance(
+            context,
+            results
+        )
+        
+        if not is_relevant:
             return {
-                "status": "success",
+                "status": "no_results",
+                "message": "No relevant documents found",
                 "confidence": f"{confidence:.2f}",
-                "results": processed_results
+                "search_path": context.search_path
             }
+        
+        # Format results
+        processed_results = []
+        for result in results:
+            processed_results.append({
+                "text": result["text"][:350] + "..." 
+                       if len(result["text"]) > 350 
+                       else result["text"],
+                "url": index.url(result["index"]),
+                "scores": {
+                    "final": round(result["scores"]["final"], 3),
+                    "dense": round(result["scores"]["dense"], 3),
+                    "sparse": round(result["scores"]["sparse"], 3),
+                    "rerank": round(result["scores"]["rerank"], 3)
+                }
+            })
+        
+        return {
+            "status": "success",
+            "confidence": f"{confidence:.2f}",
+            "results": processed_results,
+            "search_path": context.search_path
+        }
+    
+    def _budget(self, budget_ms: Optional[float]) -> Optional[float]:
+        """Per-request search budget, falling back to the configured default."""
+        if budget_ms is None:
+            return self.config.scoring_configs["latency_budget_ms"]
+        return budget_ms
             
-        except Exception as e:
-            logger.error(f"Error searching documents: {str(e)}")
-            raise
+    def get_cached_answer(self, cache_id: Optional[int], model: str) -> Optional[str]:
+        """Return a model's cached answer for a semantic cache entry."""
+        if cache_id is None or not self.config.serving_configs["semantic_cache"]["cache_answers"]:
+            return None
+        return self.semantic_cache.get_answer(self.current_source.value, cache_id, model)
+    
+    def cache_answer(self, cache_id: Optional[int], model: str, answer: str) -> None:
+        """Store a generated answer with its semantic cache entry."""
+        if cache_id is None or not self.config.serving_configs["semantic_cache"]["cache_answers"]:
+            return
+        self.semantic_cache.put_answer(self.current_source.value, cache_id, model, answer)
             
+    def get_cache_stats(self) -> Dict:
+        """Get hit and miss counters of the query caches."""
+        return {
+            "results": self.result_cache.stats(),
+            "semantic": self.semantic_cache.stats(),
+            "dense_embeddings": (
+                self.dense_embedder.cache.stats()
+                if self.dense_embedder.cache else None
+            ),
+            "sparse_embeddings": (
+                self.sparse_embedder.cache.stats()
+                if self.sparse_embedder.cache else None
+            )
+        }
+    
     def get_source_stats(self) -> Dict:
         """Get statistics about the current source."""
         if not self.current_source:
@@ -165,12 +648,17 @@ class RetrievalPipeline(metaclass=Singleton):
             }
             
         try:
+            index = self.index
             return {
                 "source": self.current_source.value,
-                "total_chunks": len(self.chunks),
-                "total_urls": len(set(self.chunk_to_url.values())),
-                "embedding_dimension": self.dense_embedder.embeddings.shape[1],
-                "device": self.config.device
+                "total_chunks": len(index),
+                "total_urls": len(index.urls),
+                "version": index.version,
+                "segments": len(index.segments),
+                "deleted_chunks": len(index.deleted),
+                "embedding_dimension": index.dimension,
+                "device": self.config.device,
+                "memory_bytes": index.nbytes
             }
         except Exception as e:
             logger.error(f"Error getting source stats: {str(e)}")
@@ -0,0 +1,190 @@
+import threading
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+from ..core.config import Config
+from ..core.singleton import Singleton
+from ..core.enums import DocSource
+from ..storage import ChunkStore, CSRMatrix, DataManager
+from ..utils.logger import logger
+from .embeddings import DenseEmbedder
+from .incremental import segment_hashes
+from .registry import SourceRegistry
+from .source_index import SourceIndex
+
+class SegmentCompactor(metaclass=Singleton):
+    """Merge the segments of a source in the background.
+
+    Incremental ingestion appends a small segment per update and only
+    tombstones deleted chunks. Runs of adjacent small segments are merged
+    into one, and segments with many deleted chunks are rewritten without
+    them. Merged segments are built next to the served ones and swapped in
+    with one manifest commit, so searches never wait for a merge.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.data_manager = DataManager()
+        self.registry = SourceRegistry()
+        self.dense_embedder = DenseEmbedder()
+
+        settings = self.config.serving_configs["compaction"]
+        self.enabled = settings["enabled"]
+        self.merge_factor = settings["merge_factor"]
+        self.small_segment_rows = settings["small_segment_rows"]
+        self.max_deleted_ratio = settings["max_deleted_ratio"]
+
+        # Merges run one at a time, away from the search threads
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compaction")
+        self._scheduled: Set[DocSource] = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, source: DocSource) -> Optional[Future]:
+        """Compact a source on the background thread, unless it is already queued."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if source in self._scheduled:
+                return None
+            self._scheduled.add(source)
+
+        return self.executor.submit(self._run, source)
+
+    def _run(self, source: DocSource) -> None:
+        with self._lock:
+            self._scheduled.discard(source)
+
+        try:
+            self.compact(source)
+        except Exception as e:
+            logger.error(f"Error compacting {source.value}: {str(e)}")
+
+    def plan(self, index: SourceIndex) -> List[List[int]]:
+        """Runs of adjacent segment positions to merge into one segment each."""
+        runs = []
+        run: List[int] = []
+
+        def close_run() -> None:
+            if len(run) >= self.merge_factor or any(self._mostly_deleted(index, n) for n in run):
+                runs.append(list(run))
+            run.clear()
+
+        for number, segment in enumerate(index.segments):
+            if len(segment) - index.n_deleted[number] < self.small_segment_rows:
+                run.append(number)
+                continue
+
+            close_run()
+            if self._mostly_deleted(index, number):
+                runs.append([number])
+
+        close_run()
+        return runs
+
+    def _mostly_deleted(self, index: SourceIndex, number: int) -> bool:
+        return index.n_deleted[number] >= self.max_deleted_ratio * len(index.segments[number])
+
+    def compact(self, source: DocSource) -> bool:
+        """Merge the segments chosen by :meth:`plan`.
+
+        Returns whether the source changed.
+        """
+        index = self.registry.get(source)
+        runs = self.plan(index)
+        if not runs:
+            return False
+
+        merges = []
+        try:
+            for run in runs:
+                segments = [index.segments[number] for number in run]
+                logger.info(
+                    f"Merging {len(run)} segments of {source.value} "
+                    f"({sum(len(segment) for segment in segments)} rows, "
+                    f"{sum(index.n_deleted[number] for number in run)} deleted)"
+                )
+                merges.append(([segment.name for segment in segments], self._merge(index, run)))
+
+            # Deleted chunks left out of the merged segments need no tombstones
+            purged = np.concatenate([np.empty(0, dtype=np.int64)] + [
+                np.asarray(index.segments[number].ids)[~index.live[number]]
+                for run in runs for number in run
+            ])
+
+            def replace(manifest: Dict[str, Any]) -> None:
+                for names, _ in merges:
+                    if not set(names) <= set(manifest["segments"]):
+                        raise RuntimeError("Segments were replaced while being merged")
+
+                for names, merged in merges:
+                    position = manifest["segments"].index(names[0])
+                    manifest["segments"] = [name for name in manifest["segments"] if name not in names]
+                    if merged is not None:
+                        manifest["segments"].insert(position, merged)
+                manifest["deleted"] = np.setdiff1d(manifest["deleted"], purged)
+
+            self.data_manager.commit(source, replace)
+
+        except Exception:
+            # Merged segments that were never committed are not referenced by anything
+            for _, merged in merges:
+                if merged is not None:
+                    self.data_manager.remove_segment(source, merged)
+            raise
+
+        self.registry.reload(source)
+        logger.info(f"Compacted {source.value} into {len(self.registry.get(source).segments)} segments")
+        return True
+
+    def _merge(self, index: SourceIndex, run: List[int]) -> Optional[str]:
+        """Write the live chunks of a run of segments as one new segment."""
+        ids, texts, urls, hashes, vectors, sparse, tokens = [], [], [], [], [], [], []
+        tokenizer = index.tokenizer
+
+        for number in run:
+            segment = index.segments[number]
+            rows = np.flatnonzero(index.live[number])
+            if not rows.size:
+                continue
+
+            segment_texts = segment.chunks.texts(rows)
+            ids.append(np.asarray(segment.ids)[rows])
+            texts.extend(segment_texts)
+            urls.extend(segment.chunks.url(int(row)) for row in rows)
+            hashes.extend(segment_hashes(segment, rows))
+            if segment.exact_vectors:
+                vectors.append(segment.get_vectors(rows))
+            else:
+                # Codes of a quantized index would lose precision again in the merged one
+                vectors.append(self.dense_embedder.embed_texts(segment_texts))
+            sparse.append(segment.sparse_embeddings.take(rows))
+            if tokenizer:
+                tokens.extend(np.array(segment.chunks.tokens(int(row))) for row in rows)
+
+        # A run whose chunks were all deleted is dropped without a replacement
+        if not ids:
+            return None
+        ids = np.concatenate(ids)
+
+        dense_numpy = np.concatenate(vectors)
+        dense_index = self.dense_embedder.build_index(dense_numpy, index.source.value, ids)
+
+        chunk_store = ChunkStore.build(
+            texts,
+            urls,
+            self.config.processing_configs["chunk_compression"],
+            self.config.processing_configs["chunk_block_size"],
+            tokens if tokenizer else None,
+            tokenizer
+        )
+
+        return self.data_manager.write_segment(
+            index.source,
+            chunk_store,
+            CSRMatrix.stack(sparse),
+            dense_index,
+            ids,
+            dense_numpy.astype(np.float16) if index.index_config["rescore"] else None,
+            chunk_hashes=hashes
+        )
@@ -1,15 +1,19 @@
-import torch
 import numpy as np
 import faiss
-from typing import List, Optional
+from typing import List, Optional, Union
 from tqdm import tqdm
 from fastembed import TextEmbedding
 from ...core.config import Config
 from ...core.singleton import Singleton
+from ...cache import EmbeddingCache
 from ...utils.logger import logger
+from .index_factory import build_dense_index
 
 class DenseEmbedder(metaclass=Singleton):
-    """Handle dense embeddings using FastEmbed."""
+    """Handle dense embeddings using FastEmbed.
+    
+    The model is shared by all sources; indexes live in ``SourceIndex``.
+    """
     
     def __init__(self):
         self.config = Config()
@@ -19,11 +23,17 @@ class DenseEmbedder(metaclass=Singleton):
         logger.info(f"Initializing dense embedder with model {self.model_name} on {self.device}")
         self.model = TextEmbedding(model_name=self.model_name)
         
-        # Storage for embeddings and index
-        self.embeddings: Optional[torch.Tensor] = None
-        self.index: Optional[faiss.Index] = None
+        cache_config = self.config.serving_configs["embedding_cache"]
+        self.cache = EmbeddingCache(
+            self.model_name,
+            lambda embedding: embedding.tobytes(),
+            lambda data: np.frombuffer(data, dtype=np.float32),
+            cache_config["path"],
+            cache_config["max_entries"],
+            cache_config["max_disk_entries"]
+        ) if cache_config["enabled"] else None
     
-    def embed_texts(self, texts: List[str]) -> torch.Tensor:
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
         """Generate dense embeddings for a list of texts."""
         try:
             logger.info(f"Generating dense embeddings for {len(texts)} texts")
@@ -36,55 +46,68 @@ class DenseEmbedder(metaclass=Singleton):
             ))
             
             # Convert to numpy array with proper dtype
-            dense_numpy = np.stack(embeddings).astype(np.float32)
-            
-            # Convert to tensor and move to device
-            self.embeddings = torch.tensor(
-                dense_numpy,
-                device=self.device,
-                dtype=torch.float32
-            )
-            
-            # Build FAISS index
-            self.build_index(dense_numpy)
-            
-            return self.embeddings
+            return np.stack(embeddings).astype(np.float32)
             
         except Exception as e:
             logger.error(f"Error generating dense embeddings: {str(e)}")
             raise
     
-    def build_index(self, embeddings: np.ndarray) -> None:
-        """Build FAISS index for fast similarity search."""
+    def build_index(
+        self,
+        embeddings: np.ndarray,
+        source: Optional[str] = None,
+        ids: Optional[np.ndarray] = None
+    ) -> Union[faiss.Index, faiss.IndexBinary]:
+        """Build FAISS index for fast similarity search.
+        
+        ``ids`` are the stable chunk ids returned by searches of the index.
+        """
         try:
-            logger.info("Building FAISS index...")
-            self.index = faiss.IndexFlatIP(embeddings.shape[1])
-            self.index.add(embeddings.astype('float32'))
+            index_config = self.config.get_index_config(source)
+            logger.info(
+                f"Building FAISS index ({index_config['factory']}, "
+                f"{index_config['storage']} storage)..."
+            )
+            
+            index = build_dense_index(
+                embeddings,
+                index_config["factory"],
+                index_config["storage"],
+                index_config["train_size"],
+                ids
+            )
+            
             logger.info("FAISS index built successfully")
+            return index
             
         except Exception as e:
             logger.error(f"Error building FAISS index: {str(e)}")
             raise
     
-    def search(self, query: str, k: int = 50) -> tuple:
-        """Search for similar texts using dense embeddings."""
-        if self.index is None:
-            raise ValueError("Index not built. Call embed_texts first.")
-            
-        try:
-            # Generate query embedding
-            query_embedding = np.array(
-                list(self.model.embed([query]))[0]
-            ).astype(np.float32)
-            
-            # Perform search
-            scores, indices = self.index.search(
-                query_embedding.reshape(1, -1), 
-                k
-            )
-            
-            return scores[0], indices[0]
-            
-        except Exception as e:
-            logger.error(f"Error performing dense search: {str(e)}")
-            raise
\ No newline at end of file
+    def embed_query(self, query: str) -> np.ndarray:
+        """Generate the dense embedding of a query, using the cache if enabled.
+        
+        The returned array is read-only since it may be shared.
+        """
+        if self.cache is None:
+            return self._encode_query(query)
+        return self.cache.get_or_compute(query, self._encode_query)
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Generate dense embeddings of many queries in one model batch."""
+        if not queries:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return np.stack(self._encode_queries(queries))
+        return np.stack(self.cache.get_or_compute_batch(queries, self._encode_queries))
+    
+    def _encode_query(self, query: str) -> np.ndarray:
+        return self._encode_queries([query])[0]
+    
+    def _encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        embeddings = []
+        for embedding in self.model.embed(queries):
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding.setflags(write=False)
+            embeddings.append(embedding)
+        return embeddings
\ No newline at end of file
@@ -0,0 +1,147 @@
+import faiss
+import numpy as np
+from typing import Any, Dict, Optional, Union
+from ...utils.logger import logger
+
+STORAGE_MODES = ("float32", "int8", "binary")
+
+def quantized_factory(factory: str) -> str:
+    """Replace full-precision vector storage in a factory string with int8 codes."""
+    parts = [part.strip() for part in factory.split(",")]
+
+    if any("PQ" in part or "SQ" in part for part in parts):
+        # Codes are already compressed
+        return factory
+    if parts[-1] == "Flat":
+        parts[-1] = "SQ8"
+    else:
+        parts.append("SQ8")
+
+    return ",".join(parts)
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign bits of float vectors into binary codes."""
+    return np.packbits(np.atleast_2d(vectors) > 0, axis=1)
+
+def hamming_to_similarity(distances: np.ndarray, dim: int) -> np.ndarray:
+    """Approximate cosine similarity from Hamming distances of sign codes."""
+    return 1.0 - 2.0 * distances.astype(np.float32) / dim
+
+def build_dense_index(
+    embeddings: np.ndarray,
+    factory: str = "Flat",
+    storage: str = "float32",
+    train_size: int = 100000,
+    ids: Optional[np.ndarray] = None
+) -> Union[faiss.Index, faiss.IndexBinary]:
+    """Build the first-stage index for a storage mode.
+
+    With ``ids`` the index is wrapped in an ID map, so searches return
+    those ids instead of row positions.
+    """
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown dense storage mode: {storage}")
+
+    if storage == "binary":
+        index = faiss.IndexBinaryFlat(embeddings.shape[1])
+        if ids is None:
+            index.add(binarize(embeddings))
+            return index
+        index = faiss.IndexBinaryIDMap(index)
+        index.add_with_ids(binarize(embeddings), np.asarray(ids, dtype=np.int64))
+        return index
+
+    if storage == "int8":
+        factory = quantized_factory(factory)
+
+    return build_faiss_index(embeddings, factory, train_size, ids)
+
+def build_faiss_index(
+    embeddings: np.ndarray,
+    factory: str = "Flat",
+    train_size: int = 100000,
+    ids: Optional[np.ndarray] = None
+) -> faiss.Index:
+    """Build an inner-product FAISS index from an index-factory string.
+
+    Indexes that need training (IVF, PQ) are trained on a random sample of
+    at most ``train_size`` vectors. If the corpus is too small to train the
+    requested index, a flat index is built instead.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    index = faiss.index_factory(
+        embeddings.shape[1],
+        factory,
+        faiss.METRIC_INNER_PRODUCT
+    )
+
+    if not index.is_trained:
+        sample = embeddings
+        if len(embeddings) > train_size:
+            rng = np.random.default_rng(0)
+            sample = embeddings[rng.choice(len(embeddings), train_size, replace=False)]
+
+        try:
+            logger.info(f"Training {factory} index on {len(sample)} vectors")
+            index.train(sample)
+        except RuntimeError as e:
+            logger.warning(
+                f"Could not train {factory} index on {len(sample)} vectors, "
+                f"falling back to Flat: {str(e)}"
+            )
+            index = faiss.IndexFlatIP(embeddings.shape[1])
+
+    if ids is not None:
+        index = faiss.IndexIDMap(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+        return index
+
+    index.add(embeddings)
+    return index
+
+def base_index(index: Union[faiss.Index, faiss.IndexBinary]) -> Union[faiss.Index, faiss.IndexBinary]:
+    """The index inside an ID map, which stores vectors by row position."""
+    if isinstance(index, faiss.IndexBinaryIDMap):
+        return index.index
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+def stores_exact_vectors(index: Union[faiss.Index, faiss.IndexBinary]) -> bool:
+    """Whether vectors reconstructed from the index are the ones that were added.
+
+    Flat storage is exact; SQ, PQ and binary codes only approximate them.
+    """
+    if isinstance(index, faiss.IndexBinary):
+        return False
+
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        return isinstance(index, faiss.IndexIVFFlat)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    return isinstance(index, faiss.IndexFlat)
+
+def configure_index(index: faiss.Index, params: Dict[str, Any]) -> faiss.Index:
+    """Apply search-time parameters and enable vector reconstruction."""
+    if isinstance(index, faiss.IndexBinary):
+        return index
+
+    space = faiss.ParameterSpace()
+
+    for name, key in (("efSearch", "ef_search"), ("nprobe", "nprobe")):
+        if params.get(key) is None:
+            continue
+        try:
+            space.set_index_parameter(index, name, params[key])
+        except RuntimeError:
+            # Parameter does not apply to this index type
+            continue
+
+    # IVF indexes need a direct map to reconstruct vectors by id
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+
+    return index
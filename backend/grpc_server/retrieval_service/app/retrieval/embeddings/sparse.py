@@ -1,12 +1,18 @@
-from typing import List, Dict
+import numpy as np
+from typing import List
 from tqdm import tqdm
-from fastembed import SparseTextEmbedding
+from fastembed import SparseEmbedding, SparseTextEmbedding
 from ...core.config import Config
 from ...core.singleton import Singleton
+from ...cache import EmbeddingCache
+from ...storage.sparse_matrix import CSRMatrix
 from ...utils.logger import logger
 
 class SparseEmbedder(metaclass=Singleton):
-    """Handle sparse embeddings using FastEmbed."""
+    """Handle sparse embeddings using FastEmbed.
+    
+    The model is shared by all sources; document vectors live in ``SourceIndex``.
+    """
     
     def __init__(self):
         self.config = Config()
@@ -15,47 +21,65 @@ class SparseEmbedder(metaclass=Singleton):
         logger.info(f"Initializing sparse embedder with model {self.model_name}")
         self.model = SparseTextEmbedding(model_name=self.model_name)
         
-        # Storage for embeddings
-        self.embeddings = []
+        cache_config = self.config.serving_configs["embedding_cache"]
+        self.cache = EmbeddingCache(
+            self.model_name,
+            self._serialize,
+            self._deserialize,
+            cache_config["path"],
+            cache_config["max_entries"],
+            cache_config["max_disk_entries"]
+        ) if cache_config["enabled"] else None
     
-    def embed_texts(self, texts: List[str]) -> List:
+    def embed_texts(self, texts: List[str]) -> CSRMatrix:
         """Generate sparse embeddings for a list of texts."""
         try:
             logger.info(f"Generating sparse embeddings for {len(texts)} texts")
             
-            self.embeddings = list(tqdm(
+            embeddings = list(tqdm(
                 self.model.embed(texts),
                 desc="Generating sparse embeddings",
                 total=len(texts)
             ))
             
-            return self.embeddings
+            return CSRMatrix.from_embeddings(embeddings)
             
         except Exception as e:
             logger.error(f"Error generating sparse embeddings: {str(e)}")
             raise
     
-    def compute_sparse_scores(self, query: str, indices: List[int]) -> List[float]:
-        """Compute sparse similarity scores for given indices."""
-        try:
-            # Generate query embedding
-            query_sparse = list(self.model.embed([query]))[0]
-            sparse_scores = []
-            
-            # Compute scores for selected documents
-            for idx in indices:
-                doc_emb = self.embeddings[idx]
-                
-                # Compute dot product for matching indices
-                score = sum(
-                    query_sparse.values[i] * doc_emb.values[doc_emb.indices == idx][0]
-                    for i, idx in enumerate(query_sparse.indices)
-                    if idx in doc_emb.indices
-                )
-                sparse_scores.append(score)
-            
-            return sparse_scores
-            
-        except Exception as e:
-            logger.error(f"Error computing sparse scores: {str(e)}")
-            raise
\ No newline at end of file
+    def embed_query(self, query: str) -> SparseEmbedding:
+        """Generate the sparse embedding of a query, using the cache if enabled."""
+        if self.cache is None:
+            return self._encode_query(query)
+        return self.cache.get_or_compute(query, self._encode_query)
+    
+    def embed_queries(self, queries: List[str]) -> List[SparseEmbedding]:
+        """Generate sparse embeddings of many queries in one model batch."""
+        if not queries:
+            return []
+        if self.cache is None:
+            return self._encode_queries(queries)
+        return self.cache.get_or_compute_batch(queries, self._encode_queries)
+    
+    def _encode_query(self, query: str) -> SparseEmbedding:
+        return self._encode_queries([query])[0]
+    
+    def _encode_queries(self, queries: List[str]) -> List[SparseEmbedding]:
+        return list(self.model.embed(queries))
+    
+    @staticmethod
+    def _serialize(embedding: SparseEmbedding) -> bytes:
+        """Pack indices and values as int32 and float32 halves."""
+        return (
+            np.asarray(embedding.indices, dtype=np.int32).tobytes() +
+            np.asarray(embedding.values, dtype=np.float32).tobytes()
+        )
+    
+    @staticmethod
+    def _deserialize(data: bytes) -> SparseEmbedding:
+        half = len(data) // 2
+        return SparseEmbedding(
+            indices=np.frombuffer(data[:half], dtype=np.int32),
+            values=np.frombuffer(data[half:], dtype=np.float32)
+        )
\ No newline at end of file
@@ -0,0 +1,131 @@
+import hashlib
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastembed import SparseEmbedding
+from ..core.enums import DocSource
+from ..storage import DataManager
+from ..utils.logger import logger
+from .source_index import IndexSegment, SourceIndex
+
+def content_hash(text: str) -> str:
+    """Stable hash identifying a page or chunk by its text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def segment_hashes(segment: IndexSegment, rows: np.ndarray) -> List[str]:
+    """Chunk hashes of segment rows, hashing the texts of segments without stored hashes."""
+    if segment.chunk_hashes is not None and len(segment.chunk_hashes) == len(segment):
+        return [value.decode("ascii") for value in segment.chunk_hashes[rows]]
+
+    logger.info(f"Hashing {len(rows)} stored chunks of segment {segment.name}")
+    return [content_hash(text) for text in segment.chunks.texts(rows)]
+
+class PreviousBuild:
+    """Live chunks of a source's current build, compared against a new crawl.
+
+    Unchanged pages keep their chunks untouched. Chunks of a modified page
+    that still occur in it keep their ids, the others are deleted, and new
+    chunks whose text was seen before reuse that chunk's sparse row,
+    reranker token ids and, unless the index only keeps quantized codes,
+    dense vector instead of being embedded again.
+
+    ``fetch`` is the ledger of the last crawl: the sitemap ``lastmod``,
+    ``etag`` and ``last_modified`` of each page, used to skip or
+    conditionally request pages that did not change.
+    """
+
+    def __init__(
+        self,
+        index: SourceIndex,
+        pages: Dict[str, str],
+        chunking: Dict[str, Any],
+        models: Optional[Dict[str, str]] = None,
+        fetch: Optional[Dict[str, Dict[str, Optional[str]]]] = None
+    ):
+        self.index = index
+        self.pages = pages
+        self.chunking = chunking
+        self.fetch = fetch or {}
+        # Embedding models of the build; unknown for builds without stored hashes
+        self.models = models or {}
+
+        # Live (chunk id, chunk hash) pairs of each page, and one id per distinct text
+        self.page_chunks: Dict[str, List[Tuple[int, str]]] = {}
+        self.ids: Dict[str, int] = {}
+
+        for segment, live in zip(index.segments, index.live):
+            rows = np.flatnonzero(live)
+            hashes = segment_hashes(segment, rows)
+            for row, chunk_hash in zip(rows, hashes):
+                chunk_id = int(segment.ids[row])
+                self.page_chunks.setdefault(segment.chunks.url(row), []).append((chunk_id, chunk_hash))
+                self.ids.setdefault(chunk_hash, chunk_id)
+
+    @classmethod
+    def load(cls, source: DocSource, index: SourceIndex) -> "PreviousBuild":
+        """Wrap a loaded source with the page hashes of its last crawl."""
+        state = DataManager().load_ingest_state(source)
+        return cls(
+            index,
+            state.get("pages", {}),
+            state.get("chunking", {}),
+            state.get("models"),
+            state.get("fetch")
+        )
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self.page_chunks)
+
+    def page_unchanged(self, url: str, page_hash: str, chunking: Dict[str, Any]) -> bool:
+        """Whether a page's text and the chunk settings are the same as last time."""
+        return (
+            self.pages.get(url) == page_hash
+            and self.chunking == chunking
+            and url in self.page_chunks
+        )
+
+    def has_page(self, url: str) -> bool:
+        """Whether the build serves chunks of a page with a known hash."""
+        return url in self.pages and url in self.page_chunks
+
+    def page_ids(self, url: str) -> List[int]:
+        return [chunk_id for chunk_id, _ in self.page_chunks.get(url, [])]
+
+    def match_page(self, url: str, chunk_hashes: Sequence[str]) -> Tuple[List[Optional[int]], List[int]]:
+        """Match the new chunks of a page against its stored ones.
+
+        Returns the id each new chunk keeps (``None`` for new text) and the
+        ids of stored chunks that no longer occur.
+        """
+        stored: Dict[str, List[int]] = {}
+        for chunk_id, chunk_hash in self.page_chunks.get(url, []):
+            stored.setdefault(chunk_hash, []).append(chunk_id)
+
+        kept = [
+            stored[chunk_hash].pop(0) if stored.get(chunk_hash) else None
+            for chunk_hash in chunk_hashes
+        ]
+        removed = [chunk_id for ids in stored.values() for chunk_id in ids]
+        return kept, removed
+
+    def chunk_id(self, chunk_hash: str) -> Optional[int]:
+        return self.ids.get(chunk_hash)
+
+    def dense_vectors(self, ids: List[int]) -> np.ndarray:
+        return self.index.get_vectors(ids)
+
+    def sparse_rows(self, ids: List[int]) -> List[SparseEmbedding]:
+        embeddings = []
+        for chunk_id in ids:
+            indices, values = self.index.sparse_row(chunk_id)
+            embeddings.append(SparseEmbedding(indices=np.array(indices), values=np.array(values)))
+        return embeddings
+
+    def tokens(self, ids: List[int], tokenizer: str) -> Optional[List[np.ndarray]]:
+        """Stored token ids of the chunks, if they came from the same tokenizer."""
+        if self.index.tokenizer != tokenizer:
+            return None
+        tokens = [self.index.tokens(chunk_id) for chunk_id in ids]
+        if any(token_ids is None for token_ids in tokens):
+            return None
+        return [np.array(token_ids) for token_ids in tokens]
@@ -0,0 +1,243 @@
+import queue
+import threading
+import numpy as np
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+from ..core.config import Config
+from ..core.enums import DocSource
+from ..storage import ChunkStore, CSRMatrix, DataManager
+from ..utils.logger import logger
+from .embeddings import DenseEmbedder
+
+class Stage(NamedTuple):
+    """One step of a :class:`StagePipeline`.
+
+    ``function`` turns an input item into any number of output items.
+    ``flush`` is called once the stage's input is exhausted and returns
+    items it held back, which needs a single worker.
+    """
+    name: str
+    function: Callable[[Any], Iterable[Any]]
+    workers: int = 1
+    flush: Optional[Callable[[], Iterable[Any]]] = None
+
+class PageChunks(NamedTuple):
+    """A crawled page after chunking."""
+    url: str
+    page_hash: str
+    # Whether the stored chunks of the page are kept as they are
+    unchanged: bool = False
+    # Chunks of the page that need to be added, with their hashes
+    chunks: Sequence[str] = ()
+    hashes: Sequence[str] = ()
+    # Stored chunk ids that the page no longer contains
+    removed: Sequence[int] = ()
+    # Number of chunks the page has, new or kept
+    n_chunks: int = 0
+
+class ChunkBatch:
+    """New chunks of some pages, embedded as they move through the stages."""
+
+    def __init__(self, pages: List[PageChunks]):
+        self.pages = pages
+        self.texts = [chunk for page in pages for chunk in page.chunks]
+        self.urls = [page.url for page in pages for _ in page.chunks]
+        self.hashes = [chunk_hash for page in pages for chunk_hash in page.hashes]
+
+        # Ids of stored chunks with the same text, whose embeddings are reused
+        self.known: List[Optional[int]] = [None] * len(self.texts)
+        self.dense: Optional[np.ndarray] = None
+        self.sparse: Optional[list] = None
+        self.tokens: Optional[list] = None
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+class StagePipeline:
+    """Run stages on their own threads, connected by bounded queues.
+
+    Every stage works on its items while the stages before it produce
+    the next ones, and a full queue makes the stage feeding it wait, so
+    at most ``queue_size`` items sit between two stages. If any stage
+    fails, the remaining items are drained without being processed and
+    the error is raised to the consumer.
+    """
+
+    _DONE = object()
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 64):
+        for stage in stages:
+            if stage.flush is not None and stage.workers != 1:
+                raise ValueError(f"Stage {stage.name} holds items back and needs a single worker")
+
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Feed ``items`` through the stages and yield what the last one produces."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        failed = threading.Event()
+        errors: List[BaseException] = []
+
+        def fail(error: BaseException) -> None:
+            errors.append(error)
+            failed.set()
+
+        def feed() -> None:
+            try:
+                for item in items:
+                    if failed.is_set():
+                        break
+                    queues[0].put(item)
+            except Exception as e:
+                logger.error(f"Error reading pipeline input: {str(e)}")
+                fail(e)
+            finally:
+                queues[0].put(self._DONE)
+
+        threads = [threading.Thread(target=feed, name="ingest-feed", daemon=True)]
+        for number, stage in enumerate(self.stages):
+            threads.extend(self._stage_threads(stage, queues[number], queues[number + 1], failed, fail))
+
+        for thread in threads:
+            thread.start()
+
+        item = None
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is self._DONE:
+                    break
+                if not failed.is_set():
+                    yield item
+        except BaseException as e:
+            # The consumer failed or stopped early
+            fail(e)
+            raise
+        finally:
+            failed.set()
+            while item is not self._DONE:
+                item = queues[-1].get()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def _stage_threads(
+        self,
+        stage: Stage,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        failed: threading.Event,
+        fail: Callable[[BaseException], None]
+    ) -> List[threading.Thread]:
+        remaining = [stage.workers]
+        lock = threading.Lock()
+
+        def work() -> None:
+            while True:
+                item = inbox.get()
+                if item is self._DONE:
+                    # Let the other workers of the stage see the end too
+                    inbox.put(self._DONE)
+                    break
+                if failed.is_set():
+                    continue
+
+                try:
+                    for output in stage.function(item):
+                        outbox.put(output)
+                except Exception as e:
+                    logger.error(f"Error in ingestion stage {stage.name}: {str(e)}")
+                    fail(e)
+
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+
+            if last:
+                if stage.flush is not None and not failed.is_set():
+                    try:
+                        for output in stage.flush():
+                            outbox.put(output)
+                    except Exception as e:
+                        logger.error(f"Error in ingestion stage {stage.name}: {str(e)}")
+                        fail(e)
+                outbox.put(self._DONE)
+
+        return [
+            threading.Thread(target=work, name=f"ingest-{stage.name}-{number}", daemon=True)
+            for number in range(stage.workers)
+        ]
+
+class SegmentWriter:
+    """Write embedded batches to disk as segments of about ``segment_chunks`` chunks.
+
+    A segment is written once the buffered batches reach the size, so
+    only the chunks of the segment being filled are held in memory. The
+    written segments are served once they are committed.
+    """
+
+    def __init__(self, source: DocSource, first_id: int, segment_chunks: int, tokenizer: Optional[str]):
+        self.config = Config()
+        self.data_manager = DataManager()
+        self.dense_embedder = DenseEmbedder()
+
+        self.source = source
+        self.segment_chunks = segment_chunks
+        self.tokenizer = tokenizer
+        self.rescore = self.config.get_index_config(source.value)["rescore"]
+
+        self.segments: List[str] = []
+        self.next_id = first_id
+        self._batches: List[ChunkBatch] = []
+        self._rows = 0
+
+    def add(self, batch: ChunkBatch) -> None:
+        if not len(batch):
+            return
+        self._batches.append(batch)
+        self._rows += len(batch)
+        if self._rows >= self.segment_chunks:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered chunks as a segment."""
+        if not self._rows:
+            return
+
+        batches, self._batches, self._rows = self._batches, [], 0
+        ids = np.arange(self.next_id, self.next_id + sum(len(batch) for batch in batches), dtype=np.int64)
+
+        texts = [text for batch in batches for text in batch.texts]
+        dense_numpy = np.concatenate([batch.dense for batch in batches])
+        tokens = None
+        if all(batch.tokens is not None for batch in batches):
+            tokens = [token_ids for batch in batches for token_ids in batch.tokens]
+
+        chunk_store = ChunkStore.build(
+            texts,
+            [url for batch in batches for url in batch.urls],
+            self.config.processing_configs["chunk_compression"],
+            self.config.processing_configs["chunk_block_size"],
+            tokens,
+            self.tokenizer
+        )
+
+        self.segments.append(self.data_manager.write_segment(
+            self.source,
+            chunk_store,
+            CSRMatrix.from_embeddings([row for batch in batches for row in batch.sparse]),
+            self.dense_embedder.build_index(dense_numpy, self.source.value, ids),
+            ids,
+            # Vectors are served from the index; quantized indexes may keep fp16 copies
+            dense_numpy.astype(np.float16) if self.rescore else None,
+            chunk_hashes=[chunk_hash for batch in batches for chunk_hash in batch.hashes]
+        ))
+        self.next_id = int(ids[-1]) + 1
+
+    def discard(self) -> None:
+        """Delete the segments written so far, e.g. after a failed build."""
+        for name in self.segments:
+            self.data_manager.remove_segment(self.source, name)
+        self.segments = []
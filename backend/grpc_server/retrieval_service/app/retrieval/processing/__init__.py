@@ -1,5 +1,5 @@
 from .cleaner import TextCleaner
-from .fetcher import URLFetcher
+from .fetcher import FetchResult, URLFetcher
 from .chunker import TextChunker, default_chunker
 
-__all__ = ['TextCleaner', 'URLFetcher', 'TextChunker', 'default_chunker']
\ No newline at end of file
+__all__ = ['TextCleaner', 'FetchResult', 'URLFetcher', 'TextChunker', 'default_chunker']
\ No newline at end of file
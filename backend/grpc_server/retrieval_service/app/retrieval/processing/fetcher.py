@@ -1,77 +1,370 @@
-import requests
+import aiohttp
+import asyncio
+import queue
+import random
+import threading
+import time
 import xmltodict
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
 from tqdm import tqdm
 from ...core.config import Config
 from ...utils.logger import logger
 from .cleaner import TextCleaner
 
+T = TypeVar("T")
+
+# Responses worth retrying; other errors will not go away by asking again
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+class FetchResult(NamedTuple):
+    """Outcome of fetching one page."""
+    url: str
+    # Cleaned text; None if the page failed, had no text or was not modified
+    content: Optional[str]
+    not_modified: bool = False
+    # Validators to send with the next request for the page
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+class HostLimiter:
+    """Limit the concurrent requests and the request rate to one host."""
+
+    def __init__(self, concurrency: int, rate: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests to the host, e.g. after a 429."""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    async def __aenter__(self) -> "HostLimiter":
+        await self.semaphore.acquire()
+
+        # Reserve the next free slot; the event loop runs this without interruption
+        now = time.monotonic()
+        start = max(now, self._next_slot)
+        self._next_slot = start + self.interval
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except BaseException:
+                # __aexit__ does not run when entering fails, e.g. on cancellation
+                self.semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.semaphore.release()
+
 class URLFetcher:
-    """Fetch and process URLs from sitemaps."""
-    
+    """Fetch and process URLs from sitemaps.
+
+    Pages are fetched concurrently over one pooled HTTP session, with
+    limits on concurrent requests and request rate per host. Failed
+    requests are retried after a jittered exponential backoff, or after
+    the delay a ``Retry-After`` header asks for. Pages fetched before can
+    be requested conditionally, so unchanged ones answer 304 without a
+    body.
+    """
+
     def __init__(self):
         self.config = Config()
         self.timeout = self.config.processing_configs["request_timeout"]
         self.max_retries = self.config.processing_configs["max_retries"]
-    
+
+        settings = self.config.processing_configs["crawl"]
+        self.max_connections = settings["max_connections"]
+        self.per_host_concurrency = settings["per_host_concurrency"]
+        self.per_host_rate = settings["per_host_rate"]
+        self.backoff_base = settings["backoff_base"]
+        self.backoff_max = settings["backoff_max"]
+        self.user_agent = settings["user_agent"]
+
     def fetch_sitemap(self, sitemap_url: str) -> List[str]:
         """Fetch URLs from sitemap with error handling and retries."""
-        urls = []
-        retries = 0
-        
-        while retries < self.max_retries:
-            try:
-                logger.info(f"Fetching sitemap from {sitemap_url}")
-                response = requests.get(sitemap_url, timeout=self.timeout)
-                response.raise_for_status()
-                
-                sitemap_dict = xmltodict.parse(response.content)
-                urls = [url['loc'] for url in sitemap_dict['urlset']['url']]
-                
-                logger.info(f"Found {len(urls)} URLs in sitemap")
-                return urls
-                
-            except Exception as e:
-                retries += 1
-                logger.error(f"Error fetching sitemap (attempt {retries}/{self.max_retries}): {str(e)}")
-                if retries == self.max_retries:
-                    logger.error(f"Failed to fetch sitemap after {self.max_retries} attempts")
-                    return []
-        
+        return list(self.fetch_sitemap_entries(sitemap_url))
+
+    def fetch_sitemap_entries(self, sitemap_url: str) -> Dict[str, Optional[str]]:
+        """Fetch the URLs of a sitemap with their ``lastmod`` dates, if given."""
+        logger.info(f"Fetching sitemap from {sitemap_url}")
+        response = self._run(self._fetch_once(sitemap_url))
+        if response is None:
+            logger.error(f"Failed to fetch sitemap after {self.max_retries} attempts")
+            return {}
+
+        try:
+            entries = xmltodict.parse(response[2])['urlset']['url']
+            # A sitemap with a single URL parses to a dict rather than a list
+            if isinstance(entries, dict):
+                entries = [entries]
+            urls = {entry['loc']: entry.get('lastmod') for entry in entries}
+        except Exception as e:
+            logger.error(f"Error parsing sitemap: {str(e)}")
+            return {}
+
+        logger.info(f"Found {len(urls)} URLs in sitemap")
         return urls
-    
+
     def fetch_url_content(self, url: str) -> Optional[str]:
         """Fetch and clean content from a single URL."""
-        retries = 0
-        
-        while retries < self.max_retries:
-            try:
-                response = requests.get(url, timeout=self.timeout)
-                response.raise_for_status()
-                
-                # Clean the content
-                cleaned_content = TextCleaner.extract_text_from_html(response.content)
-                
-                if not cleaned_content:
-                    logger.warning(f"No content extracted from {url}")
-                    return None
-                    
-                return cleaned_content
-                
-            except Exception as e:
-                retries += 1
-                logger.error(f"Error fetching {url} (attempt {retries}/{self.max_retries}): {str(e)}")
-                if retries == self.max_retries:
-                    return None
-    
+        for _, content in self.iter_contents([url]):
+            return content
+        return None
+
     def fetch_all_contents(self, urls: List[str]) -> dict:
         """Fetch content from multiple URLs with progress bar."""
         contents = {}
-        
-        for url in tqdm(urls, desc="Fetching URLs"):
-            content = self.fetch_url_content(url)
+
+        for url, content in tqdm(self.iter_contents(urls), total=len(urls), desc="Fetching URLs"):
             if content:
                 contents[url] = content
-        
+
         logger.info(f"Successfully fetched {len(contents)} out of {len(urls)} URLs")
-        return contents
\ No newline at end of file
+        return contents
+
+    def iter_contents(self, urls: List[str]) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield ``(url, content)`` pairs as pages finish downloading.
+
+        Content is ``None`` for pages that failed or had no text.
+        """
+        for result in self.iter_pages(urls):
+            yield result.url, result.content
+
+    def iter_pages(
+        self,
+        urls: List[str],
+        validators: Optional[Dict[str, Dict[str, Optional[str]]]] = None
+    ) -> Iterator[FetchResult]:
+        """Yield a :class:`FetchResult` per URL as pages finish downloading.
+
+        ``validators`` maps URLs to the ``etag`` and ``last_modified``
+        of their previous fetch, sent as ``If-None-Match`` and
+        ``If-Modified-Since``. The crawl runs on its own event loop in a
+        background thread, so this also works when called from async
+        code. At most ``max_connections`` results wait for the caller
+        before the crawl pauses.
+        """
+        results: queue.Queue = queue.Queue(maxsize=self.max_connections)
+        stop = threading.Event()
+        done = object()
+
+        async def produce() -> None:
+            stream = self.stream_pages(urls, validators)
+            try:
+                async for item in stream:
+                    await asyncio.to_thread(results.put, item)
+                    if stop.is_set():
+                        break
+                # A full queue must not block the event loop and the fetches on it
+                await asyncio.to_thread(results.put, done)
+            except Exception as e:
+                await asyncio.to_thread(results.put, e)
+            finally:
+                await stream.aclose()
+
+        thread = threading.Thread(target=asyncio.run, args=(produce(),), name="crawler", daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Unblock the crawl if the caller stopped early
+            stop.set()
+            while thread.is_alive():
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    async def stream_contents(self, urls: List[str]) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """Fetch and clean pages concurrently, yielding them in completion order."""
+        async for result in self.stream_pages(urls):
+            yield result.url, result.content
+
+    async def stream_pages(
+        self,
+        urls: List[str],
+        validators: Optional[Dict[str, Dict[str, Optional[str]]]] = None
+    ) -> AsyncIterator[FetchResult]:
+        """Fetch pages concurrently, conditionally where ``validators`` are known."""
+        validators = validators or {}
+        limiters: Dict[str, HostLimiter] = {}
+        pending = iter(urls)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.max_connections)
+
+        async with self._session() as session:
+            async def worker() -> None:
+                # Workers share the URL iterator, so each URL is fetched once
+                for url in pending:
+                    try:
+                        result = await self._fetch_page(session, limiters, url, validators.get(url))
+                    except Exception as e:
+                        logger.error(f"Error processing {url}: {str(e)}")
+                        result = FetchResult(url, None)
+                    await results.put(result)
+                await results.put(None)
+
+            workers = [
+                asyncio.create_task(worker())
+                for _ in range(min(self.max_connections, len(urls)))
+            ]
+            remaining = len(workers)
+
+            try:
+                while remaining:
+                    item = await results.get()
+                    if item is None:
+                        remaining -= 1
+                        continue
+                    yield item
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _fetch_page(
+        self,
+        session: aiohttp.ClientSession,
+        limiters: Dict[str, HostLimiter],
+        url: str,
+        validators: Optional[Dict[str, Optional[str]]] = None
+    ) -> FetchResult:
+        """Download a page and extract its text, unless it was not modified."""
+        headers = {}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        response = await self._get(session, limiters, url, headers)
+        if response is None:
+            return FetchResult(url, None)
+
+        status, response_headers, body = response
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+
+        if status == 304 and headers:
+            # Servers may omit unchanged validators from a 304
+            return FetchResult(
+                url,
+                None,
+                not_modified=True,
+                etag=etag or validators.get("etag"),
+                last_modified=last_modified or validators.get("last_modified")
+            )
+
+        # HTML parsing is CPU-bound, keep it off the event loop
+        cleaned_content = await asyncio.to_thread(TextCleaner.extract_text_from_html, body)
+        if not cleaned_content:
+            logger.warning(f"No content extracted from {url}")
+            return FetchResult(url, None)
+
+        return FetchResult(url, cleaned_content, etag=etag, last_modified=last_modified)
+
+    async def _fetch_once(self, url: str) -> Optional[Tuple[int, Mapping[str, str], bytes]]:
+        async with self._session() as session:
+            return await self._get(session, {}, url)
+
+    async def _get(
+        self,
+        session: aiohttp.ClientSession,
+        limiters: Dict[str, HostLimiter],
+        url: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Optional[Tuple[int, Mapping[str, str], bytes]]:
+        """GET a URL within its host's limits, retrying transient failures.
+
+        Returns the status, headers and body of the response, or ``None``
+        if the URL could not be fetched.
+        """
+        host = urlsplit(url).netloc
+        if host not in limiters:
+            limiters[host] = HostLimiter(self.per_host_concurrency, self.per_host_rate)
+        limiter = limiters[host]
+
+        for attempt in range(1, self.max_retries + 1):
+            retry_after = None
+            try:
+                async with limiter:
+                    async with session.get(url, headers=headers) as response:
+                        if response.status < 400:
+                            return response.status, response.headers.copy(), await response.read()
+
+                        error = f"HTTP {response.status}"
+                        if response.status not in RETRY_STATUSES:
+                            logger.error(f"Error fetching {url}: {error}")
+                            return None
+                        retry_after = self._retry_after(response.headers.get("Retry-After"))
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+
+            logger.error(f"Error fetching {url} (attempt {attempt}/{self.max_retries}): {error}")
+            if attempt == self.max_retries:
+                return None
+
+            delay = self._backoff(attempt, retry_after)
+            if retry_after is not None:
+                # The host asked everyone to slow down, not just this request
+                limiter.pause(delay)
+            await asyncio.sleep(delay)
+
+        return None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the next attempt."""
+        # Full jitter keeps retries of many pages from arriving in waves
+        delay = random.uniform(0, self.backoff_base * 2 ** attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return min(delay, self.backoff_max)
+
+    @staticmethod
+    def _retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _session(self) -> aiohttp.ClientSession:
+        """HTTP session whose connections are kept alive and reused across pages."""
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.per_host_concurrency,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": self.user_agent}
+        )
+
+    @staticmethod
+    def _run(coroutine: Awaitable[T]) -> T:
+        """Run a coroutine to completion from synchronous code."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+
+        # Inside an event loop (e.g. a gRPC handler), run on a fresh one
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
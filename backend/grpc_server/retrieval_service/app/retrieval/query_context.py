@@ -0,0 +1,100 @@
+import time
+import numpy as np
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Optional, Set
+from fastembed import SparseEmbedding
+from .embeddings import DenseEmbedder, SparseEmbedder
+
+class QueryContext:
+    """Per-query state shared by every retrieval stage.
+
+    Each model encodes the query at most once, on first use, and later
+    stages reuse the result. Encodings can also be set up front, e.g. when
+    they were computed for a whole batch of queries.
+
+    :meth:`prefetch` starts the independent encodings on a thread pool, so
+    each stage only waits for the encoding it uses.
+
+    A context may carry a deadline that search stages shrink their work to
+    fit, and records the path the search took in ``search_path``.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        dense_embedder: Optional[DenseEmbedder] = None,
+        sparse_embedder: Optional[SparseEmbedder] = None,
+        budget_ms: Optional[float] = None
+    ):
+        self.query = query
+        self.dense_embedder = dense_embedder or DenseEmbedder()
+        self.sparse_embedder = sparse_embedder or SparseEmbedder()
+
+        self._dense_embedding: Optional[np.ndarray] = None
+        self._sparse_embedding: Optional[SparseEmbedding] = None
+        self._query_terms: Optional[Set[str]] = None
+        self._futures: Dict[str, Future] = {}
+
+        # Query token ids of the reranker, set on first rerank
+        self.rerank_tokens: Optional[np.ndarray] = None
+
+        # Monotonic time by which results are due
+        self.deadline: Optional[float] = (
+            time.monotonic() + budget_ms / 1000 if budget_ms else None
+        )
+        self.search_path: Dict[str, Any] = {}
+
+    def prefetch(
+        self,
+        executor: Executor,
+        term_normalizer: Optional[Callable[[str], Set[str]]] = None
+    ) -> None:
+        """Start dense and sparse encoding, and term normalization, concurrently.
+        
+        ONNX Runtime releases the GIL, so the encoders run in parallel.
+        """
+        if self._dense_embedding is None:
+            self._futures["dense"] = executor.submit(self.dense_embedder.embed_query, self.query)
+        if self._sparse_embedding is None:
+            self._futures["sparse"] = executor.submit(self.sparse_embedder.embed_query, self.query)
+        if term_normalizer is not None and self._query_terms is None:
+            self._futures["terms"] = executor.submit(term_normalizer, self.query)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def dense_embedding(self) -> np.ndarray:
+        if self._dense_embedding is None:
+            if "dense" in self._futures:
+                self._dense_embedding = self._futures.pop("dense").result()
+            else:
+                self._dense_embedding = self.dense_embedder.embed_query(self.query)
+        return self._dense_embedding
+
+    @dense_embedding.setter
+    def dense_embedding(self, embedding: np.ndarray) -> None:
+        self._dense_embedding = np.asarray(embedding, dtype=np.float32)
+
+    @property
+    def sparse_embedding(self) -> SparseEmbedding:
+        if self._sparse_embedding is None:
+            if "sparse" in self._futures:
+                self._sparse_embedding = self._futures.pop("sparse").result()
+            else:
+                self._sparse_embedding = self.sparse_embedder.embed_query(self.query)
+        return self._sparse_embedding
+
+    @sparse_embedding.setter
+    def sparse_embedding(self, embedding: SparseEmbedding) -> None:
+        self._sparse_embedding = embedding
+
+    @property
+    def query_terms(self) -> Optional[Set[str]]:
+        """Normalized query terms, if :meth:`prefetch` computed them."""
+        if self._query_terms is None and "terms" in self._futures:
+            self._query_terms = self._futures.pop("terms").result()
+        return self._query_terms
@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ..core.config import Config
+from ..core.singleton import Singleton
+from ..core.enums import DocSource
+from ..storage import DataManager
+from ..utils.logger import logger
+from .source_index import SourceIndex
+
+class SourceRegistry(metaclass=Singleton):
+    """Process-wide cache of loaded sources under a memory budget.
+
+    Sources are loaded on first use and the least recently used ones are
+    evicted once the budget is exceeded. Evicted bundles stay alive for any
+    search still holding a reference to them.
+
+    Every lookup checks the source's CURRENT pointer, so a version
+    committed or rolled back by another process is swapped in on the next
+    query without a restart.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.data_manager = DataManager()
+
+        self.memory_budget = int(self.config.serving_configs["memory_budget_mb"] * 2**20)
+        self.max_sources = self.config.serving_configs["max_loaded_sources"]
+
+        self._indexes: "OrderedDict[DocSource, SourceIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[DocSource, threading.Lock] = {}
+        # CURRENT pointer of each source when its version was last checked
+        self._stamps: Dict[DocSource, Optional[tuple]] = {}
+
+    def get(self, source: DocSource) -> SourceIndex:
+        """Return the bundle for a source, loading it if needed."""
+        with self._lock:
+            index = self._indexes.get(source)
+            if index is not None:
+                self._indexes.move_to_end(source)
+            load_lock = self._load_locks.setdefault(source, threading.Lock())
+
+        if index is not None:
+            if self._is_current(source, index):
+                return index
+            logger.info(f"{source.value} moved on from version {index.version}, reloading")
+            try:
+                return self.reload(source)
+            except Exception as e:
+                # Keep serving the loaded version rather than failing the query
+                logger.error(f"Error reloading {source.value}: {str(e)}")
+                return index
+
+        # Only one thread loads a given source
+        with load_lock:
+            with self._lock:
+                if source in self._indexes:
+                    self._indexes.move_to_end(source)
+                    return self._indexes[source]
+
+            logger.info(f"Loading {source.value} into the source registry")
+            index = SourceIndex.from_data(source, self.data_manager.load_data(source))
+            self.put(source, index)
+            return index
+
+    def reload(self, source: DocSource) -> SourceIndex:
+        """Load the current build of a source, reusing segments already in memory.
+
+        Searches holding the previous bundle keep using it until they finish.
+        """
+        with self._lock:
+            current = self._indexes.get(source)
+            load_lock = self._load_locks.setdefault(source, threading.Lock())
+
+        with load_lock:
+            loaded = {segment.name: segment for segment in current.segments} if current else {}
+            data = self.data_manager.load_data(source, loaded=loaded)
+            index = SourceIndex.from_data(source, data, loaded)
+            self.put(source, index)
+            return index
+
+    def _is_current(self, source: DocSource, index: SourceIndex) -> bool:
+        """Whether a loaded bundle is still the version CURRENT points at."""
+        # A stat per query; the pointer is only read after it was replaced
+        stamp = self.data_manager.current_stamp(source)
+        if stamp is None or stamp == self._stamps.get(source):
+            return True
+
+        version = self.data_manager.current_version(source)
+        self._stamps[source] = stamp
+        return version is None or version == index.version
+
+    def put(self, source: DocSource, index: SourceIndex) -> None:
+        """Register a bundle, replacing any previous one for the source."""
+        with self._lock:
+            self._indexes[source] = index
+            self._indexes.move_to_end(source)
+            self._evict(keep=source)
+
+    def evict(self, source: DocSource) -> None:
+        """Drop a source from memory."""
+        with self._lock:
+            self._indexes.pop(source, None)
+
+    def is_loaded(self, source: DocSource) -> bool:
+        with self._lock:
+            return source in self._indexes
+
+    @property
+    def loaded_sources(self) -> List[DocSource]:
+        """Loaded sources, least recently used first."""
+        with self._lock:
+            return list(self._indexes)
+
+    @property
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(index.nbytes for index in self._indexes.values())
+
+    def _evict(self, keep: DocSource) -> None:
+        """Evict least recently used sources until within budget."""
+        usage = sum(index.nbytes for index in self._indexes.values())
+
+        while len(self._indexes) > 1 and (
+            usage > self.memory_budget
+            or (self.max_sources and len(self._indexes) > self.max_sources)
+        ):
+            oldest = next(iter(self._indexes))
+            if oldest == keep:
+                break
+
+            evicted = self._indexes.pop(oldest)
+            usage -= evicted.nbytes
+            logger.info(
+                f"Evicted {oldest.value} from the source registry "
+                f"({usage / 2**20:.1f} MB in use)"
+            )
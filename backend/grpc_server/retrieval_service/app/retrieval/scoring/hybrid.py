@@ -1,14 +1,24 @@
 import numpy as np
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from ...core.config import Config
 from ...core.singleton import Singleton
 from ...utils.logger import logger
 from ..embeddings.dense import DenseEmbedder
 from ..embeddings.sparse import SparseEmbedder
+from ..query_context import QueryContext
+from ..source_index import SourceIndex
 from .reranker import Reranker
 
 class HybridSearch(metaclass=Singleton):
-    """Combine dense and sparse search with reranking."""
+    """Combine dense and sparse search with reranking.
+    
+    Search depth adapts per query. Queries whose best candidates cannot
+    pass the relevance check, and queries where dense and sparse scores
+    clearly agree on the best candidate, skip the cross-encoder. A deadline
+    on the query context shrinks the candidate and rerank depth. The path
+    taken is recorded in ``context.search_path``.
+    """
     
     def __init__(self):
         self.config = Config()
@@ -20,6 +30,17 @@ class HybridSearch(metaclass=Singleton):
         self.dense_weight = self.config.scoring_configs["dense_weight"]
         self.sparse_weight = self.config.scoring_configs["sparse_weight"]
         self.rerank_weight = self.config.scoring_configs["rerank_weight"]
+        self.sparse_k = self.config.scoring_configs["sparse_candidates"]
+        
+        self.final_results = self.config.scoring_configs["final_results"]
+        self.relevance_threshold = self.config.scoring_configs["relevance_threshold"]
+        self.rerank_skip_margin = self.config.scoring_configs["rerank_skip_margin"]
+        
+        # Shared by all queries for stages that can overlap, like the two encoders
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.serving_configs["stage_threads"],
+            thread_name_prefix="search-stage"
+        )
     
     @staticmethod
     def normalize_scores(scores: List[float]) -> List[float]:
@@ -39,71 +60,274 @@ class HybridSearch(metaclass=Singleton):
     
     def search(
         self, 
-        query: str,
-        texts: List[str],
+        context: QueryContext,
+        index: SourceIndex,
         k: int = 50
     ) -> List[Dict]:
-        """Perform hybrid search with reranking."""
+        """Perform hybrid search with reranking over one source."""
         try:
-            # Dense search
-            dense_scores, indices = self.dense_embedder.search(query, k)
+            # First-stage retrieval from the dense index
+            k = self._candidate_depth([context], k)
+            dense_scores, dense_indices = index.dense_search(context.dense_embedding, k)
+            if self._below_threshold(context, dense_scores):
+                return []
+            
+            combined_docs = self._combine(context, index, dense_scores, dense_indices)
+            
+            # Only the returned candidates are read from the chunk store
+            top_ids = [doc["index"] for doc in combined_docs[:self.final_results]]
+            top_texts = index.texts(top_ids)
+            
+            depth = self._rerank_depths([context], [combined_docs])[0]
+            rerank_scores = None
+            if depth:
+                # Rerank top candidates using the reranker instance
+                rerank_scores = self.reranker.rerank(
+                    context,
+                    top_texts[:depth],
+                    top_k=depth,
+                    index=index,
+                    chunk_ids=top_ids[:depth]
+                )
             
-            # Sparse scoring for top results
-            sparse_scores = self.sparse_embedder.compute_sparse_scores(
-                query, 
-                indices.tolist()
+            return self._finalize(combined_docs, top_texts, rerank_scores)
+            
+        except Exception as e:
+            logger.error(f"Error in hybrid search: {str(e)}")
+            raise
+    
+    def search_batch(
+        self,
+        contexts: List[QueryContext],
+        index: SourceIndex,
+        k: int = 50
+    ) -> List[List[Dict]]:
+        """Hybrid search for many queries, sharing FAISS and reranker batches.
+        
+        Results match calling :meth:`search` for each query. Dense
+        embeddings should already be set on the contexts, e.g. from
+        ``DenseEmbedder.embed_queries``.
+        """
+        try:
+            if not contexts:
+                return []
+            
+            # One multi-row search over the dense index
+            k = self._candidate_depth(contexts, k)
+            dense_results = index.dense_search_batch(
+                np.stack([context.dense_embedding for context in contexts]),
+                k
             )
             
-            # Normalize scores
-            norm_dense = self.normalize_scores(dense_scores.tolist())
-            norm_sparse = self.normalize_scores(sparse_scores)
+            results: List[List[Dict]] = [[] for _ in contexts]
+            searched = [
+                row for row, (context, (dense_scores, _)) in enumerate(zip(contexts, dense_results))
+                if not self._below_threshold(context, dense_scores)
+            ]
+            
+            all_docs, all_ids, all_texts = [], [], []
+            for row in searched:
+                dense_scores, dense_indices = dense_results[row]
+                combined_docs = self._combine(contexts[row], index, dense_scores, dense_indices)
+                top_ids = [doc["index"] for doc in combined_docs[:self.final_results]]
+                
+                all_docs.append(combined_docs)
+                all_ids.append(top_ids)
+                all_texts.append(index.texts(top_ids))
             
-            # Combine dense and sparse scores
-            combined_docs = []
-            selected_texts = []
+            searched_contexts = [contexts[row] for row in searched]
+            depths = self._rerank_depths(searched_contexts, all_docs)
+            reranked = [i for i, depth in enumerate(depths) if depth]
             
-            for i, idx in enumerate(indices):
-                combined_score = (
-                    self.dense_weight * norm_dense[i] +
-                    self.sparse_weight * norm_sparse[i]
+            # Every (query, passage) pair goes through the cross-encoder together
+            all_rerank_scores: List[Optional[List[float]]] = [None] * len(searched)
+            if reranked:
+                scores = self.reranker.rerank_batch(
+                    [searched_contexts[i] for i in reranked],
+                    [all_texts[i][:depths[i]] for i in reranked],
+                    top_k=self.final_results,
+                    index=index,
+                    chunk_ids=[all_ids[i][:depths[i]] for i in reranked]
                 )
-                
-                combined_docs.append({
-                    "index": idx,
-                    "text": texts[idx],
-                    "scores": {
-                        "dense": norm_dense[i],
-                        "sparse": norm_sparse[i],
-                        "combined": combined_score
-                    }
-                })
-                selected_texts.append(texts[idx])
-            
-            # Sort by combined score and take top 20 for reranking
-            combined_docs.sort(key=lambda x: x["scores"]["combined"], reverse=True)
-            rerank_candidates = [doc["text"] for doc in combined_docs[:20]]
-            
-            # Rerank top candidates using the reranker instance
-            rerank_scores = self.reranker.rerank(query, rerank_candidates)
-            norm_rerank = self.normalize_scores(rerank_scores)
-            
-            # Final scoring
-            final_results = []
-            for doc, rerank_score in zip(combined_docs[:10], norm_rerank[:10]):
+                for i, row_scores in zip(reranked, scores):
+                    all_rerank_scores[i] = row_scores
+            
+            for row, combined_docs, top_texts, rerank_scores in zip(
+                searched, all_docs, all_texts, all_rerank_scores
+            ):
+                results[row] = self._finalize(combined_docs, top_texts, rerank_scores)
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in batched hybrid search: {str(e)}")
+            raise
+    
+    def _candidate_depth(self, contexts: List[QueryContext], k: int) -> int:
+        """Shrink first-stage depth when the tightest deadline cannot afford a full rerank."""
+        budgets = [c.remaining() for c in contexts if c.deadline is not None]
+        depth = k
+        if budgets:
+            full_cost = self.final_results * len(contexts) * self.reranker.pair_seconds
+            if min(budgets) < full_cost:
+                depth = max(self.final_results, int(k * min(budgets) / full_cost))
+        
+        for context in contexts:
+            context.search_path["candidates"] = depth
+            if depth < k:
+                context.search_path["degraded"] = True
+        return depth
+    
+    def _below_threshold(self, context: QueryContext, dense_scores: np.ndarray) -> bool:
+        """Whether the best dense hit already fails the relevance check.
+        
+        Sparse-only candidates score below the dense top-k, so no candidate
+        can pass either and the sparse search and fusion are skipped.
+        """
+        if not len(dense_scores) or dense_scores.max() >= self.relevance_threshold:
+            return False
+        
+        context.search_path["exit"] = "low_score"
+        context.search_path["reranked"] = 0
+        return True
+    
+    def _rerank_depths(
+        self,
+        contexts: List[QueryContext],
+        all_docs: List[List[Dict]]
+    ) -> List[int]:
+        """Decide how many candidates of each query go through the cross-encoder."""
+        depths = []
+        for context, combined_docs in zip(contexts, all_docs):
+            top = combined_docs[:self.final_results]
+            
+            if not top:
+                exit_reason = "empty"
+            elif max(doc["similarity"] for doc in top) < self.relevance_threshold:
+                # Reranking only reorders these, so the relevance check fails regardless
+                exit_reason = "low_score"
+            elif self._signals_agree(combined_docs):
+                exit_reason = "agreement"
+            else:
+                exit_reason = "rerank"
+            
+            context.search_path["exit"] = exit_reason
+            depths.append(len(top) if exit_reason == "rerank" else 0)
+        
+        # Rerank pairs of the batch are scored together, so all must fit the tightest deadline
+        reranked = [row for row, depth in enumerate(depths) if depth]
+        budgets = [
+            contexts[row].remaining() for row in reranked
+            if contexts[row].deadline is not None
+        ]
+        if budgets:
+            # Leave headroom for fusion and formatting after the rerank
+            affordable = int(0.8 * min(budgets) / (self.reranker.pair_seconds * len(reranked)))
+            for row in reranked:
+                if affordable < depths[row]:
+                    depths[row] = affordable
+                    contexts[row].search_path["degraded"] = True
+                # A single reranked candidate cannot be normalized against others
+                if depths[row] < 2:
+                    depths[row] = 0
+                    contexts[row].search_path["exit"] = "deadline"
+        
+        for context, depth in zip(contexts, depths):
+            context.search_path["reranked"] = depth
+        return depths
+    
+    def _signals_agree(self, combined_docs: List[Dict]) -> bool:
+        """Whether dense and sparse both rank the same candidate first by a clear margin."""
+        top = combined_docs[0]["scores"]
+        if top["dense"] < 1.0 or top["sparse"] < 1.0:
+            return False
+        if len(combined_docs) < 2:
+            return True
+        return top["combined"] - combined_docs[1]["scores"]["combined"] >= self.rerank_skip_margin
+    
+    def _combine(
+        self,
+        context: QueryContext,
+        index: SourceIndex,
+        dense_scores: np.ndarray,
+        dense_indices: np.ndarray
+    ) -> List[Dict]:
+        """Merge dense hits with sparse hits, sorted by combined score."""
+        query_embedding = context.dense_embedding
+        query_sparse = context.sparse_embedding
+        
+        _, sparse_indices = index.sparse_search(query_sparse, self.sparse_k)
+        
+        # Union of candidates, dense hits first
+        sparse_only = np.setdiff1d(sparse_indices, dense_indices, assume_unique=True)
+        indices = np.concatenate([dense_indices, sparse_only]).astype(np.int64)
+        
+        # Score every candidate on both signals
+        dense_scores = np.concatenate([
+            dense_scores,
+            index.dense_scores(query_embedding, sparse_only)
+        ])
+        sparse_scores = index.sparse_scores(query_sparse, indices)
+        
+        # Normalize scores
+        norm_dense = self.normalize_scores(dense_scores.tolist())
+        norm_sparse = self.normalize_scores(sparse_scores.tolist())
+        
+        # Combine dense and sparse scores
+        combined_docs = []
+        
+        for i, idx in enumerate(indices):
+            combined_score = (
+                self.dense_weight * norm_dense[i] +
+                self.sparse_weight * norm_sparse[i]
+            )
+            
+            combined_docs.append({
+                "index": int(idx),
+                # Raw inner product, i.e. cosine similarity of normalized embeddings
+                "similarity": float(dense_scores[i]),
+                "scores": {
+                    "dense": norm_dense[i],
+                    "sparse": norm_sparse[i],
+                    "combined": combined_score
+                }
+            })
+        
+        # Sort by combined score; the top 20 are reranked
+        combined_docs.sort(key=lambda x: x["scores"]["combined"], reverse=True)
+        return combined_docs
+    
+    def _finalize(
+        self,
+        combined_docs: List[Dict],
+        top_texts: List[str],
+        rerank_scores: Optional[List[float]]
+    ) -> List[Dict]:
+        """Blend rerank scores into the top candidates and sort them.
+        
+        Without rerank scores the combined score is final. Candidates
+        beyond a shortened rerank get a rerank score of zero.
+        """
+        norm_rerank = self.normalize_scores(rerank_scores) if rerank_scores else []
+        
+        # Final scoring
+        final_results = []
+        for i, (doc, text) in enumerate(zip(combined_docs[:self.final_results], top_texts)):
+            if rerank_scores is None:
+                rerank_score = 0.0
+                final_score = doc["scores"]["combined"]
+            else:
+                rerank_score = norm_rerank[i] if i < len(norm_rerank) else 0.0
                 final_score = (
                     (1 - self.rerank_weight) * doc["scores"]["combined"] +
                     self.rerank_weight * rerank_score
                 )
-                
-                doc["scores"]["rerank"] = rerank_score
-                doc["scores"]["final"] = final_score
-                final_results.append(doc)
             
-            # Sort by final score
-            final_results.sort(key=lambda x: x["scores"]["final"], reverse=True)
-            
-            return final_results
-            
-        except Exception as e:
-            logger.error(f"Error in hybrid search: {str(e)}")
-            raise
\ No newline at end of file
+            doc["text"] = text
+            doc["scores"]["rerank"] = rerank_score
+            doc["scores"]["final"] = final_score
+            final_results.append(doc)
+        
+        # Sort by final score
+        final_results.sort(key=lambda x: x["scores"]["final"], reverse=True)
+        
+        return final_results
\ No newline at end of file
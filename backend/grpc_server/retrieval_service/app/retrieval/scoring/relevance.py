@@ -1,10 +1,11 @@
-import torch
 import nltk
-from typing import List, Tuple, Dict, Set
+import numpy as np
+from typing import List, Tuple, Dict, Optional, Set
 from nltk.corpus import stopwords
 from ...core.config import Config
 from ...core.singleton import Singleton
 from ...utils.logger import logger
+from ..query_context import QueryContext
 
 class RelevanceChecker(metaclass=Singleton):
     """Check relevance of search results."""
@@ -30,9 +31,15 @@ class RelevanceChecker(metaclass=Singleton):
             if word not in self.stop_words
         )
     
-    def compute_term_overlap(self, query: str, text: str) -> float:
+    def compute_term_overlap(
+        self,
+        query: str,
+        text: str,
+        query_terms: Optional[Set[str]] = None
+    ) -> float:
         """Compute term overlap between query and text."""
-        query_terms = self.normalize_text(query)
+        if query_terms is None:
+            query_terms = self.normalize_text(query)
         doc_terms = self.normalize_text(text)
         
         if not query_terms:
@@ -42,49 +49,45 @@ class RelevanceChecker(metaclass=Singleton):
     
     def compute_semantic_similarity(
         self,
-        query_embedding: torch.Tensor,
-        doc_embedding: torch.Tensor
+        query_embedding: np.ndarray,
+        doc_embedding: np.ndarray
     ) -> float:
         """Compute semantic similarity between query and document."""
-        # Convert to tensor if needed and move to correct device
-        if not isinstance(query_embedding, torch.Tensor):
-            query_embedding = torch.tensor(query_embedding, device=self.device)
-        if not isinstance(doc_embedding, torch.Tensor):
-            doc_embedding = torch.tensor(doc_embedding, device=self.device)
-            
-        # Ensure they're float32
-        query_embedding = query_embedding.float()
-        doc_embedding = doc_embedding.float()
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        doc_embedding = np.asarray(doc_embedding, dtype=np.float32)
+        
+        norm = np.linalg.norm(query_embedding) * np.linalg.norm(doc_embedding)
+        if norm == 0:
+            return 0.0
         
-        return torch.nn.functional.cosine_similarity(
-            query_embedding.unsqueeze(0),
-            doc_embedding.unsqueeze(0)
-        ).item()
+        return float(query_embedding @ doc_embedding / norm)
     
     def check_relevance(
         self,
-        query: str,
-        results: List[Dict],
-        query_embedding: torch.Tensor,
-        doc_embeddings: torch.Tensor
+        context: QueryContext,
+        results: List[Dict]
     ) -> Tuple[bool, float]:
-        """Check if search results are relevant to the query."""
+        """Check if search results are relevant to the query.
+        
+        The semantic similarity of the top result is the dense score the
+        search already computed, so no vectors are needed here.
+        """
         if not results:
             return False, 0.0
         
         # Get top result
         top_result = results[0]
         top_text = top_result['text']
-        top_idx = top_result['index']
         
-        # Compute semantic similarity
-        similarity = self.compute_semantic_similarity(
-            query_embedding,
-            doc_embeddings[top_idx]
-        )
+        # Embeddings are normalized, so the inner product is the cosine similarity
+        similarity = top_result['similarity']
         
         # Compute term overlap
-        term_overlap = self.compute_term_overlap(query, top_text)
+        term_overlap = self.compute_term_overlap(
+            context.query,
+            top_text,
+            context.query_terms
+        )
         
         # Log relevance metrics
         logger.info(
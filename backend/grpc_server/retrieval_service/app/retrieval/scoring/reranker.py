@@ -1,33 +1,230 @@
-from typing import List
+import hashlib
+import time
+import numpy as np
+from typing import List, Optional, Sequence
 from fastembed.rerank.cross_encoder import TextCrossEncoder
+from tokenizers import Tokenizer
+from ...cache import LRUCache
 from ...core.config import Config
 from ...core.singleton import Singleton
 from ...utils.logger import logger
+from ..query_context import QueryContext
+from ..source_index import SourceIndex
 
 class Reranker(metaclass=Singleton):
-    """Rerank search results using cross-encoder."""
-    
+    """Rerank search results using cross-encoder.
+
+    Scores are cached per (query, chunk, index version). When chunks were
+    pretokenized at ingest, only the query is tokenized at rerank time and
+    the model inputs are assembled from the stored token ids.
+    """
+
     def __init__(self):
         self.config = Config()
         self.model_name = self.config.model_configs["reranker"]["model_name"]
-        
+
         logger.info(f"Initializing reranker with model {self.model_name}")
         self.model = TextCrossEncoder(model_name=self.model_name)
-    
-    def rerank(self, query: str, texts: List[str], top_k: int = 10) -> List[float]:
-        """Rerank texts based on relevance to query."""
+        self.batch_size = self.config.model_configs["reranker"].get("batch_size", 64)
+        
+        # Running estimate of seconds per scored pair, used to plan rerank depth
+        self.pair_seconds = self.config.scoring_configs["rerank_pair_ms"] / 1000
+
+        cache_config = self.config.serving_configs["rerank_cache"]
+        self.score_cache = LRUCache(
+            max_entries=cache_config["max_entries"],
+            sizeof=lambda score: 1
+        ) if cache_config["enabled"] else None
+
+        self._setup_tokenizer()
+
+    def _setup_tokenizer(self) -> None:
+        """Prepare the pretokenized path if the model's tokenizer supports it."""
+        self.tokenizer: Optional[Tokenizer] = None
+
         try:
-            if not texts:
-                return []
+            encoder = self.model.model
+            tokenizer = Tokenizer.from_str(encoder.tokenizer.to_str())
+            tokenizer.no_padding()
+
+            self.max_length = encoder.tokenizer.truncation["max_length"]
+            self.pad_id = encoder.tokenizer.padding["pad_id"]
+            self.cls_id = tokenizer.token_to_id("[CLS]")
+            self.sep_id = tokenizer.token_to_id("[SEP]")
+            self.tokenizer = tokenizer
+
+            # Only use stored ids if pairs assemble exactly like the tokenizer does
+            query, text = "reranker self check", "pairs are assembled from stored token ids"
+            expected = encoder.tokenizer.encode(query, text)
+            ids, type_ids = self._assemble(self.tokenize(query), self.tokenize(text))
+            if ids != expected.ids or type_ids != expected.type_ids:
+                raise ValueError("pair layout differs from the tokenizer")
+        except Exception as e:
+            logger.info(f"Reranker will tokenize chunk texts at query time: {str(e)}")
+            self.tokenizer = None
+
+    @property
+    def supports_pretokenized(self) -> bool:
+        return self.tokenizer is not None
+
+    def tokenize(self, text: str) -> np.ndarray:
+        """Token ids of a text without special tokens."""
+        return np.asarray(
+            self.tokenizer.encode(text, add_special_tokens=False).ids,
+            dtype=np.int32
+        )
+
+    def tokenize_documents(self, texts: List[str]) -> Optional[List[np.ndarray]]:
+        """Pretokenize chunk texts at ingest, or None if unsupported."""
+        if not self.supports_pretokenized:
+            return None
+
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [np.asarray(encoding.ids, dtype=np.int32) for encoding in encodings]
+
+    def _assemble(self, query_ids: np.ndarray, doc_ids: np.ndarray) -> tuple:
+        """Build ``[CLS] query [SEP] doc [SEP]`` with longest-first truncation."""
+        budget = self.max_length - 3
+        n_query, n_doc = len(query_ids), len(doc_ids)
+
+        if n_query + n_doc > budget:
+            half = budget // 2
+            if min(n_query, n_doc) <= half:
+                if n_query <= n_doc:
+                    n_doc = budget - n_query
+                else:
+                    n_query = budget - n_doc
+            elif n_query > n_doc:
+                n_query, n_doc = budget - half, half
+            else:
+                n_query, n_doc = half, budget - half
+
+        ids = (
+            [self.cls_id] + query_ids[:n_query].tolist() + [self.sep_id] +
+            doc_ids[:n_doc].tolist() + [self.sep_id]
+        )
+        type_ids = [0] * (n_query + 2) + [1] * (n_doc + 1)
+        return ids, type_ids
+
+    def _score_tokens(self, pairs: List[tuple]) -> List[float]:
+        """Run the cross-encoder on pretokenized ``(query_ids, doc_ids)`` pairs."""
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            scores.extend(self._score_token_batch(pairs[start:start + self.batch_size]))
+        return scores
+
+    def _score_token_batch(self, pairs: List[tuple]) -> List[float]:
+        encoder = self.model.model
+        pairs = [self._assemble(query_ids, doc_ids) for query_ids, doc_ids in pairs]
+        length = max(len(ids) for ids, _ in pairs)
+
+        input_ids = np.full((len(pairs), length), self.pad_id, dtype=np.int64)
+        token_type_ids = np.zeros((len(pairs), length), dtype=np.int64)
+        attention_mask = np.zeros((len(pairs), length), dtype=np.int64)
+
+        for row, (ids, type_ids) in enumerate(pairs):
+            input_ids[row, :len(ids)] = ids
+            token_type_ids[row, :len(ids)] = type_ids
+            attention_mask[row, :len(ids)] = 1
+
+        input_names = {node.name for node in encoder.model.get_inputs()}
+        inputs = {"input_ids": input_ids}
+        if "token_type_ids" in input_names:
+            inputs["token_type_ids"] = token_type_ids
+        if "attention_mask" in input_names:
+            inputs["attention_mask"] = attention_mask
+
+        outputs = encoder.model.run(encoder.ONNX_OUTPUT_NAMES, inputs)
+        return [float(score) for score in outputs[0][:, 0]]
+
+    def rerank(
+        self,
+        context: QueryContext,
+        texts: List[str],
+        top_k: int = 10,
+        index: Optional[SourceIndex] = None,
+        chunk_ids: Optional[Sequence[int]] = None
+    ) -> List[float]:
+        """Rerank texts based on relevance to query.
+
+        With ``index`` and the ``chunk_ids`` of the texts, scores are cached
+        and stored chunk token ids are used when available.
+        """
+        return self.rerank_batch(
+            [context],
+            [texts],
+            top_k,
+            index,
+            [chunk_ids] if chunk_ids is not None else None
+        )[0]
+
+    def rerank_batch(
+        self,
+        contexts: List[QueryContext],
+        texts: List[List[str]],
+        top_k: int = 10,
+        index: Optional[SourceIndex] = None,
+        chunk_ids: Optional[List[Sequence[int]]] = None
+    ) -> List[List[float]]:
+        """Rerank the texts of several queries, scoring all pairs in shared batches."""
+        try:
+            scores: List[List[Optional[float]]] = [[None] * len(docs) for docs in texts]
+            keys = None
+
+            if index is not None and chunk_ids is not None and self.score_cache is not None:
+                keys = []
+                for row, context in enumerate(contexts):
+                    query_hash = hashlib.sha1(context.query.encode("utf-8")).hexdigest()
+                    keys.append([
+                        (query_hash, index.source.value, index.version, int(chunk_id))
+                        for chunk_id in chunk_ids[row]
+                    ])
+                    scores[row] = [self.score_cache.get(key) for key in keys[row]]
+
+            missing = [
+                (row, i)
+                for row, row_scores in enumerate(scores)
+                for i, score in enumerate(row_scores)
+                if score is None
+            ]
+
+            if missing:
+                logger.info(f"Reranking {len(missing)} texts for {len(contexts)} queries")
+
+                pretokenized = (
+                    self.supports_pretokenized
+                    and index is not None
+                    and chunk_ids is not None
+                    and index.tokenizer == self.model_name
+                )
+
+                # Get reranking scores
+                started = time.perf_counter()
+                if pretokenized:
+                    for row in {row for row, _ in missing}:
+                        if contexts[row].rerank_tokens is None:
+                            contexts[row].rerank_tokens = self.tokenize(contexts[row].query)
+                    new_scores = self._score_tokens([
+                        (contexts[row].rerank_tokens, index.tokens(int(chunk_ids[row][i])))
+                        for row, i in missing
+                    ])
+                else:
+                    new_scores = list(self.model.rerank_pairs(
+                        [(contexts[row].query, texts[row][i]) for row, i in missing],
+                        batch_size=self.batch_size
+                    ))
+
+                elapsed = time.perf_counter() - started
+                self.pair_seconds = 0.8 * self.pair_seconds + 0.2 * elapsed / len(missing)
                 
-            logger.info(f"Reranking {len(texts)} texts")
-            
-            # Get reranking scores
-            rerank_scores = list(self.model.rerank(query, texts))
-            
+                for (row, i), score in zip(missing, new_scores):
+                    scores[row][i] = score
+                    if keys is not None:
+                        self.score_cache.put(keys[row][i], score)
+
             # Return top_k scores
-            return rerank_scores[:top_k]
-            
+            return [row_scores[:top_k] for row_scores in scores]
+
         except Exception as e:
             logger.error(f"Error during reranking: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,430 @@
+import faiss
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Union
+from ..core.config import Config
+from ..core.enums import DocSource
+from ..storage import ChunkStore, CSRMatrix, InvertedIndex
+from ..storage.arrays import resident_nbytes
+from .embeddings.index_factory import base_index, binarize, configure_index, hamming_to_similarity, stores_exact_vectors
+
+class IndexSegment:
+    """Immutable part of a source: some chunks with their stable ids.
+
+    Rows of a segment never change. Chunks are deleted by tombstoning
+    their ids and new chunks go into new segments, so a chunk keeps its id
+    when segments are merged.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ids: np.ndarray,
+        chunks: ChunkStore,
+        dense_index: Union[faiss.Index, faiss.IndexBinary],
+        sparse_embeddings: CSRMatrix,
+        dense_vectors: Optional[np.ndarray] = None,
+        inverted_index: Optional[InvertedIndex] = None,
+        dense_index_mapped: bool = False,
+        chunk_hashes: Optional[np.ndarray] = None,
+        index_config: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        # Chunk id of every row, ascending
+        self.ids = ids
+        self.chunks = chunks
+
+        # ID-mapped indexes return chunk ids, older single-build indexes rows
+        self.id_mapped = isinstance(dense_index, (faiss.IndexIDMap, faiss.IndexBinaryIDMap))
+        self.dense_index = configure_index(dense_index, index_config or {})
+        # Vectors are reconstructed by row from the index inside the ID map
+        self.row_index = base_index(self.dense_index)
+        self.dense_index_mapped = dense_index_mapped
+        self.dense_vectors = dense_vectors
+
+        self.sparse_embeddings = sparse_embeddings
+        self.inverted_index = inverted_index or InvertedIndex.build(sparse_embeddings)
+
+        # Text hashes of the chunks, used by incremental ingestion
+        self.chunk_hashes = chunk_hashes
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any], index_config: Dict[str, Any]) -> "IndexSegment":
+        """Create a segment from one entry of ``DataManager.load_data``."""
+        return cls(
+            data["name"],
+            data["ids"],
+            data["chunks"],
+            data["dense_index"],
+            data["sparse_embeddings"],
+            data.get("dense_vectors"),
+            data.get("inverted_index"),
+            data.get("dense_index_mapped", False),
+            data.get("chunk_hashes"),
+            index_config
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> int:
+        return self.dense_index.d
+
+    @property
+    def is_binary(self) -> bool:
+        return isinstance(self.dense_index, faiss.IndexBinary)
+
+    @property
+    def exact_vectors(self) -> bool:
+        """Whether ``get_vectors`` returns vectors that can be indexed again without losing precision.
+
+        fp16 copies round the same way every time, while codes of quantized
+        indexes would be quantized once more.
+        """
+        return self.dense_vectors is not None or stores_exact_vectors(self.dense_index)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident memory; memory-mapped data is not counted."""
+        index = self.row_index
+        if self.dense_index_mapped:
+            dense_bytes = 0
+        elif self.is_binary:
+            dense_bytes = index.ntotal * index.code_size
+        else:
+            try:
+                dense_bytes = index.ntotal * index.sa_code_size()
+            except RuntimeError:
+                dense_bytes = index.ntotal * index.d * 4
+        if self.id_mapped:
+            dense_bytes += len(self) * 8
+
+        return (
+            dense_bytes + self.chunks.nbytes +
+            self.sparse_embeddings.nbytes + self.inverted_index.nbytes +
+            resident_nbytes(self.ids, self.dense_vectors, self.chunk_hashes)
+        )
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row positions of chunk ids stored in this segment."""
+        return np.searchsorted(self.ids, ids)
+
+    def dense_search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int,
+        live: np.ndarray,
+        n_deleted: int,
+        rescore_factor: int
+    ) -> List[tuple]:
+        """Top-k ``(scores, ids)`` of live chunks for each query."""
+        # Quantized indexes fetch a deeper list for full-precision rescoring
+        rescore = self.dense_vectors is not None
+        depth = k * rescore_factor if rescore else k
+        # Deleted chunks are still in the index and may take up some of the hits
+        depth = min(depth + n_deleted, len(self))
+
+        if self.is_binary:
+            distances, all_labels = self.dense_index.search(binarize(query_embeddings), depth)
+            all_scores = hamming_to_similarity(distances, self.dimension)
+        else:
+            all_scores, all_labels = self.dense_index.search(query_embeddings, depth)
+
+        results = []
+        for query_embedding, scores, labels in zip(query_embeddings, all_scores, all_labels):
+            # FAISS pads missing results with -1
+            valid = labels >= 0
+            scores, labels = scores[valid], labels[valid]
+
+            rows = self.rows(labels) if self.id_mapped else labels
+            alive = live[rows]
+            scores, rows = scores[alive], rows[alive]
+
+            if rescore:
+                scores = self.dense_scores(query_embedding, rows)
+                top = np.argsort(-scores, kind="stable")
+                scores, rows = scores[top], rows[top]
+
+            results.append((scores[:k], self.ids[rows[:k]]))
+
+        return results
+
+    def get_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Fetch float32 vectors for the given rows only."""
+        rows = np.asarray(rows, dtype=np.int64)
+
+        if self.dense_vectors is not None:
+            return self.dense_vectors[rows].astype(np.float32)
+        if self.is_binary:
+            # Sign codes approximate a unit vector
+            codes = np.stack([self.row_index.reconstruct(int(i)) for i in rows])
+            bits = np.unpackbits(codes, axis=1)
+            return (bits.astype(np.float32) * 2 - 1) / np.sqrt(self.dimension)
+
+        return self.row_index.reconstruct_batch(rows)
+
+    def dense_scores(self, query_embedding: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.float32)
+        return self.get_vectors(rows) @ query_embedding.astype(np.float32)
+
+class SourceIndex:
+    """Searchable, read-only data of one documentation source.
+
+    A source is a list of immutable segments plus the ids of deleted
+    chunks. Chunks are addressed by stable ids rather than positions, and
+    searches fan out over the segments, skip deleted chunks and merge the
+    per-segment results. Each loaded source gets its own bundle, while the
+    embedding and reranking models are shared between them.
+    """
+
+    def __init__(
+        self,
+        source: DocSource,
+        segments: List[IndexSegment],
+        deleted: Optional[np.ndarray] = None,
+        version: str = "",
+        next_id: Optional[int] = None
+    ):
+        self.source = source
+        # Changes whenever the source is rebuilt
+        self.version = version
+        self.index_config = Config().get_index_config(source.value)
+
+        # Segments in ascending id order
+        self.segments = segments
+        self.deleted = np.unique(np.asarray(deleted if deleted is not None else [], dtype=np.int64))
+        if next_id is None:
+            next_id = max([int(segment.ids[-1]) + 1 for segment in segments if len(segment)] + [0])
+        self.next_id = next_id
+
+        # Rows of each segment that are not deleted
+        self.live = [
+            ~np.isin(segment.ids, self.deleted) if self.deleted.size
+            else np.ones(len(segment), dtype=bool)
+            for segment in segments
+        ]
+        self.n_deleted = [int(len(segment) - live.sum()) for segment, live in zip(segments, self.live)]
+
+        # First id of every segment, to find the segment holding an id
+        self._first_ids = np.array(
+            [segment.ids[0] if len(segment) else np.iinfo(np.int64).max for segment in segments],
+            dtype=np.int64
+        )
+
+    @classmethod
+    def from_data(
+        cls,
+        source: DocSource,
+        data: Dict[str, Any],
+        loaded: Optional[Dict[str, IndexSegment]] = None
+    ) -> "SourceIndex":
+        """Create a bundle from the output of ``DataManager.load_data``.
+
+        Segments found in ``loaded`` are reused instead of being created
+        from the data.
+        """
+        loaded = loaded or {}
+        index_config = Config().get_index_config(source.value)
+
+        segments = [
+            loaded[segment["name"]] if segment["name"] in loaded
+            else IndexSegment.from_data(segment, index_config)
+            for segment in data["segments"]
+        ]
+        return cls(
+            source,
+            segments,
+            data.get("deleted"),
+            data.get("version", ""),
+            data.get("next_id")
+        )
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments) - sum(self.n_deleted)
+
+    @property
+    def dimension(self) -> int:
+        return self.segments[0].dimension if self.segments else 0
+
+    @property
+    def is_binary(self) -> bool:
+        return bool(self.segments) and self.segments[0].is_binary
+
+    @property
+    def has_dense_vectors(self) -> bool:
+        """Whether full-precision vectors are stored next to the index."""
+        return all(segment.dense_vectors is not None for segment in self.segments)
+
+    @property
+    def exact_vectors(self) -> bool:
+        """Whether the vectors of every segment can be reused without compounding quantization error."""
+        return all(segment.exact_vectors for segment in self.segments)
+
+    @property
+    def tokenizer(self) -> Optional[str]:
+        """Tokenizer of the stored chunk token ids, if all segments share one."""
+        tokenizers = {segment.chunks.tokenizer for segment in self.segments}
+        return tokenizers.pop() if len(tokenizers) == 1 else None
+
+    @property
+    def urls(self) -> List[str]:
+        """Distinct page URLs of the live chunks."""
+        urls = {}
+        for segment, live in zip(self.segments, self.live):
+            for url_id in np.unique(segment.chunks.url_ids[live]):
+                urls.setdefault(segment.chunks.urls[url_id])
+        return list(urls)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident memory of the bundle.
+
+        Memory-mapped data lives in the page cache, where it is shared with
+        other processes and can be reclaimed, so it is not counted.
+        """
+        return (
+            sum(segment.nbytes for segment in self.segments) +
+            sum(live.nbytes for live in self.live) + self.deleted.nbytes
+        )
+
+    def chunk_ids(self) -> np.ndarray:
+        """Ids of all live chunks."""
+        return np.concatenate(
+            [np.empty(0, dtype=np.int64)] +
+            [np.asarray(segment.ids)[live] for segment, live in zip(self.segments, self.live)]
+        )
+
+    def text(self, idx: int) -> str:
+        return self.texts([idx])[0]
+
+    def texts(self, indices: List[int]) -> List[str]:
+        texts = [""] * len(indices)
+        for segment, positions, rows in self._by_segment(indices):
+            for position, text in zip(positions, segment.chunks.texts(rows)):
+                texts[position] = text
+        return texts
+
+    def url(self, idx: int) -> str:
+        found = self._find(idx)
+        if found is None:
+            return ""
+        segment, row = found
+        return segment.chunks.url(row)
+
+    def tokens(self, idx: int) -> Optional[np.ndarray]:
+        """Stored reranker token ids of a chunk."""
+        found = self._find(idx)
+        if found is None:
+            return None
+        segment, row = found
+        return segment.chunks.tokens(row)
+
+    def sparse_row(self, idx: int) -> tuple:
+        """``(indices, values)`` of a chunk's sparse embedding."""
+        found = self._find(idx)
+        if found is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        segment, row = found
+        return segment.sparse_embeddings.row(row)
+
+    def dense_search(self, query_embedding: np.ndarray, k: int) -> tuple:
+        """Return the top-k ``(scores, indices)`` from the dense index."""
+        return self.dense_search_batch(query_embedding.reshape(1, -1), k)[0]
+
+    def dense_search_batch(self, query_embeddings: np.ndarray, k: int) -> List[tuple]:
+        """Search every segment for many queries and merge the top-k per query."""
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+
+        per_segment = [
+            segment.dense_search_batch(
+                query_embeddings,
+                k,
+                live,
+                n_deleted,
+                self.index_config["rescore_factor"]
+            )
+            for segment, live, n_deleted in zip(self.segments, self.live, self.n_deleted)
+            if len(segment) > n_deleted
+        ]
+
+        return [
+            self._merge([results[row] for results in per_segment], k)
+            for row in range(len(query_embeddings))
+        ]
+
+    def get_vectors(self, indices: List[int]) -> np.ndarray:
+        """Fetch float32 vectors for the given chunks only."""
+        vectors = np.empty((len(indices), self.dimension), dtype=np.float32)
+        for segment, positions, rows in self._by_segment(indices):
+            vectors[positions] = segment.get_vectors(rows)
+        return vectors
+
+    def dense_scores(self, query_embedding: np.ndarray, indices: List[int]) -> np.ndarray:
+        """Inner-product scores of a query against the given chunks."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size == 0:
+            return np.empty(0, dtype=np.float32)
+
+        return self.get_vectors(indices) @ query_embedding.astype(np.float32)
+
+    def sparse_search(self, query_sparse: Any, k: int) -> tuple:
+        """Return the top-k ``(scores, indices)`` from the inverted indexes."""
+        results = []
+        for segment, live, n_deleted in zip(self.segments, self.live, self.n_deleted):
+            scores, rows = segment.inverted_index.search(
+                query_sparse.indices,
+                query_sparse.values,
+                k + n_deleted
+            )
+            alive = live[rows]
+            results.append((scores[alive][:k], np.asarray(segment.ids)[rows[alive][:k]]))
+
+        return self._merge(results, k)
+
+    def sparse_scores(self, query_sparse: Any, indices: List[int]) -> np.ndarray:
+        """Sparse dot products of a query against the given chunks."""
+        scores = np.zeros(len(indices), dtype=np.float32)
+        for segment, positions, rows in self._by_segment(indices):
+            scores[positions] = segment.sparse_embeddings.dot(
+                rows,
+                query_sparse.indices,
+                query_sparse.values
+            )
+        return scores
+
+    @staticmethod
+    def _merge(results: List[tuple], k: int) -> tuple:
+        """Merge per-segment ``(scores, ids)`` into the overall top-k."""
+        if len(results) == 1:
+            return results[0]
+
+        scores = np.concatenate([np.empty(0, dtype=np.float32)] + [scores for scores, _ in results])
+        ids = np.concatenate([np.empty(0, dtype=np.int64)] + [ids for _, ids in results])
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return scores[top], ids[top]
+
+    def _by_segment(self, indices: List[int]) -> Iterator[tuple]:
+        """Group chunk ids by segment as ``(segment, positions, rows)``."""
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if indices.size == 0:
+            return
+
+        numbers = np.searchsorted(self._first_ids, indices, side="right") - 1
+        for number in np.unique(numbers):
+            positions = np.flatnonzero(numbers == number)
+            segment = self.segments[number]
+            yield segment, positions, segment.rows(indices[positions])
+
+    def _find(self, idx: int) -> Optional[tuple]:
+        """The ``(segment, row)`` holding a chunk id, if any."""
+        number = int(np.searchsorted(self._first_ids, idx, side="right")) - 1
+        if number < 0:
+            return None
+
+        segment = self.segments[number]
+        row = int(segment.rows(idx))
+        if row >= len(segment) or segment.ids[row] != idx:
+            return None
+        return segment, row
@@ -1,3 +1,6 @@
 from .data_manager import DataManager
+from .chunk_store import ChunkStore
+from .sparse_matrix import CSRMatrix
+from .inverted_index import InvertedIndex
 
-__all__ = ['DataManager']
\ No newline at end of file
+__all__ = ['DataManager', 'ChunkStore', 'CSRMatrix', 'InvertedIndex']
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+def save_arrays(directory: Union[str, Path], **arrays: np.ndarray) -> None:
+    """Save each array as its own ``.npy`` file so it can be memory-mapped."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", array)
+
+def load_arrays(
+    directory: Union[str, Path],
+    names: Iterable[str],
+    mmap_mode: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """Load arrays written by :func:`save_arrays`, optionally memory-mapped."""
+    directory = Path(directory)
+    return {
+        name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+        for name in names
+    }
+
+def resident_nbytes(*arrays: Optional[np.ndarray]) -> int:
+    """Bytes held in process memory, excluding memory-mapped arrays."""
+    total = 0
+
+    for array in arrays:
+        if array is None:
+            continue
+
+        # Views of a memmap keep it as their base
+        base = array
+        while isinstance(base, np.ndarray) and not isinstance(base, np.memmap):
+            base = base.base
+        if not isinstance(base, np.memmap):
+            total += array.nbytes
+
+    return total
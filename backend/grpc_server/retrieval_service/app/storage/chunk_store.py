@@ -0,0 +1,240 @@
+import json
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Union
+from .arrays import load_arrays, resident_nbytes, save_arrays
+
+COMPRESSIONS = (None, "zstd")
+
+class ChunkStore:
+    """Offset-indexed, memory-mappable storage for chunk texts and URLs.
+
+    All chunks live in one UTF-8 blob addressed by an offsets array, and
+    each chunk points into a table of distinct URLs. With compression the
+    blob is split into zstd frames of ``block_size`` chunks, so reading a
+    chunk only decompresses its own block. Token ids of the reranker's
+    tokenizer can be stored alongside the texts the same way.
+    """
+
+    ARRAYS = ("offsets", "url_ids")
+
+    # Decompressed blocks kept around for neighbouring lookups
+    CACHED_BLOCKS = 64
+
+    def __init__(
+        self,
+        blob: np.ndarray,
+        offsets: np.ndarray,
+        url_ids: np.ndarray,
+        urls: List[str],
+        compression: Optional[str] = None,
+        block_size: int = 0,
+        block_offsets: Optional[np.ndarray] = None,
+        token_ids: Optional[np.ndarray] = None,
+        token_offsets: Optional[np.ndarray] = None,
+        tokenizer: Optional[str] = None
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown chunk compression: {compression}")
+
+        self.blob = blob
+        self.offsets = offsets
+        self.url_ids = url_ids
+        self.urls = urls
+
+        self.compression = compression
+        self.block_size = block_size
+        self.block_offsets = block_offsets
+
+        self.token_ids = token_ids
+        self.token_offsets = token_offsets
+        # Name of the model whose tokenizer produced the token ids
+        self.tokenizer = tokenizer if token_ids is not None else None
+
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(
+        cls,
+        chunks: Sequence[str],
+        chunk_urls: Sequence[str],
+        compression: Optional[str] = None,
+        block_size: int = 64,
+        chunk_tokens: Optional[Sequence[np.ndarray]] = None,
+        tokenizer: Optional[str] = None
+    ) -> "ChunkStore":
+        """Pack chunk texts, their page URLs and optional token ids into a store."""
+        if len(chunks) != len(chunk_urls):
+            raise ValueError("Every chunk needs exactly one URL")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown chunk compression: {compression}")
+
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+
+        url_table = {}
+        url_ids = np.fromiter(
+            (url_table.setdefault(url, len(url_table)) for url in chunk_urls),
+            dtype=np.int32,
+            count=len(chunk_urls)
+        )
+
+        block_offsets = None
+        if compression == "zstd":
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor()
+            frames = [
+                compressor.compress(b"".join(encoded[start:start + block_size]))
+                for start in range(0, len(encoded), block_size)
+            ]
+            block_offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+            np.cumsum([len(frame) for frame in frames], out=block_offsets[1:])
+            data = b"".join(frames)
+        else:
+            data = b"".join(encoded)
+
+        token_ids = token_offsets = None
+        if chunk_tokens is not None:
+            token_offsets = np.zeros(len(chunk_tokens) + 1, dtype=np.int64)
+            np.cumsum([len(tokens) for tokens in chunk_tokens], out=token_offsets[1:])
+            token_ids = (
+                np.concatenate(chunk_tokens).astype(np.int32)
+                if len(chunk_tokens) else np.empty(0, dtype=np.int32)
+            )
+
+        return cls(
+            np.frombuffer(data, dtype=np.uint8),
+            offsets,
+            url_ids,
+            list(url_table),
+            compression,
+            block_size if compression else 0,
+            block_offsets,
+            token_ids,
+            token_offsets,
+            tokenizer
+        )
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap_mode: Optional[str] = None) -> "ChunkStore":
+        """Load a store written by :meth:`save`, optionally memory-mapped."""
+        directory = Path(directory)
+
+        with open(directory / "meta.json", "r") as f:
+            meta = json.load(f)
+
+        names = cls.ARRAYS + (("block_offsets",) if meta["compression"] else ())
+        if meta.get("tokenizer"):
+            names += ("token_ids", "token_offsets")
+        arrays = load_arrays(directory, names, mmap_mode)
+
+        if (directory / "text.bin").stat().st_size == 0:
+            # Empty files cannot be mapped
+            blob = np.empty(0, dtype=np.uint8)
+        elif mmap_mode:
+            blob = np.memmap(directory / "text.bin", dtype=np.uint8, mode=mmap_mode)
+        else:
+            blob = np.fromfile(directory / "text.bin", dtype=np.uint8)
+
+        return cls(
+            blob,
+            arrays["offsets"],
+            arrays["url_ids"],
+            meta["urls"],
+            meta["compression"],
+            meta["block_size"],
+            arrays.get("block_offsets"),
+            arrays.get("token_ids"),
+            arrays.get("token_offsets"),
+            meta.get("tokenizer")
+        )
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """Save the blob, index arrays and URL table."""
+        directory = Path(directory)
+
+        arrays = {"offsets": self.offsets, "url_ids": self.url_ids}
+        if self.compression:
+            arrays["block_offsets"] = self.block_offsets
+        if self.tokenizer:
+            arrays["token_ids"] = self.token_ids
+            arrays["token_offsets"] = self.token_offsets
+        save_arrays(directory, **arrays)
+
+        self.blob.tofile(directory / "text.bin")
+
+        with open(directory / "meta.json", "w") as f:
+            json.dump({
+                "compression": self.compression,
+                "block_size": self.block_size,
+                "tokenizer": self.tokenizer,
+                "urls": self.urls
+            }, f)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self.text(idx)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in memory; memory-mapped arrays are not counted."""
+        return (
+            resident_nbytes(
+                self.blob, self.offsets, self.url_ids, self.block_offsets,
+                self.token_ids, self.token_offsets
+            ) +
+            sum(len(url) + 50 for url in self.urls)
+        )
+
+    def text(self, idx: int) -> str:
+        """Decode the text of a single chunk."""
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+
+        if not self.compression:
+            return self.blob[start:end].tobytes().decode("utf-8")
+
+        block = idx // self.block_size
+        block_start = int(self.offsets[block * self.block_size])
+        data = self._block(block)
+        return data[start - block_start:end - block_start].decode("utf-8")
+
+    def texts(self, indices: Sequence[int]) -> List[str]:
+        return [self.text(int(idx)) for idx in indices]
+
+    def tokens(self, idx: int) -> Optional[np.ndarray]:
+        """Stored token ids of a chunk, if the store has them."""
+        if self.token_ids is None:
+            return None
+        return self.token_ids[self.token_offsets[idx]:self.token_offsets[idx + 1]]
+
+    def url(self, idx: int) -> str:
+        if not 0 <= idx < len(self):
+            return ""
+        return self.urls[self.url_ids[idx]]
+
+    def _block(self, block: int) -> bytes:
+        """Decompress a block, reusing recently decompressed ones."""
+        with self._lock:
+            if block in self._blocks:
+                self._blocks.move_to_end(block)
+                return self._blocks[block]
+
+        import zstandard
+
+        start, end = int(self.block_offsets[block]), int(self.block_offsets[block + 1])
+        data = zstandard.ZstdDecompressor().decompress(self.blob[start:end].tobytes())
+
+        with self._lock:
+            self._blocks[block] = data
+            if len(self._blocks) > self.CACHED_BLOCKS:
+                self._blocks.popitem(last=False)
+
+        return data
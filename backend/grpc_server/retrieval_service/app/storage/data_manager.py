@@ -1,141 +1,606 @@
-import torch
 import faiss
+import fcntl
 import json
+import os
 import pickle
+import shutil
+import threading
+import time
+import numpy as np
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Collection, Dict, Any, List, Optional, Sequence, Union
 from ..core.config import Config
 from ..core.singleton import Singleton
 from ..core.enums import DocSource
+from .chunk_store import ChunkStore
+from .sparse_matrix import CSRMatrix
+from .inverted_index import InvertedIndex
 from ..utils.logger import logger
 
 class DataManager(metaclass=Singleton):
-    """Manage saving and loading of model data and embeddings."""
+    """Manage saving and loading of model data and embeddings.
+    
+    A source is stored as immutable segments, each holding some chunks
+    with their stable ids, texts, embeddings and indexes. Every change is
+    written as a new version directory under ``versions/``: a manifest
+    listing the segments, the ids of deleted chunks (tombstones) and the
+    page hashes of the crawl. A version is validated before the
+    ``CURRENT`` file is atomically pointed at it. Segments are shared by
+    versions and never modified, and the last few versions are kept so a
+    source can be rolled back instantly.
+    """
+    
+    CURRENT = 'CURRENT'
+    
+    # Files of the original single-build layout, converted into a segment on first load
+    LEGACY_FILES = [
+        'chunks.pkl',
+        'chunk_to_url.json',
+        'sparse_embeddings.pkl',
+        'dense_index.faiss'
+    ]
     
     def __init__(self):
         self.config = Config()
         
+        # Manifest updates of a source are applied one at a time
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        
     def get_source_dir(self, source: DocSource) -> Path:
         """Get data directory for a specific source."""
         data_dir = Path(self.config.get_data_dir(source.value))
         data_dir.mkdir(parents=True, exist_ok=True)
         return data_dir
     
-    def save_data(
+    def write_segment(
         self,
         source: DocSource,
-        chunks: list,
-        chunk_to_url: Dict[str, str],
-        sparse_embeddings: list,
-        dense_embeddings: torch.Tensor,
-        dense_index: faiss.Index
-    ) -> None:
-        """Save all components for a documentation source."""
+        chunks: ChunkStore,
+        sparse_embeddings: CSRMatrix,
+        dense_index: Union[faiss.Index, faiss.IndexBinary],
+        ids: np.ndarray,
+        dense_vectors: Optional[np.ndarray] = None,
+        inverted_index: Optional[InvertedIndex] = None,
+        chunk_hashes: Optional[Sequence[str]] = None
+    ) -> str:
+        """Write a new segment and return its name.
+        
+        ``ids`` are the ascending chunk ids of the rows. The segment is
+        served once a :meth:`commit` adds it to the manifest.
+        """
         try:
+            name = self._new_version()
+            segments_dir = self.get_source_dir(source) / 'segments'
+            # Written under a temporary name so a segment directory is always complete
+            segment_dir = segments_dir / f'.{name}.tmp'
+            segment_dir.mkdir(parents=True)
+            logger.info(f"Writing segment {name} of {source.value} ({len(chunks)} chunks)")
+            
+            # Save chunk texts and URLs
+            chunks.save(segment_dir / 'chunks')
+            
+            # Save sparse embeddings and their postings as flat arrays
+            sparse_embeddings.save(segment_dir / 'sparse')
+            if inverted_index is None:
+                inverted_index = InvertedIndex.build(sparse_embeddings)
+            inverted_index.save(segment_dir / 'inverted')
+            
+            # Save fp16 rescoring vectors
+            if dense_vectors is not None:
+                np.save(segment_dir / 'dense_fp16.npy', dense_vectors.astype(np.float16))
+            
+            # Save FAISS index
+            if isinstance(dense_index, faiss.IndexBinary):
+                faiss.write_index_binary(
+                    dense_index,
+                    str(segment_dir / 'dense_index_binary.faiss')
+                )
+            else:
+                faiss.write_index(dense_index, str(segment_dir / 'dense_index.faiss'))
+            
+            np.save(segment_dir / 'ids.npy', np.asarray(ids, dtype=np.int64))
+            
+            if chunk_hashes is not None:
+                # Hex digests, so no trailing null bytes are stripped from the fixed-width strings
+                np.save(segment_dir / 'chunk_hashes.npy', np.array(chunk_hashes, dtype='S40'))
+            
+            segment_dir.rename(segments_dir / name)
+            return name
+            
+        except Exception as e:
+            logger.error(f"Error writing segment for {source.value}: {str(e)}")
+            raise
+    
+    def commit(
+        self,
+        source: DocSource,
+        update: Callable[[Dict[str, Any]], None],
+        ingest_state: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Apply ``update`` to the current manifest and activate the result.
+        
+        ``update`` edits the manifest in place: its ``segments`` names, the
+        ``deleted`` chunk ids and ``next_id``. The edited manifest is
+        written as a new version, validated and then made current by
+        atomically replacing the ``CURRENT`` pointer, so readers see
+        either the old or the new version and a failed commit leaves the
+        old one serving. Commits of a source are serialized.
+        """
+        with self._lock(source):
             data_dir = self.get_source_dir(source)
-            logger.info(f"Saving data for {source.value} to {data_dir}")
             
-            # Save text chunks
-            with open(data_dir / 'chunks.pkl', 'wb') as f:
-                pickle.dump(chunks, f)
+            current = self.current_version(source)
+            if current is None and self.check_data_exists(source):
+                # The old build stays available for rollback
+                self._upgrade(source, data_dir)
+                current = self.current_version(source)
             
-            # Save URL mappings
-            with open(data_dir / 'chunk_to_url.json', 'w') as f:
-                json.dump(chunk_to_url, f)
+            if current is not None:
+                manifest = self.load_manifest(source)
+            else:
+                manifest = {
+                    "version": None,
+                    "next_id": 0,
+                    "segments": [],
+                    "deleted": np.empty(0, dtype=np.int64)
+                }
             
-            # Save sparse embeddings
-            with open(data_dir / 'sparse_embeddings.pkl', 'wb') as f:
-                pickle.dump(sparse_embeddings, f)
+            update(manifest)
             
-            # Save dense embeddings
-            torch.save(dense_embeddings, data_dir / 'dense_embeddings.pt')
+            # Identifies this build of the source, e.g. in cache keys
+            version = self._new_version()
+            deleted = np.unique(np.asarray(manifest["deleted"], dtype=np.int64))
             
-            # Save FAISS index
-            faiss.write_index(dense_index, str(data_dir / 'dense_index.faiss'))
+            if ingest_state is None and current is not None:
+                ingest_state = self.load_ingest_state(source)
+            
+            self._write_version(data_dir, version, {
+                "version": version,
+                "parent": current,
+                "created": time.time(),
+                "next_id": int(manifest["next_id"]),
+                "segments": manifest["segments"]
+            }, deleted, ingest_state)
             
-            logger.info(f"Successfully saved all data for {source.value}")
+            try:
+                self.validate(source, version, baseline=current)
+            except Exception:
+                shutil.rmtree(self._version_dir(data_dir, version), ignore_errors=True)
+                raise
+            
+            self._activate(data_dir, version)
+            self._prune_versions(data_dir)
+            
+            manifest.update(version=version, deleted=deleted)
+            return manifest
+    
+    def rollback(self, source: DocSource, version: Optional[str] = None) -> str:
+        """Make an earlier version current again and return it.
+        
+        Without ``version`` the newest version older than the current one
+        is restored.
+        """
+        try:
+            with self._lock(source):
+                data_dir = self.get_source_dir(source)
+                current = self.current_version(source)
+                versions = self.list_versions(source)
+                
+                if version is None:
+                    older = versions[:versions.index(current)] if current in versions else []
+                    if not older:
+                        raise ValueError(f"No earlier version of {source.value} to roll back to")
+                    version = older[-1]
+                elif version not in versions:
+                    raise ValueError(f"Unknown version {version} of {source.value}")
+                
+                self.validate(source, version)
+                self._activate(data_dir, version)
+                
+                logger.info(f"Rolled {source.value} back from version {current} to {version}")
+                return version
             
         except Exception as e:
-            logger.error(f"Error saving data for {source.value}: {str(e)}")
+            logger.error(f"Error rolling back {source.value}: {str(e)}")
             raise
     
-    def load_data(self, source: DocSource) -> Dict[str, Any]:
-        """Load all components for a documentation source."""
+    def validate(self, source: DocSource, version: str, baseline: Optional[str] = None) -> None:
+        """Check that a version is complete and consistent before it is served.
+        
+        Segments already in the ``baseline`` version were checked when it
+        was committed, so only new segments are read in full. A version
+        that loses too many live chunks compared to the baseline, e.g.
+        after a crawl that mostly failed, is rejected too.
+        """
+        data_dir = self.get_source_dir(source)
+        manifest = self.load_manifest(source, version)
+        checked = set(self.load_manifest(source, baseline)["segments"]) if baseline else set()
+        
+        last_id = -1
+        dimension = None
+        live = 0
+        for name in manifest["segments"]:
+            segment_dir = data_dir / 'segments' / name
+            if not (segment_dir / 'ids.npy').exists():
+                raise ValueError(f"Version {version} of {source.value} misses segment {name}")
+            
+            ids = np.load(segment_dir / 'ids.npy', mmap_mode='r')
+            if not len(ids) or ids[0] <= last_id or np.any(np.diff(ids) <= 0):
+                raise ValueError(f"Chunk ids of segment {name} are not ascending after earlier segments")
+            last_id = int(ids[-1])
+            live += len(ids) - int(np.isin(ids, manifest["deleted"]).sum())
+            
+            if name in checked:
+                continue
+            
+            segment = self._load_segment(segment_dir, 'r')
+            dense_index = segment["dense_index"]
+            sizes = {
+                "chunks": len(segment["chunks"]),
+                "sparse embeddings": len(segment["sparse_embeddings"]),
+                "inverted index": segment["inverted_index"].n_docs,
+                "dense index": dense_index.ntotal
+            }
+            if segment["dense_vectors"] is not None:
+                sizes["fp16 vectors"] = len(segment["dense_vectors"])
+            for component, size in sizes.items():
+                if size != len(ids):
+                    raise ValueError(f"Segment {name} has {len(ids)} ids but {size} rows in its {component}")
+            
+            if dimension is not None and dense_index.d != dimension:
+                raise ValueError(f"Segment {name} has dimension {dense_index.d}, expected {dimension}")
+            dimension = dense_index.d
+        
+        if manifest["next_id"] <= last_id:
+            raise ValueError(f"Version {version} of {source.value} would reuse chunk id {last_id}")
+        
+        min_live_ratio = self.config.serving_configs["snapshots"]["min_live_ratio"]
+        if baseline and min_live_ratio:
+            baseline_live = self._live_chunks(data_dir, self.load_manifest(source, baseline))
+            if live < min_live_ratio * baseline_live:
+                raise ValueError(
+                    f"Version {version} of {source.value} keeps {live} of {baseline_live} chunks, "
+                    f"below serving_configs['snapshots']['min_live_ratio'] = {min_live_ratio}"
+                )
+    
+    @staticmethod
+    def _live_chunks(data_dir: Path, manifest: Dict[str, Any]) -> int:
+        live = 0
+        for name in manifest["segments"]:
+            ids = np.load(data_dir / 'segments' / name / 'ids.npy', mmap_mode='r')
+            live += len(ids) - int(np.isin(ids, manifest["deleted"]).sum())
+        return live
+    
+    def current_version(self, source: DocSource) -> Optional[str]:
+        """Version the source is served from, or None before its first build."""
+        path = self.get_source_dir(source) / self.CURRENT
+        return path.read_text().strip() if path.exists() else None
+    
+    def current_stamp(self, source: DocSource) -> Optional[tuple]:
+        """Cheap marker of the CURRENT pointer that changes whenever it is replaced."""
+        try:
+            stat = os.stat(self.get_source_dir(source) / self.CURRENT)
+        except FileNotFoundError:
+            return None
+        # Activation renames a new file over the pointer, so the inode changes too
+        return stat.st_ino, stat.st_mtime_ns
+    
+    def list_versions(self, source: DocSource) -> List[str]:
+        """Versions kept on disk, oldest first."""
+        versions_dir = self.get_source_dir(source) / 'versions'
+        if not versions_dir.exists():
+            return []
+        return sorted(
+            (path.name for path in versions_dir.iterdir() if not path.name.startswith('.')),
+            key=lambda version: int(version, 16)
+        )
+    
+    def remove_segment(self, source: DocSource, name: str) -> None:
+        """Delete a segment that no manifest refers to."""
+        shutil.rmtree(self.get_source_dir(source) / 'segments' / name, ignore_errors=True)
+    
+    def load_manifest(self, source: DocSource, version: Optional[str] = None) -> Dict[str, Any]:
+        """Load the segment names and deleted chunk ids of a version, by default the current one."""
+        data_dir = self.get_source_dir(source)
+        version_dir = self._version_dir(data_dir, version or self.current_version(source))
+        
+        with open(version_dir / 'manifest.json', 'r') as f:
+            manifest = json.load(f)
+        
+        manifest["deleted"] = (
+            np.load(version_dir / 'deleted.npy')
+            if (version_dir / 'deleted.npy').exists() else np.empty(0, dtype=np.int64)
+        )
+        return manifest
+    
+    def load_data(self, source: DocSource, loaded: Collection[str] = ()) -> Dict[str, Any]:
+        """Load all components for a documentation source.
+        
+        Segments named in ``loaded`` are already in memory, so only their
+        names are returned.
+        """
         try:
             data_dir = self.get_source_dir(source)
             logger.info(f"Loading data for {source.value} from {data_dir}")
             
-            # Check for required files
-            required_files = [
-                'chunks.pkl',
-                'chunk_to_url.json',
-                'sparse_embeddings.pkl',
-                'dense_embeddings.pt',
-                'dense_index.faiss'
-            ]
-            
-            for file in required_files:
-                if not (data_dir / file).exists():
-                    raise FileNotFoundError(
-                        f"Missing required file {file} for {source.value}"
-                    )
-            
-            # Load components
-            with open(data_dir / 'chunks.pkl', 'rb') as f:
-                chunks = pickle.load(f)
+            # Versions are only pruned under the lock, so the one read stays complete
+            with self._lock(source):
+                if self.current_version(source) is None:
+                    self._upgrade(source, data_dir)
                 
-            with open(data_dir / 'chunk_to_url.json', 'r') as f:
-                chunk_to_url = json.load(f)
+                manifest = self.load_manifest(source)
                 
-            with open(data_dir / 'sparse_embeddings.pkl', 'rb') as f:
-                sparse_embeddings = pickle.load(f)
+                # Arrays are mapped read-only and paged in on demand
+                mmap_mode = 'r' if self.config.serving_configs["mmap"] else None
                 
-            dense_embeddings = torch.load(
-                data_dir / 'dense_embeddings.pt',
-                map_location=self.config.device
-            )
+                segments = [
+                    {"name": name} if name in loaded
+                    else self._load_segment(data_dir / 'segments' / name, mmap_mode)
+                    for name in manifest["segments"]
+                ]
             
-            dense_index = faiss.read_index(str(data_dir / 'dense_index.faiss'))
-            
-            logger.info(f"Successfully loaded all data for {source.value}")
+            logger.info(
+                f"Successfully loaded all data for {source.value} "
+                f"({len(segments)} segments, {len(manifest['deleted'])} deleted chunks)"
+            )
             
             return {
-                "chunks": chunks,
-                "chunk_to_url": chunk_to_url,
-                "sparse_embeddings": sparse_embeddings,
-                "dense_embeddings": dense_embeddings,
-                "dense_index": dense_index
+                "segments": segments,
+                "deleted": manifest["deleted"],
+                "next_id": manifest["next_id"],
+                "version": manifest["version"]
             }
             
         except Exception as e:
             logger.error(f"Error loading data for {source.value}: {str(e)}")
             raise
     
+    def _load_segment(self, segment_dir: Path, mmap_mode: Optional[str]) -> Dict[str, Any]:
+        """Load the components of one segment."""
+        if not self._dense_index_path(segment_dir).exists():
+            raise FileNotFoundError(f"Missing dense index in {segment_dir}")
+        
+        # Load components
+        chunks = ChunkStore.load(segment_dir / 'chunks', mmap_mode)
+        sparse_embeddings = CSRMatrix.load(segment_dir / 'sparse', mmap_mode)
+        inverted_index = InvertedIndex.load(segment_dir / 'inverted', mmap_mode)
+        
+        dense_vectors = None
+        if (segment_dir / 'dense_fp16.npy').exists():
+            dense_vectors = np.load(segment_dir / 'dense_fp16.npy', mmap_mode=mmap_mode)
+        
+        chunk_hashes = None
+        if (segment_dir / 'chunk_hashes.npy').exists():
+            chunk_hashes = np.load(segment_dir / 'chunk_hashes.npy', mmap_mode=mmap_mode)
+        
+        dense_index, dense_index_mapped = self._read_dense_index(
+            self._dense_index_path(segment_dir),
+            mmap_mode is not None
+        )
+        
+        return {
+            "name": segment_dir.name,
+            "ids": np.load(segment_dir / 'ids.npy', mmap_mode=mmap_mode),
+            "chunks": chunks,
+            "sparse_embeddings": sparse_embeddings,
+            "inverted_index": inverted_index,
+            "dense_vectors": dense_vectors,
+            "dense_index": dense_index,
+            "dense_index_mapped": dense_index_mapped,
+            "chunk_hashes": chunk_hashes
+        }
+    
+    def load_ingest_state(self, source: DocSource) -> Dict[str, Any]:
+        """Load the page hashes, fetch ledger and settings of the current version, if it stored any."""
+        current = self.current_version(source)
+        if current is None:
+            return {}
+        
+        path = self._version_dir(self.get_source_dir(source), current) / 'pages.json'
+        if not path.exists():
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+    
+    def _write_version(
+        self,
+        data_dir: Path,
+        version: str,
+        manifest: Dict[str, Any],
+        deleted: np.ndarray,
+        ingest_state: Optional[Dict[str, Any]]
+    ) -> None:
+        """Write the directory of a version, complete before it appears under its name."""
+        versions_dir = data_dir / 'versions'
+        tmp_dir = versions_dir / f'.{version}.tmp'
+        tmp_dir.mkdir(parents=True)
+        
+        self._write_json(tmp_dir / 'manifest.json', manifest)
+        if deleted.size:
+            np.save(tmp_dir / 'deleted.npy', deleted)
+        if ingest_state:
+            self._write_json(tmp_dir / 'pages.json', {
+                "chunking": ingest_state["chunking"],
+                "models": ingest_state.get("models"),
+                "pages": ingest_state["pages"],
+                "fetch": ingest_state.get("fetch", {})
+            })
+        
+        tmp_dir.rename(self._version_dir(data_dir, version))
+    
+    @staticmethod
+    def _version_dir(data_dir: Path, version: str) -> Path:
+        return data_dir / 'versions' / version
+    
+    def _activate(self, data_dir: Path, version: str) -> None:
+        """Atomically point the source at a version."""
+        tmp_path = data_dir / f'.{self.CURRENT}.tmp'
+        tmp_path.write_text(version)
+        os.replace(tmp_path, data_dir / self.CURRENT)
+    
+    def _prune_versions(self, data_dir: Path) -> None:
+        """Drop versions beyond the ones kept for rollback, and segments only they used."""
+        keep = self.config.serving_configs["snapshots"]["keep_versions"]
+        current = (data_dir / self.CURRENT).read_text().strip()
+        versions = sorted(
+            (path.name for path in (data_dir / 'versions').iterdir() if not path.name.startswith('.')),
+            key=lambda version: int(version, 16)
+        )
+        
+        others = [version for version in versions if version != current]
+        kept = [current] + (others[-(keep - 1):] if keep > 1 else [])
+        dropped = [version for version in versions if version not in kept]
+        if not dropped:
+            return
+        
+        def segments(version: str) -> set:
+            with open(self._version_dir(data_dir, version) / 'manifest.json', 'r') as f:
+                return set(json.load(f)["segments"])
+        
+        in_use = set().union(*(segments(version) for version in kept))
+        unused = set().union(*(segments(version) for version in dropped)) - in_use
+        
+        for version in dropped:
+            shutil.rmtree(self._version_dir(data_dir, version), ignore_errors=True)
+        # Indexes still mapping a deleted segment keep reading its unlinked files
+        for name in unused:
+            shutil.rmtree(data_dir / 'segments' / name, ignore_errors=True)
+    
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]) -> None:
+        """Replace a JSON file atomically."""
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def _lock(self, source: DocSource) -> threading.RLock:
+        with self._locks_guard:
+            return self._locks.setdefault(source.value, threading.RLock())
+    
     def check_data_exists(self, source: DocSource) -> bool:
         """Check if all required data exists for a source."""
         data_dir = self.get_source_dir(source)
-        required_files = [
-            'chunks.pkl',
-            'chunk_to_url.json',
-            'sparse_embeddings.pkl',
-            'dense_embeddings.pt',
-            'dense_index.faiss'
-        ]
-        
-        return all((data_dir / file).exists() for file in required_files)
-        
-    def clear_data(self, source: DocSource) -> None:
-        """Clear all data for a documentation source."""
-        try:
-            data_dir = self.get_source_dir(source)
+        
+        return (data_dir / self.CURRENT).exists() or all(
+            (data_dir / file).exists() for file in self.LEGACY_FILES
+        )
+    
+    @staticmethod
+    def _dense_index_path(data_dir: Path) -> Path:
+        """Locate the dense index, which is binary for binary storage."""
+        path = data_dir / 'dense_index_binary.faiss'
+        return path if path.exists() else data_dir / 'dense_index.faiss'
+    
+    def upgrade(self, source: DocSource) -> None:
+        """Convert a source still in the original layout, if it is.
+        
+        Worth calling before starting processes that share the source, so
+        they do not all wait for the conversion.
+        """
+        with self._lock(source):
+            if self.current_version(source) is None and self.check_data_exists(source):
+                self._upgrade(source, self.get_source_dir(source))
+    
+    def _upgrade(self, source: DocSource, data_dir: Path) -> None:
+        """Turn the original single-build layout into the first version of the source.
+        
+        The conversion rewrites the directory in place, so processes sharing
+        it take a file lock and all but the first find the work done.
+        """
+        with open(data_dir / '.upgrade.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if self.current_version(source) is None:
+                self._convert_legacy(source, data_dir)
+    
+    def _convert_legacy(self, source: DocSource, data_dir: Path) -> None:
+        missing = [file for file in self.LEGACY_FILES if not (data_dir / file).exists()]
+        if missing:
+            raise FileNotFoundError(
+                f"Missing required files for {source.value}: {', '.join(missing)}"
+            )
+        
+        logger.info(f"Converting legacy data in {data_dir} into a segment")
+        
+        name = self._new_version()
+        segments_dir = data_dir / 'segments'
+        segment_dir = segments_dir / f'.{name}.tmp'
+        segment_dir.mkdir(parents=True)
+        
+        with open(data_dir / 'chunks.pkl', 'rb') as f:
+            chunks = pickle.load(f)
+        with open(data_dir / 'chunk_to_url.json', 'r') as f:
+            chunk_to_url = json.load(f)
+        
+        ChunkStore.build(
+            chunks,
+            [chunk_to_url.get(str(idx), "") for idx in range(len(chunks))],
+            self.config.processing_configs["chunk_compression"],
+            self.config.processing_configs["chunk_block_size"]
+        ).save(segment_dir / 'chunks')
+        
+        # Legacy sources store a pickled list of SparseEmbedding objects
+        with open(data_dir / 'sparse_embeddings.pkl', 'rb') as f:
+            sparse_embeddings = CSRMatrix.from_embeddings(pickle.load(f))
+        sparse_embeddings.save(segment_dir / 'sparse')
+        InvertedIndex.build(sparse_embeddings).save(segment_dir / 'inverted')
+        
+        # Rows keep their positions as chunk ids
+        np.save(segment_dir / 'ids.npy', np.arange(len(chunks), dtype=np.int64))
+        os.link(data_dir / 'dense_index.faiss', segment_dir / 'dense_index.faiss')
+        segment_dir.rename(segments_dir / name)
+        
+        version = self._new_version()
+        self._write_version(data_dir, version, {
+            "version": version,
+            "parent": None,
+            "created": time.time(),
+            "next_id": len(chunks),
+            "segments": [name]
+        }, np.empty(0, dtype=np.int64), None)
+        self._activate(data_dir, version)
+        
+        # Dense vectors are served from the FAISS index itself
+        for file in self.LEGACY_FILES + ['dense_embeddings.pt']:
+            (data_dir / file).unlink(missing_ok=True)
+    
+    @staticmethod
+    def _new_version() -> str:
+        return f"{time.time_ns():x}"
+    
+    @staticmethod
+    def _read_dense_index(path: Path, mmap: bool) -> tuple:
+        """Read a FAISS index, memory-mapping its codes where supported.
+        
+        Returns the index and whether its codes are mapped rather than
+        copied into memory.
+        """
+        binary = path.name == 'dense_index_binary.faiss'
+        read = faiss.read_index_binary if binary else faiss.read_index
+        
+        mmap_flag = getattr(faiss, 'IO_FLAG_MMAP', 0)
+        # Flat code storage can be mapped directly on newer FAISS releases
+        flat_codes_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+        
+        if mmap and mmap_flag:
+            attempts = [(mmap_flag, None)]
+            if flat_codes_flag:
+                attempts.insert(0, (mmap_flag | flat_codes_flag, True))
             
-            if data_dir.exists():
-                for file in data_dir.glob('*'):
-                    file.unlink()
-                data_dir.rmdir()
+            for flags, mapped in attempts:
+                try:
+                    index = read(str(path), flags)
+                except RuntimeError:
+                    # IVF lists cannot be read with the flat-code flag
+                    continue
                 
-            logger.info(f"Cleared all data for {source.value}")
+                if mapped is None:
+                    # Only inverted lists are mapped by the plain flag
+                    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+                    mapped = not binary and hasattr(base, 'invlists')
+                return index, mapped
             
-        except Exception as e:
-            logger.error(f"Error clearing data for {source.value}: {str(e)}")
-            raise
\ No newline at end of file
+            logger.warning(f"Could not memory-map {path}, reading it into memory")
+        
+        return read(str(path)), False
\ No newline at end of file
@@ -0,0 +1,142 @@
+import numpy as np
+from pathlib import Path
+from typing import Optional, Tuple, Union
+from .arrays import load_arrays, resident_nbytes, save_arrays
+from .sparse_matrix import CSRMatrix
+
+class InvertedIndex:
+    """Term -> postings index over SPLADE document vectors.
+
+    Queries are evaluated term-at-a-time in decreasing order of their score
+    upper bound. Once the bounds of the terms left to process can no longer
+    lift an unseen document into the top-k (MaxScore), those terms only
+    update the documents that can still qualify.
+    """
+
+    ARRAYS = ("doc_ids", "weights", "term_ptr", "max_weights")
+
+    def __init__(
+        self,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        term_ptr: np.ndarray,
+        max_weights: np.ndarray,
+        n_docs: int
+    ):
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.term_ptr = term_ptr
+        self.max_weights = max_weights
+
+        self.n_docs = int(n_docs)
+        self.n_terms = len(max_weights)
+
+    @classmethod
+    def build(cls, matrix: CSRMatrix) -> "InvertedIndex":
+        """Invert a CSR matrix of document vectors."""
+        n_docs = len(matrix)
+
+        doc_ids = np.repeat(
+            np.arange(n_docs, dtype=np.int32),
+            np.diff(matrix.indptr)
+        )
+
+        # A stable sort keeps each posting list ordered by document
+        order = np.argsort(matrix.indices, kind="stable")
+
+        counts = np.bincount(matrix.indices, minlength=matrix.n_cols)
+        term_ptr = np.zeros(matrix.n_cols + 1, dtype=np.int64)
+        np.cumsum(counts, out=term_ptr[1:])
+
+        max_weights = np.zeros(matrix.n_cols, dtype=np.float32)
+        np.maximum.at(max_weights, matrix.indices, matrix.data)
+
+        return cls(doc_ids[order], matrix.data[order], term_ptr, max_weights, n_docs)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap_mode: Optional[str] = None) -> "InvertedIndex":
+        """Load an index written by :meth:`save`, optionally memory-mapped."""
+        arrays = load_arrays(directory, cls.ARRAYS, mmap_mode)
+        n_docs = np.load(Path(directory) / "n_docs.npy")
+        return cls(**arrays, n_docs=int(n_docs))
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """Save the postings as one ``.npy`` file per array."""
+        save_arrays(
+            directory,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            term_ptr=self.term_ptr,
+            max_weights=self.max_weights,
+            n_docs=np.int64(self.n_docs)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in memory; memory-mapped arrays are not counted."""
+        return resident_nbytes(self.doc_ids, self.weights, self.term_ptr, self.max_weights)
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(doc_ids, weights)`` for a term."""
+        start, end = self.term_ptr[term], self.term_ptr[term + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def search(
+        self,
+        indices: np.ndarray,
+        values: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the top-k ``(scores, doc_ids)`` for a sparse query."""
+        # Callers ask for extra hits to make up for deleted rows, which can exceed small segments
+        k = min(k, self.n_docs)
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+
+        # Drop terms the corpus never uses
+        mask = (indices < self.n_terms) & (values > 0)
+        indices, values = indices[mask], values[mask]
+        if indices.size == 0 or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        upper_bounds = values * self.max_weights[indices]
+        order = np.argsort(-upper_bounds, kind="stable")
+        indices, values, upper_bounds = indices[order], values[order], upper_bounds[order]
+
+        # Sum of the bounds of the terms still to be processed
+        remaining = np.concatenate([np.cumsum(upper_bounds[::-1])[::-1][1:], [0.0]])
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        candidates = None
+        touched = 0
+
+        for term, weight, rest in zip(indices, values, remaining):
+            docs, doc_weights = self.postings(term)
+
+            if candidates is not None:
+                keep = candidates[docs]
+                docs, doc_weights = docs[keep], doc_weights[keep]
+            else:
+                touched += docs.size
+
+            scores[docs] += weight * doc_weights
+
+            if touched < k:
+                continue
+
+            threshold = np.partition(scores, -k)[-k]
+            if candidates is None and rest >= threshold:
+                continue
+
+            # Only documents whose bound can still reach the threshold remain
+            reachable = scores + rest >= threshold
+            candidates = reachable if candidates is None else candidates & reachable
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return scores[top], top.astype(np.int64)
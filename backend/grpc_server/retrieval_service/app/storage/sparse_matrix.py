@@ -0,0 +1,159 @@
+import numpy as np
+from pathlib import Path
+from typing import Optional, Sequence, Union
+from .arrays import load_arrays, resident_nbytes, save_arrays
+
+class CSRMatrix:
+    """Compressed sparse row storage for SPLADE document vectors."""
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        n_cols: Optional[int] = None
+    ):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+
+        if n_cols is None:
+            n_cols = int(self.indices.max()) + 1 if self.indices.size else 0
+        self.n_cols = int(n_cols)
+
+    @classmethod
+    def from_embeddings(cls, embeddings: Sequence) -> "CSRMatrix":
+        """Build a matrix from FastEmbed ``SparseEmbedding`` objects."""
+        lengths = np.fromiter(
+            (len(emb.indices) for emb in embeddings),
+            dtype=np.int64,
+            count=len(embeddings)
+        )
+        indptr = np.zeros(len(embeddings) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        if not len(embeddings):
+            return cls(indptr, np.empty(0), np.empty(0))
+
+        indices = np.concatenate([np.asarray(emb.indices) for emb in embeddings])
+        data = np.concatenate([np.asarray(emb.values) for emb in embeddings])
+
+        # Sort columns within each row so rows can be merged and searched
+        order = np.lexsort((indices, np.repeat(np.arange(len(embeddings)), lengths)))
+
+        return cls(indptr, indices[order], data[order])
+
+    @classmethod
+    def stack(cls, matrices: Sequence["CSRMatrix"]) -> "CSRMatrix":
+        """Concatenate the rows of several matrices."""
+        indptrs = [np.zeros(1, dtype=np.int64)]
+        offset = 0
+        for matrix in matrices:
+            indptrs.append(np.asarray(matrix.indptr[1:]) + offset)
+            offset += matrix.nnz
+
+        return cls(
+            np.concatenate(indptrs),
+            np.concatenate([np.empty(0, dtype=np.int32)] + [matrix.indices for matrix in matrices]),
+            np.concatenate([np.empty(0, dtype=np.float32)] + [matrix.data for matrix in matrices]),
+            max([0] + [matrix.n_cols for matrix in matrices])
+        )
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap_mode: Optional[str] = None) -> "CSRMatrix":
+        """Load a matrix written by :meth:`save`, optionally memory-mapped."""
+        arrays = load_arrays(directory, ("indptr", "indices", "data"), mmap_mode)
+        n_cols = np.load(Path(directory) / "n_cols.npy")
+
+        return cls(arrays["indptr"], arrays["indices"], arrays["data"], int(n_cols))
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """Save the matrix as one ``.npy`` file per array."""
+        save_arrays(
+            directory,
+            indptr=self.indptr,
+            indices=self.indices,
+            data=self.data,
+            n_cols=np.int64(self.n_cols)
+        )
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self) -> tuple:
+        return len(self), self.n_cols
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in memory; memory-mapped arrays are not counted."""
+        return resident_nbytes(self.indptr, self.indices, self.data)
+
+    def row(self, idx: int) -> tuple:
+        """Return ``(indices, values)`` of a single row."""
+        start, end = self.indptr[idx], self.indptr[idx + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def take(self, rows: Union[Sequence[int], np.ndarray]) -> "CSRMatrix":
+        """Copy the given rows into a new matrix."""
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+
+        indptr = np.zeros(rows.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        # Positions of every stored entry of the selected rows, in row order
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+
+        return CSRMatrix(indptr, self.indices[positions], self.data[positions], self.n_cols)
+
+    def query_vector(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Scatter a sparse query into a dense lookup over the matrix columns."""
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+
+        # Terms the corpus never uses cannot contribute to any score
+        mask = indices < self.n_cols
+
+        query = np.zeros(self.n_cols, dtype=np.float32)
+        query[indices[mask]] = values[mask]
+        return query
+
+    def dot(
+        self,
+        rows: Union[Sequence[int], np.ndarray],
+        indices: np.ndarray,
+        values: np.ndarray
+    ) -> np.ndarray:
+        """Dot product of a sparse query with the given rows.
+
+        Rows outside the matrix (e.g. FAISS ``-1`` padding) score zero.
+        """
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+        scores = np.zeros(rows.size, dtype=np.float32)
+
+        valid = (rows >= 0) & (rows < len(self))
+        if not valid.any():
+            return scores
+
+        query = self.query_vector(indices, values)
+
+        starts = self.indptr[rows[valid]]
+        lengths = self.indptr[rows[valid] + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return scores
+
+        # Gather every stored entry of the selected rows in one pass
+        row_ids = np.repeat(np.arange(lengths.size), lengths)
+        row_starts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = row_starts + np.arange(total)
+
+        products = self.data[positions] * query[self.indices[positions]]
+        scores[valid] = np.bincount(row_ids, weights=products, minlength=lengths.size)
+        return scores
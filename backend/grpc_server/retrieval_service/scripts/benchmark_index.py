@@ -0,0 +1,146 @@
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import faiss
+import numpy as np
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.core.config import Config
+from app.core.enums import DocSource
+from app.retrieval.embeddings.index_factory import build_faiss_index, configure_index
+from app.retrieval.source_index import SourceIndex
+from app.storage import DataManager
+from app.utils.logger import logger
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark FAISS index types against exact flat search"
+    )
+    parser.add_argument(
+        '--source',
+        required=True,
+        choices=[source.value for source in DocSource],
+        help='Documentation source whose dense vectors are indexed'
+    )
+    parser.add_argument(
+        '--factories',
+        nargs='+',
+        default=['HNSW32', 'IVF256,Flat', 'IVF256,PQ48'],
+        help='FAISS index-factory strings to compare'
+    )
+    parser.add_argument('--k', type=int, default=10, help='Recall cut-off')
+    parser.add_argument(
+        '--num-queries',
+        type=int,
+        default=500,
+        help='Number of synthetic queries sampled from the corpus'
+    )
+    parser.add_argument(
+        '--queries-file',
+        type=Path,
+        help='Text file with one real query per line (encoded with the dense model)'
+    )
+    parser.add_argument('--ef-search', type=int, help='Override efSearch')
+    parser.add_argument('--nprobe', type=int, help='Override nprobe')
+    return parser.parse_args()
+
+def load_queries(args, corpus: np.ndarray) -> np.ndarray:
+    """Encode real queries, or perturb random corpus vectors."""
+    if args.queries_file:
+        from app.retrieval.embeddings import DenseEmbedder
+
+        queries = [
+            line.strip()
+            for line in args.queries_file.read_text().splitlines()
+            if line.strip()
+        ]
+        embedder = DenseEmbedder()
+        return np.stack([embedder.embed_query(query) for query in queries])
+
+    rng = np.random.default_rng(0)
+    sample = corpus[rng.choice(len(corpus), args.num_queries)]
+    noisy = sample + rng.normal(scale=0.05, size=sample.shape).astype(np.float32)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+def measure(index: faiss.Index, queries: np.ndarray, k: int) -> tuple:
+    """Run single-query searches and return ids with per-query latency."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = index.search(query.reshape(1, -1), k)
+        latencies[i] = time.perf_counter() - start
+
+    return ids, latencies * 1000
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(
+        len(set(row) & set(expected))
+        for row, expected in zip(found, truth)
+    )
+    return hits / truth.size
+
+def main():
+    args = parse_args()
+    source = DocSource(args.source)
+    config = Config()
+
+    # Vectors come from the stored index (or its fp16 copy for quantized storage)
+    index = SourceIndex.from_data(source, DataManager().load_data(source))
+    if index.is_binary and not index.has_dense_vectors:
+        raise SystemExit(f"{source.value} stores no full-precision vectors to benchmark")
+    corpus = np.ascontiguousarray(
+        index.get_vectors(index.chunk_ids()),
+        dtype=np.float32
+    )
+    queries = load_queries(args, corpus)
+    k = min(args.k, len(corpus))
+
+    logger.info(f"Benchmarking {len(corpus)} vectors with {len(queries)} queries (k={k})")
+
+    flat = build_faiss_index(corpus, "Flat")
+    truth, flat_latency = measure(flat, queries, k)
+
+    params = config.get_index_config(source.value)
+    if args.ef_search is not None:
+        params["ef_search"] = args.ef_search
+    if args.nprobe is not None:
+        params["nprobe"] = args.nprobe
+
+    rows = [("Flat", 1.0, flat_latency, 0.0, len(faiss.serialize_index(flat)))]
+
+    for factory in args.factories:
+        start = time.perf_counter()
+        index = configure_index(
+            build_faiss_index(corpus, factory, params["train_size"]),
+            params
+        )
+        build_time = time.perf_counter() - start
+
+        found, latency = measure(index, queries, k)
+        rows.append((
+            factory,
+            recall_at_k(found, truth),
+            latency,
+            build_time,
+            len(faiss.serialize_index(index))
+        ))
+
+    logger.info(
+        f"\n{'index':<20} {'recall@' + str(k):>10} {'p50 ms':>8} "
+        f"{'p99 ms':>8} {'build s':>8} {'size MB':>8}"
+    )
+    for factory, recall, latency, build_time, size in rows:
+        logger.info(
+            f"{factory:<20} {recall:>10.3f} {np.percentile(latency, 50):>8.3f} "
+            f"{np.percentile(latency, 99):>8.3f} {build_time:>8.2f} {size / 2**20:>8.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -46,7 +46,8 @@ def main():
                 logger.info(f"Data already exists for {source.value}. Use --force to reprocess.")
                 continue
                 
-            pipeline.process_documents(source)
+            # A forced run rebuilds from a full crawl instead of applying a delta
+            pipeline.process_documents(source, incremental=not args.force)
             
             # Verify the processed data
             pipeline.load_source(source)
@@ -0,0 +1,64 @@
+import argparse
+import time
+from pathlib import Path
+import sys
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.core.enums import DocSource
+from app.retrieval.base import RetrievalPipeline
+from app.utils.logger import logger
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="List the stored versions of a documentation source or roll it back"
+    )
+    parser.add_argument(
+        '--source',
+        required=True,
+        choices=[source.value for source in DocSource],
+        help='Documentation source to roll back'
+    )
+    parser.add_argument(
+        '--version',
+        help='Version to restore (default: the one before the current version)'
+    )
+    parser.add_argument(
+        '--list',
+        action='store_true',
+        help='Only list the stored versions'
+    )
+    return parser.parse_args()
+
+def list_versions(pipeline: RetrievalPipeline, source: DocSource) -> None:
+    current = pipeline.data_manager.current_version(source)
+    for version in pipeline.data_manager.list_versions(source):
+        manifest = pipeline.data_manager.load_manifest(source, version)
+        created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manifest["created"]))
+        marker = '*' if version == current else ' '
+        logger.info(
+            f"{marker} {version}  created {created}, {len(manifest['segments'])} segments, "
+            f"{len(manifest['deleted'])} deleted chunks"
+        )
+
+def main():
+    args = parse_args()
+    pipeline = RetrievalPipeline()
+    source = DocSource(args.source)
+
+    if args.list:
+        list_versions(pipeline, source)
+        return
+
+    try:
+        version = pipeline.rollback(source, args.version)
+        # Running servers and workers switch over on their next query
+        logger.info(f"{source.value} now serves version {version}")
+    except Exception as e:
+        logger.error(f"Error rolling back {source.value}: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
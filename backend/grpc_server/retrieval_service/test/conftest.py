@@ -0,0 +1,167 @@
+import hashlib
+import json
+from pathlib import Path
+import pickle
+import sys
+
+import faiss
+import numpy as np
+import pytest
+import fastembed
+import fastembed.rerank.cross_encoder
+from fastembed import SparseEmbedding
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+DIMENSION = 32
+
+def _word_vector(word: str) -> np.ndarray:
+    seed = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(DIMENSION).astype(np.float32)
+
+class FakeTextEmbedding:
+    """Bag-of-words dense model, so identical texts embed identically."""
+
+    calls = 0
+
+    def __init__(self, model_name=None, **kwargs):
+        pass
+
+    def embed(self, texts, **kwargs):
+        for text in texts:
+            FakeTextEmbedding.calls += 1
+            vector = sum(_word_vector(word) for word in text.lower().split())
+            yield vector / np.linalg.norm(vector)
+
+class FakeSparseTextEmbedding:
+    """One unit weight per distinct word."""
+
+    calls = 0
+
+    def __init__(self, model_name=None, **kwargs):
+        pass
+
+    def embed(self, texts, **kwargs):
+        for text in texts:
+            FakeSparseTextEmbedding.calls += 1
+            indices = np.unique([
+                int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % 30000
+                for word in text.lower().split()
+            ])
+            yield SparseEmbedding(indices=indices, values=np.ones(len(indices), dtype=np.float32))
+
+class FakeCrossEncoder:
+    """Scores a passage by the query words it contains."""
+
+    def __init__(self, model_name=None, **kwargs):
+        pass
+
+    def rerank(self, query, documents, **kwargs):
+        terms = set(query.lower().split())
+        for document in documents:
+            yield float(len(terms & set(document.lower().split())))
+
+    def rerank_pairs(self, pairs, **kwargs):
+        for query, document in pairs:
+            yield from self.rerank(query, [document])
+
+# Model downloads are not available to tests; modules import these names on first use
+fastembed.TextEmbedding = FakeTextEmbedding
+fastembed.SparseTextEmbedding = FakeSparseTextEmbedding
+fastembed.rerank.cross_encoder.TextCrossEncoder = FakeCrossEncoder
+
+from app.cache import ResultCache, SemanticCache
+from app.retrieval.processing import chunker
+from app.core.config import Config
+from app.core.enums import DocSource
+from app.core.singleton import Singleton
+from app.retrieval.base import RetrievalPipeline
+from app.retrieval.compaction import SegmentCompactor
+from app.retrieval.processing import FetchResult
+from app.retrieval.registry import SourceRegistry
+from app.storage import DataManager
+
+# Test pages are plain words, so whitespace splitting stands in for nltk's punkt data
+chunker.word_tokenize = str.split
+
+SOURCE = DocSource.NEXTJS
+
+# Singletons holding data of a test's data directory
+STATEFUL = (DataManager, SourceRegistry, ResultCache, SemanticCache, SegmentCompactor)
+
+class FakeSite:
+    """Pages served to the pipeline's fetcher instead of the real sitemap."""
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        # URLs whose download fails
+        self.failing = set()
+        self.requested = []
+
+    def attach(self, pipeline: RetrievalPipeline) -> RetrievalPipeline:
+        pipeline.fetcher.fetch_sitemap_entries = lambda url: {page: None for page in self.pages}
+        pipeline.fetcher.iter_pages = self.iter_pages
+        return pipeline
+
+    def iter_pages(self, urls, validators=None):
+        for url in urls:
+            self.requested.append(url)
+            yield FetchResult(url, None if url in self.failing else self.pages[url])
+
+def page(topic: str, words: int = 16) -> str:
+    """Text of a page with two chunks of eight words each."""
+    return " ".join(f"{topic}{i}" for i in range(words))
+
+def write_legacy_layout(data_dir: Path, chunks: list) -> None:
+    """Write a source in the original single-build file layout."""
+    vectors = np.stack(list(FakeTextEmbedding().embed(chunks))).astype(np.float32)
+    dense_index = faiss.IndexFlatIP(vectors.shape[1])
+    dense_index.add(vectors)
+    faiss.write_index(dense_index, str(data_dir / "dense_index.faiss"))
+    with open(data_dir / "chunks.pkl", "wb") as f:
+        pickle.dump(chunks, f)
+    with open(data_dir / "chunk_to_url.json", "w") as f:
+        json.dump({str(i): f"https://docs.example.com/{i}" for i in range(len(chunks))}, f)
+    with open(data_dir / "sparse_embeddings.pkl", "wb") as f:
+        pickle.dump(list(FakeSparseTextEmbedding().embed(chunks)), f)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty data directory with fresh stores and caches."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+
+    config = Config()
+    monkeypatch.setitem(config.processing_configs, "chunk_size", 8)
+    monkeypatch.setitem(config.processing_configs, "chunk_overlap", 0)
+    monkeypatch.setitem(config.serving_configs["embedding_cache"], "enabled", False)
+    monkeypatch.setitem(config.serving_configs["compaction"], "enabled", False)
+    monkeypatch.setitem(config.serving_configs["result_cache"], "redis", None)
+
+    for cls in STATEFUL:
+        Singleton.clear_instance(cls)
+    yield tmp_path
+    for cls in STATEFUL:
+        Singleton.clear_instance(cls)
+
+@pytest.fixture
+def server_path(workdir, monkeypatch):
+    """Make the gRPC server's ``core`` and ``utils`` modules importable.
+
+    Server settings read ``.env`` from the working directory, so they are
+    loaded in the empty workdir rather than beside the retrieval service's.
+    """
+    monkeypatch.syspath_prepend(str(project_root.parent))
+
+@pytest.fixture
+def site():
+    return FakeSite({
+        f"https://docs.example.com/{topic}": page(topic)
+        for topic in ("routing", "caching", "images", "fonts", "testing", "deploy")
+    })
+
+@pytest.fixture
+def pipeline(workdir, site):
+    return site.attach(RetrievalPipeline(SOURCE))
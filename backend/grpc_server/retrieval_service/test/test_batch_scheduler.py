@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+@pytest.fixture
+def batcher_cls(server_path):
+    from utils.batch_scheduler import MicroBatcher
+    return MicroBatcher
+
+@pytest.fixture
+def overloaded_error(server_path):
+    from core.exceptions import RetrievalOverloadedError
+    return RetrievalOverloadedError
+
+class Handler:
+    """Upper-cases items, recording every batch it is given."""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.release = None
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        if self.release is not None:
+            await self.release.wait()
+        await asyncio.sleep(self.delay)
+        return [item.upper() for item in items]
+
+def test_coalesces_concurrent_calls(batcher_cls):
+    handler = Handler()
+
+    async def run():
+        batcher = batcher_cls(handler, max_batch=4, window_ms=50)
+        return await asyncio.gather(*(batcher.submit(f"query {number}") for number in range(10)))
+
+    # Each caller gets its own result, whichever batch it ran in
+    assert asyncio.run(run()) == [f"QUERY {number}" for number in range(10)]
+    assert [len(batch) for batch in handler.batches] == [4, 4, 2]
+
+def test_window_flushes_a_partial_batch(batcher_cls):
+    handler = Handler()
+
+    async def run():
+        batcher = batcher_cls(handler, max_batch=16, window_ms=20)
+        first = await batcher.submit("alone")
+        second = await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+        return first, second
+
+    assert asyncio.run(run()) == ("ALONE", ["A", "B"])
+    assert handler.batches == [["alone"], ["a", "b"]]
+
+def test_handler_errors_reach_every_caller(batcher_cls):
+    async def fail(items):
+        raise ValueError("index unavailable")
+
+    async def wrong_length(items):
+        return items[:1]
+
+    async def run(handler):
+        batcher = batcher_cls(handler, max_batch=3, window_ms=10)
+        return await asyncio.gather(*(batcher.submit(item) for item in "abc"), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run(fail)))
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run(wrong_length)))
+
+def test_cancelled_callers_are_dropped(batcher_cls):
+    handler = Handler()
+
+    async def run():
+        batcher = batcher_cls(handler, max_batch=16, window_ms=50)
+        gone = asyncio.ensure_future(batcher.submit("gone"))
+        kept = asyncio.ensure_future(batcher.submit("kept"))
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await kept, batcher._in_flight
+
+    assert asyncio.run(run()) == ("KEPT", 0)
+    assert handler.batches == [["kept"]]
+
+def test_rejects_items_beyond_max_in_flight(batcher_cls, overloaded_error):
+    handler = Handler()
+
+    async def run():
+        handler.release = asyncio.Event()
+        batcher = batcher_cls(handler, max_batch=2, window_ms=5, max_in_flight=3)
+
+        # Running and waiting items both count
+        waiting = [asyncio.ensure_future(batcher.submit(f"query {number}")) for number in range(3)]
+        await asyncio.sleep(0.02)
+        assert batcher._in_flight == 3
+        with pytest.raises(overloaded_error):
+            await batcher.submit("one too many")
+
+        handler.release.set()
+        results = await asyncio.gather(*waiting)
+
+        # Slots free up once results are delivered
+        assert batcher._in_flight == 0
+        results.append(await batcher.submit("later"))
+        return results
+
+    assert asyncio.run(run()) == ["QUERY 0", "QUERY 1", "QUERY 2", "LATER"]
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+@pytest.fixture
+def executor_cls(server_path):
+    from utils.bounded_executor import BoundedExecutor
+    return BoundedExecutor
+
+@pytest.fixture
+def overloaded_error(server_path):
+    from core.exceptions import RetrievalOverloadedError
+    return RetrievalOverloadedError
+
+def test_runs_calls_off_the_event_loop(executor_cls):
+    executor = executor_cls(max_workers=2, max_queue=2, name="search")
+
+    async def run():
+        loop_thread = threading.current_thread()
+        thread = await executor.run(threading.current_thread)
+        total = await executor.run(sum, [1, 2, 3], start=4)
+        return thread is not loop_thread and thread.name.startswith("search"), total
+
+    try:
+        assert asyncio.run(run()) == (True, 10)
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+def test_rejects_calls_beyond_workers_and_queue(executor_cls, overloaded_error):
+    executor = executor_cls(max_workers=2, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        # Two calls hold the threads and one waits in the queue
+        held = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 3
+
+        with pytest.raises(overloaded_error):
+            await executor.run(sum, [1])
+        assert executor.in_flight == 3
+
+        release.set()
+        assert await asyncio.gather(*held) == [True, True, True]
+        assert executor.in_flight == 0
+        return await executor.run(sum, [1])
+
+    try:
+        assert asyncio.run(run()) == 1
+    finally:
+        release.set()
+        executor.shutdown()
+
+def test_failures_release_their_slot(executor_cls):
+    executor = executor_cls(max_workers=1, max_queue=0)
+
+    async def run():
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+        return await executor.run(divmod, 7, 2)
+
+    try:
+        assert asyncio.run(run()) == (3, 1)
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+def test_rejected_submits_release_their_slot(executor_cls):
+    class ClosedExecutor:
+        def submit(self, func) -> Future:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    executor = executor_cls(max_workers=1, max_queue=0, executor=ClosedExecutor())
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.run(sum, [1]))
+    assert executor.in_flight == 0
+
+def test_wraps_any_executor(executor_cls):
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="custom")
+    executor = executor_cls(max_workers=1, max_queue=0, executor=pool)
+
+    try:
+        thread = asyncio.run(executor.run(threading.current_thread))
+        assert thread.name.startswith("custom")
+    finally:
+        executor.shutdown()
@@ -0,0 +1,75 @@
+from conftest import SOURCE, page
+from app.cache import ResultCache
+from app.cache.result_cache import normalize_query
+
+# Large enough that results are never cut short, so they are cached
+BUDGET_MS = 60000
+
+QUERY = " ".join(page("caching").split()[:8])
+
+def test_key_folds_case_and_whitespace():
+    assert normalize_query("  Image   Optimization\n") == "image optimization"
+
+    cache = ResultCache()
+    assert cache.key("nextjs", "1", "Image  Optimization") == cache.key("nextjs", "1", " image optimization ")
+    assert cache.key("nextjs", "1", "image optimization") != cache.key("nextjs", "1", "image loaders")
+
+def test_key_includes_source_and_version(workdir):
+    cache = ResultCache()
+    cache.put("nextjs", "1", "routing", {"status": "success"})
+
+    assert cache.get("nextjs", "1", "Routing") == {"status": "success"}
+    assert cache.get("nextjs", "2", "routing") is None
+    assert cache.get("react", "1", "routing") is None
+
+def test_cached_results_are_private_copies(workdir):
+    cache = ResultCache()
+    cache.put("nextjs", "1", "routing", {"results": [1]})
+
+    cache.get("nextjs", "1", "routing")["results"].append(2)
+    assert cache.get("nextjs", "1", "routing") == {"results": [1]}
+
+def test_result_cache_stores_no_cache_id(pipeline):
+    pipeline.process_documents(SOURCE)
+    pipeline.load_source(SOURCE)
+
+    first = pipeline.search_documents(QUERY, BUDGET_MS)
+    assert first["status"] == "success"
+    assert "cache_id" in first
+
+    # Semantic cache ids are local to this process, so they are not shared
+    version = pipeline.index.version
+    cached = ResultCache().get(SOURCE.value, version, QUERY)
+    assert cached is not None
+    assert "cache_id" not in cached
+
+    second = pipeline.search_documents(QUERY.upper(), BUDGET_MS)
+    assert second["search_path"] == {"exit": "result_cache"}
+    assert "cache_id" not in second
+    assert second["results"] == first["results"]
+
+def test_batch_result_cache_stores_no_cache_id(pipeline):
+    pipeline.process_documents(SOURCE)
+    pipeline.load_source(SOURCE)
+
+    first = pipeline.search_documents_batch([QUERY], BUDGET_MS)[0]
+    assert first["status"] == "success"
+    assert "cache_id" in first
+    assert "cache_id" not in ResultCache().get(SOURCE.value, pipeline.index.version, QUERY)
+
+    second = pipeline.search_documents_batch([QUERY], BUDGET_MS)[0]
+    assert second["search_path"] == {"exit": "result_cache"}
+    assert "cache_id" not in second
+
+def test_rebuild_changes_cache_key(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    pipeline.load_source(SOURCE)
+    pipeline.search_documents(QUERY, BUDGET_MS)
+    version = pipeline.index.version
+
+    site.pages["https://docs.example.com/fonts"] = page("typefaces")
+    pipeline.process_documents(SOURCE)
+
+    assert pipeline.index.version != version
+    result = pipeline.search_documents(QUERY, BUDGET_MS)
+    assert result["search_path"].get("exit") != "result_cache"
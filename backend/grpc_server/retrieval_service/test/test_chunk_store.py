@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from conftest import SOURCE, page
+from app.core.config import Config
+from app.storage.chunk_store import ChunkStore
+
+TEXTS = [f"chunk {number} über café {'x' * number}" for number in range(10)] + [""]
+URLS = [f"https://docs.example.com/page{number % 3}" for number in range(len(TEXTS))]
+TOKENS = [np.arange(number, dtype=np.int64) + 100 * number for number in range(len(TEXTS))]
+
+@pytest.mark.parametrize("compression,block_size", [(None, 64), ("zstd", 1), ("zstd", 4), ("zstd", 64)])
+def test_reads_back_texts_and_urls(tmp_path, compression, block_size):
+    store = ChunkStore.build(TEXTS, URLS, compression, block_size)
+    assert len(store) == len(TEXTS)
+    assert list(store) == TEXTS
+    assert store.texts(np.array([7, 0, 10, 3])) == [TEXTS[7], TEXTS[0], TEXTS[10], TEXTS[3]]
+
+    # URLs are stored once and looked up per chunk
+    assert store.urls == [f"https://docs.example.com/page{number}" for number in range(3)]
+    assert [store.url(idx) for idx in range(len(TEXTS))] == URLS
+    assert store.url(-1) == store.url(len(TEXTS)) == ""
+    assert store.tokens(0) is None and store.tokenizer is None
+
+    store.save(tmp_path)
+    for mmap_mode in (None, "r"):
+        loaded = ChunkStore.load(tmp_path, mmap_mode)
+        assert (loaded.compression, loaded.block_size) == (compression, block_size if compression else 0)
+        assert list(loaded) == TEXTS
+        assert [loaded.url(idx) for idx in range(len(TEXTS))] == URLS
+
+def test_compressed_blocks_are_decompressed_on_demand():
+    store = ChunkStore.build(TEXTS, URLS, "zstd", block_size=4)
+    assert len(store.block_offsets) == 4
+    assert store.blob.tobytes() != "".join(TEXTS).encode("utf-8")
+
+    assert store.text(5) == TEXTS[5]
+    assert list(store._blocks) == [1]
+
+    # Only the most recently used blocks stay decompressed
+    store.CACHED_BLOCKS = 2
+    for idx in (9, 0, 6):
+        store.text(idx)
+    assert list(store._blocks) == [0, 1]
+
+def test_stores_pretokenized_ids(tmp_path):
+    store = ChunkStore.build(TEXTS, URLS, "zstd", 4, TOKENS, "cross-encoder")
+    assert store.tokenizer == "cross-encoder"
+    assert store.token_ids.dtype == np.int32
+    for idx, tokens in enumerate(TOKENS):
+        np.testing.assert_array_equal(store.tokens(idx), tokens)
+
+    store.save(tmp_path)
+    loaded = ChunkStore.load(tmp_path, "r")
+    assert loaded.tokenizer == "cross-encoder"
+    for idx, tokens in enumerate(TOKENS):
+        np.testing.assert_array_equal(loaded.tokens(idx), tokens)
+
+    # Ids without a tokenizer name could not be matched to a model, so they are dropped
+    assert ChunkStore.build(TEXTS, URLS, chunk_tokens=TOKENS).tokenizer is None
+
+def test_memory_mapped_stores_hold_little(tmp_path):
+    store = ChunkStore.build(TEXTS, URLS, chunk_tokens=TOKENS, tokenizer="cross-encoder")
+    store.save(tmp_path)
+
+    url_bytes = sum(len(url) + 50 for url in store.urls)
+    assert store.nbytes > len("".join(TEXTS)) + url_bytes
+    assert ChunkStore.load(tmp_path).nbytes == store.nbytes
+    assert ChunkStore.load(tmp_path, "r").nbytes == url_bytes
+
+def test_empty_store(tmp_path):
+    store = ChunkStore.build([], [], "zstd")
+    store.save(tmp_path)
+
+    loaded = ChunkStore.load(tmp_path, "r")
+    assert len(loaded) == 0 and list(loaded) == []
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError):
+        ChunkStore.build(TEXTS, URLS[:-1])
+    with pytest.raises(ValueError):
+        ChunkStore.build(TEXTS, URLS, "gzip")
+
+def test_compressed_sources_serve_searches(pipeline, monkeypatch):
+    processing = Config().processing_configs
+    monkeypatch.setitem(processing, "chunk_compression", "zstd")
+    monkeypatch.setitem(processing, "chunk_block_size", 3)
+
+    pipeline.process_documents(SOURCE)
+    chunks = pipeline.registry.get(SOURCE).segments[0].chunks
+    assert chunks.compression == "zstd" and len(chunks.block_offsets) == 5
+
+    query = " ".join(page("testing").split()[8:])
+    pipeline.load_source(SOURCE)
+    result = pipeline.search_documents(query, 60000)["results"][0]
+    assert result["text"] == query
+    assert result["url"] == "https://docs.example.com/testing"
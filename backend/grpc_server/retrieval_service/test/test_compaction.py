@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import SOURCE, FakeTextEmbedding, page
+from app.core.config import Config
+from app.core.singleton import Singleton
+from app.retrieval.compaction import SegmentCompactor
+
+def make_compactor(monkeypatch, **settings):
+    config = Config()
+    for name, value in settings.items():
+        monkeypatch.setitem(config.serving_configs["compaction"], name, value)
+    Singleton.clear_instance(SegmentCompactor)
+    return SegmentCompactor()
+
+def live_chunks(pipeline):
+    index = pipeline.registry.get(SOURCE)
+    ids = index.chunk_ids().tolist()
+    return dict(zip(ids, index.texts(ids))), {chunk_id: index.url(chunk_id) for chunk_id in ids}
+
+def add_pages(pipeline, site, *topics):
+    for topic in topics:
+        site.pages[f"https://docs.example.com/{topic}"] = page(topic)
+        pipeline.process_documents(SOURCE)
+
+def test_merges_runs_of_small_segments(pipeline, site, monkeypatch):
+    pipeline.process_documents(SOURCE)
+    add_pages(pipeline, site, "middleware", "metadata")
+    assert len(pipeline.registry.get(SOURCE).segments) == 3
+    texts, urls = live_chunks(pipeline)
+
+    compactor = make_compactor(monkeypatch, merge_factor=3)
+    assert compactor.plan(pipeline.registry.get(SOURCE)) == [[0, 1, 2]]
+
+    dense_calls = FakeTextEmbedding.calls
+    assert compactor.compact(SOURCE)
+
+    index = pipeline.registry.get(SOURCE)
+    assert len(index.segments) == 1
+    # Chunks keep their ids, and exactly stored vectors are not embedded again
+    assert live_chunks(pipeline) == (texts, urls)
+    assert FakeTextEmbedding.calls == dense_calls
+    assert not compactor.compact(SOURCE)
+
+    # The merged segment serves searches
+    query = " ".join(page("metadata").split()[:8])
+    pipeline.load_source(SOURCE)
+    result = pipeline.search_documents(query, 60000)
+    assert result["results"][0]["text"] == query
+
+def test_drops_deleted_chunks(pipeline, site, monkeypatch):
+    pipeline.process_documents(SOURCE)
+    add_pages(pipeline, site, "middleware")
+    del site.pages["https://docs.example.com/routing"]
+    pipeline.process_documents(SOURCE)
+    texts, _ = live_chunks(pipeline)
+
+    assert make_compactor(monkeypatch, merge_factor=2).compact(SOURCE)
+
+    index = pipeline.registry.get(SOURCE)
+    assert len(index.segments) == 1
+    assert len(index.deleted) == 0
+    assert len(index.segments[0]) == len(texts)
+    assert live_chunks(pipeline)[0] == texts
+
+@pytest.mark.parametrize("merge_factor", [2, 4])
+def test_drops_fully_deleted_segments(pipeline, site, monkeypatch, merge_factor):
+    pipeline.process_documents(SOURCE)
+    add_pages(pipeline, site, "middleware")
+    # The page is dropped again, so its segment only holds deleted chunks
+    del site.pages["https://docs.example.com/middleware"]
+    pipeline.process_documents(SOURCE)
+    texts, _ = live_chunks(pipeline)
+    first = pipeline.registry.get(SOURCE).segments[0].name
+
+    # Only the new segment is small enough to be merged
+    compactor = make_compactor(monkeypatch, merge_factor=merge_factor, small_segment_rows=10)
+    assert compactor.plan(pipeline.registry.get(SOURCE)) == [[1]]
+    assert compactor.compact(SOURCE)
+
+    index = pipeline.registry.get(SOURCE)
+    assert [segment.name for segment in index.segments] == [first]
+    assert len(index.deleted) == 0
+    assert live_chunks(pipeline)[0] == texts
@@ -0,0 +1,128 @@
+import faiss
+import numpy as np
+import pytest
+
+from conftest import SOURCE, page
+from app.core.config import Config
+from app.retrieval.embeddings.index_factory import base_index, binarize, build_dense_index, build_faiss_index, configure_index, hamming_to_similarity, quantized_factory, stores_exact_vectors
+
+DIMENSION = 32
+
+def unit_vectors(n, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall(index, corpus, queries, k=10):
+    flat = faiss.IndexFlatIP(DIMENSION)
+    flat.add(corpus)
+    _, exact = flat.search(queries, k)
+    _, found = index.search(queries, k)
+    return np.mean([len(set(a) & set(b)) / k for a, b in zip(exact, found)])
+
+@pytest.mark.parametrize("factory,min_recall", [
+    ("Flat", 1.0),
+    ("HNSW32", 0.9),
+    ("IVF16,Flat", 0.9),
+    ("IVF16,PQ8x4", 0.3)
+])
+def test_factories_search_by_inner_product(factory, min_recall):
+    corpus = unit_vectors(2000)
+    queries = corpus[:50] + 0.05 * unit_vectors(50, seed=1)
+
+    index = configure_index(build_faiss_index(corpus, factory), {"ef_search": 64, "nprobe": 16})
+    assert index.metric_type == faiss.METRIC_INNER_PRODUCT
+    assert index.ntotal == len(corpus)
+    assert recall(index, corpus, queries) >= min_recall
+
+    # Search-time parameters apply to the index types that have them
+    if factory.startswith("HNSW"):
+        assert index.hnsw.efSearch == 64
+    if factory.startswith("IVF"):
+        assert faiss.extract_index_ivf(index).nprobe == 16
+
+def test_small_corpus_falls_back_to_flat():
+    index = build_faiss_index(unit_vectors(20), "IVF256,Flat")
+    assert isinstance(index, faiss.IndexFlatIP)
+    assert index.ntotal == 20
+
+def test_ids_are_returned_and_vectors_reconstructed():
+    corpus = unit_vectors(300)
+    ids = np.arange(1000, 1300, dtype=np.int64)
+
+    for factory in ("Flat", "HNSW32", "IVF8,Flat"):
+        index = configure_index(build_faiss_index(corpus, factory, ids=ids), {"nprobe": 8})
+        _, labels = index.search(corpus[5:6], 1)
+        assert labels[0, 0] == 1005
+
+        # Rows of the index inside the ID map follow the order vectors were added
+        assert stores_exact_vectors(index)
+        np.testing.assert_allclose(base_index(index).reconstruct_batch(np.array([5, 7])), corpus[[5, 7]], atol=1e-6)
+
+    assert not stores_exact_vectors(build_faiss_index(corpus, "IVF8,PQ8x4", ids=ids))
+    assert not stores_exact_vectors(build_faiss_index(corpus, "HNSW32,SQ8", ids=ids))
+
+def test_sources_override_the_index_type(pipeline, monkeypatch):
+    dense = Config().model_configs["dense"]
+    monkeypatch.setitem(dense, "source_indexes", {SOURCE.value: {"factory": "HNSW16"}})
+    assert Config().get_index_config(SOURCE.value)["factory"] == "HNSW16"
+    assert Config().get_index_config("react")["factory"] == dense["index"]["factory"]
+
+    pipeline.process_documents(SOURCE)
+    index = pipeline.registry.get(SOURCE)
+    assert isinstance(base_index(index.segments[0].dense_index), faiss.IndexHNSW)
+
+    query = " ".join(page("fonts").split()[8:])
+    pipeline.load_source(SOURCE)
+    assert pipeline.search_documents(query, 60000)["results"][0]["text"] == query
+
+def test_quantized_factory_strings():
+    assert quantized_factory("Flat") == "SQ8"
+    assert quantized_factory("HNSW32") == "HNSW32,SQ8"
+    assert quantized_factory("HNSW32,Flat") == "HNSW32,SQ8"
+    assert quantized_factory("IVF256,Flat") == "IVF256,SQ8"
+    # Already compressed codes are left alone
+    assert quantized_factory("IVF256,PQ48") == "IVF256,PQ48"
+
+def test_storage_modes():
+    corpus = unit_vectors(500)
+    ids = np.arange(500, dtype=np.int64)
+
+    # The ID map owns the index inside it, so it has to stay referenced
+    int8 = build_dense_index(corpus, "Flat", "int8", ids=ids)
+    assert isinstance(base_index(int8), faiss.IndexScalarQuantizer)
+    assert base_index(int8).sa_code_size() == DIMENSION
+
+    binary = build_dense_index(corpus, "Flat", "binary", ids=ids)
+    assert isinstance(binary, faiss.IndexBinary)
+    assert binary.code_size == DIMENSION // 8
+
+    # Hamming distances of sign codes track cosine similarity
+    distances, labels = binary.search(binarize(corpus[:1]), 500)
+    similarity = hamming_to_similarity(distances[0], DIMENSION)
+    assert labels[0, 0] == 0 and similarity[0] == 1.0
+    assert np.corrcoef(similarity, corpus[labels[0]] @ corpus[0])[0, 1] > 0.5
+
+    with pytest.raises(ValueError):
+        build_dense_index(corpus, "Flat", "int4")
+
+@pytest.mark.parametrize("storage", ["int8", "binary"])
+def test_rescoring_uses_full_precision(pipeline, monkeypatch, storage):
+    index_config = Config().model_configs["dense"]["index"]
+    monkeypatch.setitem(index_config, "storage", storage)
+    monkeypatch.setitem(index_config, "rescore", True)
+
+    pipeline.process_documents(SOURCE)
+    index = pipeline.registry.get(SOURCE)
+    segment = index.segments[0]
+    assert segment.dense_vectors is not None and segment.dense_vectors.dtype == np.float16
+    assert not stores_exact_vectors(segment.dense_index)
+
+    query = pipeline.dense_embedder.embed_query(" ".join(page("images").split()[:8]))
+    scores, ids = index.dense_search(query, 5)
+
+    # Candidates come back ordered by their fp16 inner products
+    expected = index.get_vectors(ids) @ query
+    np.testing.assert_allclose(scores, expected, rtol=1e-6)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert index.text(int(ids[0])) == " ".join(page("images").split()[:8])
+    assert scores[0] == pytest.approx(1.0, abs=1e-3)
@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+from aiohttp import web
+
+from app.core.config import Config
+from app.retrieval.processing import URLFetcher
+from app.retrieval.processing.fetcher import HostLimiter
+
+def html(text: str) -> str:
+    return f"<html><body><nav>Menu</nav><p>{text}</p></body></html>"
+
+class DocsServer:
+    """Local HTTP server answering each path with a scripted list of responses.
+
+    The last response of a path repeats once the others are used up.
+    """
+
+    def __init__(self):
+        self.responses = {}
+        # (path, headers, monotonic time) of every request
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+
+        self.loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self.handle)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{path}"
+
+    def requested(self, path: str) -> list:
+        return [request for request in self.requests if request[0] == f"/{path}"]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append((request.path, dict(request.headers), time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        responses = self.responses.get(request.path.lstrip("/"), [(404, {}, "")])
+        status, headers, body = responses.pop(0) if len(responses) > 1 else responses[0]
+        return web.Response(status=status, headers=headers, text=body, content_type="text/html")
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+@pytest.fixture
+def server():
+    server = DocsServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def fetcher(monkeypatch):
+    config = Config()
+    monkeypatch.setitem(config.processing_configs, "max_retries", 3)
+    monkeypatch.setitem(config.processing_configs["crawl"], "backoff_base", 0.01)
+    monkeypatch.setitem(config.processing_configs["crawl"], "per_host_rate", 0)
+    return URLFetcher()
+
+def test_fetches_pages_concurrently(server, fetcher):
+    server.delay = 0.1
+    for number in range(12):
+        server.responses[f"page{number}"] = [(200, {}, html(f"Text of page number {number} for the crawler"))]
+
+    urls = [server.url(f"page{number}") for number in range(12)]
+    results = {result.url: result for result in fetcher.iter_pages(urls)}
+
+    assert set(results) == set(urls)
+    assert results[urls[3]].content == "Text of page number 3 for the crawler"
+    # Requests overlap, but never beyond the per-host limit
+    assert 1 < server.max_in_flight <= fetcher.per_host_concurrency
+
+def test_retries_transient_errors_only(server, fetcher):
+    server.responses["flaky"] = [(503, {}, ""), (502, {}, ""), (200, {}, html("Served on the third attempt, finally"))]
+    server.responses["missing"] = [(404, {}, "")]
+    server.responses["down"] = [(500, {}, "")]
+
+    results = {
+        result.url: result.content
+        for result in fetcher.iter_pages([server.url("flaky"), server.url("missing"), server.url("down")])
+    }
+
+    assert results[server.url("flaky")] == "Served on the third attempt, finally"
+    assert len(server.requested("flaky")) == 3
+    assert results[server.url("missing")] is None
+    assert len(server.requested("missing")) == 1
+    assert results[server.url("down")] is None
+    assert len(server.requested("down")) == fetcher.max_retries
+
+def test_waits_as_long_as_retry_after_asks(server, fetcher):
+    server.responses["busy"] = [(429, {"Retry-After": "0.4"}, ""), (200, {}, html("Served once the host had a rest"))]
+
+    assert fetcher.fetch_url_content(server.url("busy")) == "Served once the host had a rest"
+    first, second = server.requested("busy")
+    assert second[2] - first[2] >= 0.4
+
+def test_stops_when_the_caller_does(server, fetcher):
+    for number in range(50):
+        server.responses[f"page{number}"] = [(200, {}, html(f"Text of page number {number} for the crawler"))]
+
+    pages = fetcher.iter_pages([server.url(f"page{number}") for number in range(50)])
+    next(pages)
+    pages.close()
+
+    assert not any(thread.name == "crawler" for thread in threading.enumerate())
+
+def test_backoff_is_jittered_and_capped(fetcher):
+    for attempt in range(1, 5):
+        delays = [fetcher._backoff(attempt) for _ in range(50)]
+        assert all(0 <= delay <= fetcher.backoff_base * 2 ** attempt for delay in delays)
+        assert len(set(delays)) > 1
+
+    assert fetcher._backoff(1, retry_after=5.0) == 5.0
+    assert fetcher._backoff(1, retry_after=10 * fetcher.backoff_max) == fetcher.backoff_max
+    assert fetcher._backoff(30) <= fetcher.backoff_max
+
+def test_parses_retry_after():
+    assert URLFetcher._retry_after("120") == 120.0
+    assert URLFetcher._retry_after("-3") == 0.0
+    assert URLFetcher._retry_after(None) is None
+    assert URLFetcher._retry_after("soon") is None
+    assert 25 < URLFetcher._retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert URLFetcher._retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+def test_limiter_spaces_requests_and_honors_pauses():
+    async def run():
+        limiter = HostLimiter(concurrency=4, rate=20)
+        started = []
+        for _ in range(3):
+            async with limiter:
+                started.append(time.monotonic())
+
+        limiter.pause(0.2)
+        paused = time.monotonic()
+        async with limiter:
+            resumed = time.monotonic()
+        return started, resumed - paused
+
+    started, waited = asyncio.run(run())
+    assert all(b - a >= 0.045 for a, b in zip(started, started[1:]))
+    assert waited >= 0.19
+
+def test_limiter_releases_slot_when_cancelled():
+    async def run():
+        limiter = HostLimiter(concurrency=1, rate=0)
+        limiter.pause(10)
+
+        # Cancelled while waiting for its rate slot, after taking the semaphore
+        task = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        return limiter.semaphore.locked()
+
+    assert not asyncio.run(run())
+
+def test_conditional_requests(server, fetcher):
+    modified = "Wed, 21 Oct 2026 07:28:00 GMT"
+    server.responses["fresh"] = [(200, {"ETag": '"v1"', "Last-Modified": modified}, html("First version of the page text"))]
+    server.responses["cached"] = [(304, {}, "")]
+    server.responses["changed"] = [(200, {"ETag": '"v3"'}, html("Second version of the page text"))]
+
+    first, = fetcher.iter_pages([server.url("fresh")])
+    assert first.content == "First version of the page text"
+    assert (first.etag, first.last_modified) == ('"v1"', modified)
+    assert "If-None-Match" not in server.requested("fresh")[0][1]
+
+    validators = {
+        server.url("cached"): {"etag": '"v1"', "last_modified": modified},
+        server.url("changed"): {"etag": '"v2"', "last_modified": None}
+    }
+    results = {
+        result.url: result
+        for result in fetcher.iter_pages([server.url("cached"), server.url("changed")], validators)
+    }
+
+    headers = server.requested("cached")[0][1]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == modified
+    assert "If-Modified-Since" not in server.requested("changed")[0][1]
+
+    # A 304 keeps the stored validators the server did not repeat
+    cached = results[server.url("cached")]
+    assert cached.not_modified and cached.content is None
+    assert (cached.etag, cached.last_modified) == ('"v1"', modified)
+
+    changed = results[server.url("changed")]
+    assert not changed.not_modified
+    assert changed.content == "Second version of the page text"
+    assert changed.etag == '"v3"'
+
+def test_sitemap_entries_keep_lastmod(server, fetcher):
+    server.responses["sitemap.xml"] = [(200, {}, (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        '<url><loc>https://docs.example.com/a</loc><lastmod>2026-10-01</lastmod></url>'
+        '<url><loc>https://docs.example.com/b</loc></url>'
+        '</urlset>'
+    ))]
+
+    assert fetcher.fetch_sitemap_entries(server.url("sitemap.xml")) == {
+        "https://docs.example.com/a": "2026-10-01",
+        "https://docs.example.com/b": None
+    }
@@ -0,0 +1,104 @@
+import hashlib
+
+import pytest
+
+from conftest import SOURCE, FakeCrossEncoder, page
+from app.retrieval.query_context import QueryContext
+
+TOPICS = [
+    "routing", "caching", "images", "fonts", "testing", "deploy", "middleware", "metadata",
+    "rendering", "streaming", "styling", "linting", "bundling", "auth", "forms"
+]
+
+class HashCrossEncoder(FakeCrossEncoder):
+    """Scores unrelated to fusion, so later candidates can hold the extremes."""
+
+    def rerank(self, query, documents, **kwargs):
+        for document in documents:
+            yield int(hashlib.md5((query + document).encode("utf-8")).hexdigest()[:8], 16) / 2**32
+
+@pytest.fixture
+def index(pipeline, site, monkeypatch):
+    """A source with more chunks than the baseline's 20 rerank candidates."""
+    for topic in TOPICS:
+        site.pages[f"https://docs.example.com/{topic}"] = page(topic)
+    pipeline.process_documents(SOURCE)
+
+    # Always take the cross-encoder path
+    monkeypatch.setattr(pipeline.search, "rerank_skip_margin", 2.0)
+    monkeypatch.setattr(pipeline.search.reranker, "model", HashCrossEncoder())
+    monkeypatch.setattr(pipeline.search.reranker, "score_cache", None)
+    return pipeline.registry.get(SOURCE)
+
+def context(pipeline, query, budget_ms=None):
+    return QueryContext(query, pipeline.dense_embedder, pipeline.sparse_embedder, budget_ms)
+
+def baseline_order(pipeline, index, query):
+    """Final scores of the pre-adaptive search.
+
+    It reranked the top 20 fused candidates, but ``Reranker.rerank`` only
+    returned the first ``top_k=10`` scores, so the blend and the rerank
+    normalization covered the top 10 candidates.
+    """
+    search = pipeline.search
+    query_context = context(pipeline, query)
+    dense_scores, dense_ids = index.dense_search(query_context.dense_embedding, 50)
+    docs = search._combine(query_context, index, dense_scores, dense_ids)
+
+    texts = index.texts([doc["index"] for doc in docs[:20]])
+    rerank_scores = list(HashCrossEncoder().rerank(query, texts))[:10]
+    norm_rerank = search.normalize_scores(rerank_scores)
+
+    return {
+        doc["index"]: (1 - search.rerank_weight) * doc["scores"]["combined"] + search.rerank_weight * rerank
+        for doc, rerank in zip(docs[:10], norm_rerank)
+    }
+
+QUERIES = [
+    # Mostly one chunk, with words of others for the reranker to weigh
+    " ".join(page("caching").split()[:7] + ["routing1", "images2"]),
+    " ".join(page("forms").split()[:6] + ["auth0", "auth1", "styling3"]),
+]
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_rerank_matches_baseline_scores(pipeline, index, query):
+    query_context = context(pipeline, query)
+    results = pipeline.search.search(query_context, index)
+
+    assert query_context.search_path["exit"] == "rerank"
+    assert query_context.search_path["reranked"] == pipeline.search.final_results
+
+    expected = baseline_order(pipeline, index, query)
+    assert {doc["index"] for doc in results} == set(expected)
+    for doc in results:
+        assert doc["scores"]["final"] == pytest.approx(expected[doc["index"]])
+
+    finals = [doc["scores"]["final"] for doc in results]
+    assert finals == sorted(finals, reverse=True)
+
+def test_batch_matches_single_search(pipeline, index):
+    queries = QUERIES + ["unrelated words nobody wrote"]
+    single = [pipeline.search.search(context(pipeline, query), index) for query in queries]
+    batch = pipeline.search.search_batch([context(pipeline, query) for query in queries], index)
+
+    assert [[doc["index"] for doc in docs] for docs in batch] == [[doc["index"] for doc in docs] for docs in single]
+
+def test_low_score_skips_sparse_search(pipeline, index, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("sparse search ran")
+    monkeypatch.setattr(index, "sparse_search", fail)
+
+    query_context = context(pipeline, "unrelated words nobody wrote")
+    assert pipeline.search.search(query_context, index) == []
+    assert query_context.search_path["exit"] == "low_score"
+
+def test_deadline_shrinks_rerank_depth(pipeline, index, monkeypatch):
+    # Pretend a pair costs 10ms, so a 50ms budget affords a few pairs
+    monkeypatch.setattr(pipeline.search.reranker, "pair_seconds", 0.01)
+
+    query_context = context(pipeline, QUERIES[0], budget_ms=50)
+    results = pipeline.search.search(query_context, index)
+
+    assert query_context.search_path["degraded"]
+    assert query_context.search_path["reranked"] < pipeline.search.final_results
+    assert len(results) == pipeline.search.final_results
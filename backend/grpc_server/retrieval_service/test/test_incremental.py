@@ -0,0 +1,111 @@
+from pathlib import Path
+import sys
+
+from conftest import SOURCE, FakeSparseTextEmbedding, FakeTextEmbedding, page
+from app.retrieval.base import RetrievalPipeline
+from app.retrieval.registry import SourceRegistry
+
+def live_urls(pipeline):
+    return set(pipeline.registry.get(SOURCE).urls)
+
+def test_unchanged_crawl_embeds_nothing(pipeline):
+    pipeline.process_documents(SOURCE)
+    chunks = len(pipeline.registry.get(SOURCE))
+
+    dense_calls, sparse_calls = FakeTextEmbedding.calls, FakeSparseTextEmbedding.calls
+    pipeline.process_documents(SOURCE)
+
+    assert FakeTextEmbedding.calls == dense_calls
+    assert FakeSparseTextEmbedding.calls == sparse_calls
+    assert len(pipeline.registry.get(SOURCE)) == chunks
+
+def test_modified_page_embeds_only_new_chunks(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    index = pipeline.registry.get(SOURCE)
+    chunks, next_id = len(index), index.next_id
+
+    url = "https://docs.example.com/caching"
+    site.pages[url] += " revalidate tags on demand"
+
+    dense_calls = FakeTextEmbedding.calls
+    pipeline.process_documents(SOURCE)
+
+    index = pipeline.registry.get(SOURCE)
+    # The first two chunks are kept; only the appended third one is embedded
+    assert FakeTextEmbedding.calls - dense_calls == 1
+    assert len(index) == chunks + 1
+    assert index.text(next_id) == "revalidate tags on demand"
+    assert index.url(next_id) == url
+
+def test_kept_chunks_keep_their_ids(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    before = pipeline.registry.get(SOURCE)
+    texts = dict(zip(before.chunk_ids().tolist(), before.texts(before.chunk_ids().tolist())))
+
+    site.pages["https://docs.example.com/images"] = page("images", 8) + " " + page("lazy", 8)
+    pipeline.process_documents(SOURCE)
+
+    after = pipeline.registry.get(SOURCE)
+    kept = set(before.chunk_ids().tolist()) & set(after.chunk_ids().tolist())
+    assert len(kept) == len(texts) - 1
+    assert all(after.text(chunk_id) == texts[chunk_id] for chunk_id in kept)
+
+def test_page_dropped_from_sitemap_is_removed(pipeline, site):
+    pipeline.process_documents(SOURCE)
+
+    url = "https://docs.example.com/fonts"
+    del site.pages[url]
+    pipeline.process_documents(SOURCE)
+
+    assert url not in live_urls(pipeline)
+    assert url not in pipeline.data_manager.load_ingest_state(SOURCE)["pages"]
+
+def test_failed_fetch_keeps_page(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    chunks = len(pipeline.registry.get(SOURCE))
+    pages = pipeline.data_manager.load_ingest_state(SOURCE)["pages"]
+
+    url = "https://docs.example.com/testing"
+    site.failing.add(url)
+    pipeline.process_documents(SOURCE)
+
+    assert url in live_urls(pipeline)
+    assert len(pipeline.registry.get(SOURCE)) == chunks
+    assert pipeline.data_manager.load_ingest_state(SOURCE)["pages"][url] == pages[url]
+
+    # The page is fetched again and updated once it is reachable
+    site.failing.clear()
+    site.pages[url] = page("vitest")
+    pipeline.process_documents(SOURCE)
+
+    index = pipeline.registry.get(SOURCE)
+    assert any(text.startswith("vitest0") for text in index.texts(index.chunk_ids().tolist()))
+    assert not any(text.startswith("testing0") for text in index.texts(index.chunk_ids().tolist()))
+
+def test_full_rebuild_replaces_segments(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    pipeline.process_documents(SOURCE, incremental=False)
+
+    index = pipeline.registry.get(SOURCE)
+    assert len(index.segments) == 1
+    assert len(index.deleted) == 0
+    assert live_urls(pipeline) == set(site.pages)
+
+def test_forced_init_rebuilds_everything(workdir, site, monkeypatch):
+    monkeypatch.syspath_prepend(str(Path(__file__).parent.parent / "scripts"))
+    import init_docs
+
+    monkeypatch.setattr(init_docs, "RetrievalPipeline", lambda: site.attach(RetrievalPipeline(SOURCE)))
+    monkeypatch.setattr(sys, "argv", ["init_docs.py", "--sources", SOURCE.value])
+    init_docs.main()
+    chunks = len(SourceRegistry().get(SOURCE))
+
+    # Without --force existing data is left alone
+    dense_calls = FakeTextEmbedding.calls
+    init_docs.main()
+    assert FakeTextEmbedding.calls == dense_calls
+
+    monkeypatch.setattr(sys, "argv", ["init_docs.py", "--sources", SOURCE.value, "--force"])
+    init_docs.main()
+    assert FakeTextEmbedding.calls - dense_calls == chunks
+    assert len(SourceRegistry().get(SOURCE).segments) == 1
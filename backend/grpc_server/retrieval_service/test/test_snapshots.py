@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from conftest import SOURCE, page, write_legacy_layout
+from app.core.config import Config
+from app.storage import DataManager
+
+def all_texts(pipeline):
+    index = pipeline.registry.get(SOURCE)
+    return set(index.texts(index.chunk_ids().tolist()))
+
+def test_commit_creates_version_and_rollback_restores_it(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    first = pipeline.data_manager.current_version(SOURCE)
+    before = all_texts(pipeline)
+
+    site.pages["https://docs.example.com/routing"] = page("middleware")
+    pipeline.process_documents(SOURCE)
+    second = pipeline.data_manager.current_version(SOURCE)
+
+    assert second != first
+    assert pipeline.data_manager.list_versions(SOURCE) == [first, second]
+    assert pipeline.data_manager.load_manifest(SOURCE)["parent"] == first
+    after = all_texts(pipeline)
+    assert after != before
+
+    assert pipeline.rollback(SOURCE) == first
+    assert pipeline.data_manager.current_version(SOURCE) == first
+    assert all_texts(pipeline) == before
+
+    # An explicit version goes forward again
+    assert pipeline.rollback(SOURCE, second) == second
+    assert all_texts(pipeline) == after
+
+def test_rollback_without_earlier_version_fails(pipeline):
+    pipeline.process_documents(SOURCE)
+    current = pipeline.data_manager.current_version(SOURCE)
+
+    with pytest.raises(ValueError):
+        pipeline.rollback(SOURCE)
+    with pytest.raises(ValueError):
+        pipeline.rollback(SOURCE, "0")
+    assert pipeline.data_manager.current_version(SOURCE) == current
+
+def test_failed_crawl_keeps_current_version(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    current = pipeline.data_manager.current_version(SOURCE)
+    texts = all_texts(pipeline)
+    segments = set(p.name for p in (pipeline.data_manager.get_source_dir(SOURCE) / "segments").iterdir())
+
+    # A full rebuild where most downloads fail keeps far fewer live chunks
+    site.failing.update(list(site.pages)[1:])
+    with pytest.raises(ValueError):
+        pipeline.process_documents(SOURCE, incremental=False)
+
+    assert pipeline.data_manager.current_version(SOURCE) == current
+    assert pipeline.data_manager.list_versions(SOURCE) == [current]
+    assert all_texts(pipeline) == texts
+    # Segments of the rejected build are discarded
+    assert set(p.name for p in (pipeline.data_manager.get_source_dir(SOURCE) / "segments").iterdir()) == segments
+
+def test_prune_keeps_configured_versions(pipeline, site):
+    keep = Config().serving_configs["snapshots"]["keep_versions"]
+    url = "https://docs.example.com/deploy"
+
+    for build in range(keep + 2):
+        site.pages[url] = page(f"deploy{build}x")
+        pipeline.process_documents(SOURCE)
+
+    data_dir = pipeline.data_manager.get_source_dir(SOURCE)
+    versions = pipeline.data_manager.list_versions(SOURCE)
+    assert len(versions) == keep
+    assert versions[-1] == pipeline.data_manager.current_version(SOURCE)
+
+    # Segments only the dropped versions used are removed with them
+    in_use = set()
+    for version in versions:
+        in_use.update(pipeline.data_manager.load_manifest(SOURCE, version)["segments"])
+    assert set(p.name for p in (data_dir / "segments").iterdir()) == in_use
+
+    # Every kept version can still be served
+    for version in versions[:-1]:
+        assert pipeline.rollback(SOURCE, version) == version
+
+def test_legacy_layout_is_upgraded(workdir):
+    manager = DataManager()
+    data_dir = manager.get_source_dir(SOURCE)
+
+    chunks = ["routing with the app router", "static and dynamic rendering", "optimizing images"]
+    write_legacy_layout(data_dir, chunks)
+
+    assert manager.check_data_exists(SOURCE)
+    assert manager.current_version(SOURCE) is None
+    manager.upgrade(SOURCE)
+
+    version = manager.current_version(SOURCE)
+    assert version is not None
+    assert sorted(p.name for p in data_dir.iterdir() if not p.name.startswith(".")) == ["CURRENT", "segments", "versions"]
+
+    # Upgrading again is a no-op
+    manager.upgrade(SOURCE)
+    assert manager.list_versions(SOURCE) == [version]
+
+    data = manager.load_data(SOURCE)
+    segment = data["segments"][0]
+    assert segment["chunks"].texts(np.arange(len(chunks))) == chunks
+    assert segment["chunks"].url(1) == "https://docs.example.com/1"
+    assert segment["ids"].tolist() == [0, 1, 2]
+
+def test_servers_pick_up_versions_activated_elsewhere(pipeline, site):
+    pipeline.process_documents(SOURCE)
+    first = pipeline.data_manager.current_version(SOURCE)
+    site.pages["https://docs.example.com/routing"] = page("middleware")
+    pipeline.process_documents(SOURCE)
+    pipeline.load_source(SOURCE)
+    second = pipeline.index.version
+
+    # Another process, e.g. the rollback script, only moves the CURRENT pointer
+    DataManager().rollback(SOURCE, first)
+    assert pipeline.index.version == first
+    assert "middleware0" not in " ".join(all_texts(pipeline))
+
+    query = " ".join(page("routing").split()[:8])
+    assert pipeline.search_documents(query, 60000)["results"][0]["text"] == query
+
+    DataManager().rollback(SOURCE, second)
+    assert pipeline.index.version == second
+
+def test_failed_reload_keeps_serving(pipeline):
+    pipeline.process_documents(SOURCE)
+    pipeline.load_source(SOURCE)
+    index = pipeline.index
+
+    (pipeline.data_manager.get_source_dir(SOURCE) / "CURRENT").write_text("ffffffff")
+    assert pipeline.index is index
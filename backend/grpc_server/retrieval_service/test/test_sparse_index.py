@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from conftest import SOURCE, page
+from fastembed import SparseEmbedding
+from app.storage import CSRMatrix, InvertedIndex
+
+def random_matrix(rng, n_docs, n_terms=200, terms_per_doc=12):
+    return CSRMatrix.from_embeddings([
+        SparseEmbedding(
+            indices=rng.choice(n_terms, size=terms_per_doc, replace=False),
+            values=rng.random(terms_per_doc).astype(np.float32)
+        )
+        for _ in range(n_docs)
+    ])
+
+def brute_force(matrix, indices, values, k):
+    """Top-k documents with a positive score, scoring every row."""
+    scores = matrix.dot(np.arange(len(matrix)), indices, values)
+    order = np.argsort(-scores, kind="stable")
+    order = order[scores[order] > 0][:k]
+    return scores[order], order
+
+@pytest.mark.parametrize("n_docs,k,terms_per_doc,query_terms", [
+    (500, 10, 12, 8),
+    (500, 50, 12, 8),
+    (30, 10, 12, 8),
+    (1, 5, 12, 8),
+    # More postings than k but fewer documents, as in small segments
+    (10, 50, 150, 60),
+    (40, 40, 150, 60)
+])
+def test_search_matches_brute_force(n_docs, k, terms_per_doc, query_terms):
+    rng = np.random.default_rng(n_docs * 1000 + k)
+    matrix = random_matrix(rng, n_docs, terms_per_doc=terms_per_doc)
+    index = InvertedIndex.build(matrix)
+
+    for _ in range(20):
+        indices = rng.choice(220, size=query_terms, replace=False)
+        values = rng.random(query_terms).astype(np.float32)
+
+        scores, docs = index.search(indices, values, k)
+        expected_scores, expected_docs = brute_force(matrix, indices, values, k)
+
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+        assert docs.tolist() == expected_docs.tolist()
+
+def test_search_without_matching_terms():
+    index = InvertedIndex.build(random_matrix(np.random.default_rng(0), 20))
+
+    for indices, values, k in [([500], [1.0], 5), ([3], [0.0], 5), ([3], [1.0], 0)]:
+        scores, docs = index.search(np.array(indices), np.array(values), k)
+        assert scores.size == 0 and docs.size == 0
+
+    scores, docs = InvertedIndex.build(CSRMatrix.from_embeddings([])).search(np.array([1]), np.array([1.0]), 5)
+    assert docs.size == 0
+
+def test_save_and_load(tmp_path):
+    matrix = random_matrix(np.random.default_rng(1), 40)
+    index = InvertedIndex.build(matrix)
+    index.save(tmp_path / "inverted")
+
+    loaded = InvertedIndex.load(tmp_path / "inverted", mmap_mode="r")
+    assert loaded.n_docs == 40
+
+    query = (np.array([1, 5, 9, 40]), np.array([0.5, 1.0, 0.2, 0.7], dtype=np.float32))
+    for expected, actual in zip(index.search(*query, 10), loaded.search(*query, 10)):
+        np.testing.assert_array_equal(expected, actual)
+
+def test_csr_take_and_stack():
+    rng = np.random.default_rng(2)
+    first, second = random_matrix(rng, 7), random_matrix(rng, 5, n_terms=300)
+    stacked = CSRMatrix.stack([first, second])
+
+    assert stacked.shape == (12, max(first.n_cols, second.n_cols))
+    for row in range(5):
+        for expected, actual in zip(second.row(row), stacked.row(7 + row)):
+            np.testing.assert_array_equal(expected, actual)
+
+    taken = stacked.take([9, 0, 9])
+    assert len(taken) == 3
+    for position, row in enumerate([9, 0, 9]):
+        for expected, actual in zip(stacked.row(row), taken.row(position)):
+            np.testing.assert_array_equal(expected, actual)
+
+def test_csr_dot_pads_missing_rows():
+    matrix = CSRMatrix.from_embeddings([
+        SparseEmbedding(indices=np.array([3, 1]), values=np.array([2.0, 1.0])),
+        SparseEmbedding(indices=np.array([], dtype=np.int64), values=np.array([]))
+    ])
+    # Columns of each row are sorted on build
+    assert matrix.row(0)[0].tolist() == [1, 3]
+
+    scores = matrix.dot([0, 1, -1, 5], np.array([3, 7]), np.array([0.5, 1.0]))
+    assert scores.tolist() == [1.0, 0.0, 0.0, 0.0]
+
+def test_search_after_adding_a_small_segment(pipeline, site, monkeypatch):
+    # Fewer sparse candidates than the fake sparse vectors have terms, as with SPLADE
+    monkeypatch.setattr(pipeline.search, "sparse_k", 4)
+    pipeline.process_documents(SOURCE)
+    site.pages["https://docs.example.com/middleware"] = page("middleware")
+    pipeline.process_documents(SOURCE)
+    pipeline.load_source(SOURCE)
+
+    # The new segment holds fewer chunks than the sparse candidates asked of it
+    index = pipeline.index
+    assert min(len(segment) for segment in index.segments) < pipeline.search.sparse_k
+
+    query = " ".join(page("middleware").split()[:8])
+    result = pipeline.search_documents(query, 60000)
+    assert result["status"] == "success"
+    assert "middleware0" in result["results"][0]["text"]
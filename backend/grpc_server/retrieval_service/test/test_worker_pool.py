@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import SOURCE, write_legacy_layout
+from app.core.enums import DocSource
+from app.storage import DataManager
+
+CHUNKS = ["routing with the app router", "static and dynamic rendering", "optimizing images"]
+
+def upgrade(source: str) -> str:
+    manager = DataManager()
+    manager.upgrade(DocSource[source.upper()])
+    return manager.current_version(DocSource[source.upper()])
+
+@pytest.fixture
+def pool(server_path):
+    from utils.worker_pool import WorkerPool
+    # Workers without sources start quickly and never load models
+    pool = WorkerPool(2, [])
+    yield pool
+    pool.shutdown()
+
+def test_processes_sharing_legacy_data_convert_it_once(workdir):
+    manager = DataManager()
+    write_legacy_layout(manager.get_source_dir(SOURCE), CHUNKS)
+
+    # Forked processes share the fake models and working directory of the test
+    with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context("fork")) as executor:
+        versions = list(executor.map(upgrade, [SOURCE.value] * 4))
+
+    assert len(set(versions)) == 1 and versions[0] is not None
+    assert manager.list_versions(SOURCE) == versions[:1]
+    segment = manager.load_data(SOURCE)["segments"][0]
+    assert segment["chunks"].texts(range(len(CHUNKS))) == CHUNKS
+
+def test_pool_converts_legacy_data_before_starting(server_path, monkeypatch):
+    from utils import worker_pool
+
+    manager = DataManager()
+    write_legacy_layout(manager.get_source_dir(SOURCE), CHUNKS)
+
+    # Only the parent's conversion is under test, so no workers are started
+    def start_pool(processes, initializer, initargs):
+        assert DataManager().current_version(SOURCE) is not None
+
+    context = SimpleNamespace(Pool=start_pool)
+    monkeypatch.setattr(worker_pool.multiprocessing, "get_context", lambda method: context)
+    monkeypatch.setattr(worker_pool, "DataManager", DataManager)
+    worker_pool.WorkerPool(2, [SOURCE.value])
+
+    assert len(manager.list_versions(SOURCE)) == 1
+
+def test_pool_runs_calls_in_workers(pool):
+    pids = {pool.submit(os.getpid).result(timeout=60) for _ in range(8)}
+    assert os.getpid() not in pids
+    assert 1 <= len(pids) <= 2
+
+    # Errors raised in a worker reach the caller
+    with pytest.raises(ValueError):
+        pool.submit(int, "not a number").result(timeout=60)
+
+def test_bounded_executor_limits_calls_to_the_pool(pool):
+    from core.exceptions import RetrievalOverloadedError
+    from utils.bounded_executor import BoundedExecutor
+
+    executor = BoundedExecutor(max_workers=2, max_queue=0, executor=pool)
+
+    async def run():
+        held = [asyncio.ensure_future(executor.run(time.sleep, 0.5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(RetrievalOverloadedError):
+            await executor.run(os.getpid)
+
+        await asyncio.gather(*held)
+        return await executor.run(os.getpid)
+
+    assert asyncio.run(run()) != os.getpid()
+    assert executor.in_flight == 0
@@ -7,6 +7,7 @@ import time
 
 from chat_service_pb2 import ChatRequest, ChatResponse, InitSourceRequest, InitSourceResponse, Message, ProcessDocRequest, ProcessDocResponse, ModelsResponse, SourcesResponse
 from chat_service_pb2_grpc import ChatServiceServicer, add_ChatServiceServicer_to_server
+from core.exceptions import RetrievalOverloadedError
 from core.models import ModelsManager
 from core.logger import setup_logger
 from agents.qa_agent import QAAgent
@@ -50,6 +51,9 @@ class ChatServicer(ChatServiceServicer):
             except Exception as e:
                 logger.error(f"✗ Failed to initialize {source.value}: {e}")
         
+        # Workers load the sources initialized above
+        await self.pipeline_manager.start_workers()
+        
         logger.info(f"Server initialization complete! Available models: {list(self.available_models.keys())}")
         logger.info(f"Initialized sources: {list(self.initialized_sources)}")
 
@@ -130,6 +134,9 @@ class ChatServicer(ChatServiceServicer):
                     logger.error(f"Error processing chunk: {e}")
                     continue
                 
+        except RetrievalOverloadedError as e:
+            logger.warning(f"Rejecting StreamChat: {e}")
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
         except Exception as e:
             logger.error(f"Error in StreamChat: {e}")
             yield ChatResponse(
@@ -166,7 +173,9 @@ class ChatServicer(ChatServiceServicer):
             
             # Get pipeline and process documents
             pipeline = await self.pipeline_manager.get_pipeline(source.value)
-            pipeline.process_documents(source.value)
+            # A crawl takes minutes; keep the event loop serving other requests
+            await asyncio.to_thread(pipeline.process_documents, source)
+            await self.pipeline_manager.refresh_source(source.value)
             
             # Update initialized sources
             self.initialized_sources.add(source.value)
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+from core.exceptions import RetrievalOverloadedError
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class MicroBatcher:
+    """Coalesce concurrent calls into batches.
+
+    Items submitted within ``window_ms`` of the first pending item, up to
+    ``max_batch`` of them, are handed to ``handler`` as one list. The
+    handler returns one result per item, which is delivered to the
+    coroutine that submitted it. With ``max_in_flight``, items beyond that
+    many waiting or running are rejected with ``RetrievalOverloadedError``,
+    so backpressure counts items rather than batches.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int = 16,
+        window_ms: float = 5.0,
+        max_in_flight: Optional[int] = None
+    ):
+        self.handler = handler
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000
+        self.max_in_flight = max_in_flight
+        # Submitted items still waiting for their result
+        self._in_flight = 0
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Keep running batches referenced until they finish
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result."""
+        if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+            logger.warning(f"Batch queue is full ({self._in_flight} items in flight)")
+            raise RetrievalOverloadedError("Server is busy, please retry shortly")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        # Only the event loop touches the counter, so it needs no lock
+        self._in_flight += 1
+        try:
+            return await future
+        finally:
+            self._in_flight -= 1
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Callers that gave up while waiting are dropped from the batch
+        batch = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Error running batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from core.exceptions import RetrievalOverloadedError
+from core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class BoundedExecutor:
+    """Run blocking calls on a dedicated thread pool with backpressure.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue``
+    more wait for a thread. Calls beyond that are rejected with
+    ``RetrievalOverloadedError`` instead of piling up behind the pool.
+    Any object with an ``Executor``-style ``submit`` can replace the
+    default thread pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        name: str = "executor",
+        executor: Optional[Executor] = None
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        # Running plus queued calls, released when the call itself finishes
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run ``func`` on the pool without blocking the event loop."""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                logger.warning(f"{self.name} queue is full ({self._in_flight} calls in flight)")
+                raise RetrievalOverloadedError("Server is busy, please retry shortly")
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -1,34 +1,81 @@
-from typing import Dict, Any, Union
+from typing import Dict, List, Optional
+from core.config import get_settings
 from core.logger import setup_logger
+from utils.batch_scheduler import MicroBatcher
+from utils.bounded_executor import BoundedExecutor
+from utils import worker_pool
+from utils.worker_pool import WorkerPool
 from retrieval_service.app.core.enums import DocSource
 from retrieval_service.app.retrieval.base import RetrievalPipeline
 
 logger = setup_logger(__name__)
 
 class PipelineManager:
+    """Per-source pipelines backed by a shared, memory-bounded registry.
+
+    Pipelines are lightweight; source data is loaded lazily by the
+    ``SourceRegistry`` and may be evicted and reloaded under memory pressure.
+    Concurrent searches of a source are coalesced into micro-batches, which
+    run on a bounded thread pool so they never block the event loop, or on
+    a pool of worker processes once ``start_workers`` was called with
+    ``RETRIEVAL_PROCESSES`` set.
+    """
     _instance = None
-    _pipelines: Dict[str, Any] = {}
+    _pipelines: Dict[str, RetrievalPipeline] = {}
+    _batchers: Dict[str, MicroBatcher] = {}
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(PipelineManager, cls).__new__(cls)
             cls._instance.logger = setup_logger(__name__)
+            settings = get_settings()
+            cls._instance.executor = BoundedExecutor(
+                settings.RETRIEVAL_WORKERS,
+                settings.RETRIEVAL_QUEUE_SIZE,
+                name="retrieval"
+            )
+            cls._instance.worker_pool = None
         return cls._instance
 
+    async def start_workers(self):
+        """Start retrieval worker processes for the initialized sources, if configured"""
+        settings = get_settings()
+        if settings.RETRIEVAL_PROCESSES <= 0:
+            return
+        
+        previous = self.executor if self.worker_pool is not None else None
+        self.worker_pool = WorkerPool(settings.RETRIEVAL_PROCESSES, list(self._pipelines))
+        self.executor = BoundedExecutor(
+            settings.RETRIEVAL_PROCESSES,
+            settings.RETRIEVAL_QUEUE_SIZE,
+            name="retrieval",
+            executor=self.worker_pool
+        )
+        
+        # Old workers finish their queued searches in the background
+        if previous is not None:
+            previous.shutdown()
+
+    async def refresh_source(self, source: str):
+        """Make workers pick up a rebuilt source"""
+        if self.worker_pool is not None:
+            self.logger.info(f"Restarting retrieval workers to reload {source}")
+            await self.start_workers()
+
     async def initialize_pipeline(self, source: str):
         """Initialize pipeline for a specific doc source if not already initialized"""
         try:
             doc_source = DocSource[source.upper()]
             if source not in self._pipelines:
-                pipeline = RetrievalPipeline()
-                pipeline.load_source(doc_source)
+                pipeline = RetrievalPipeline(doc_source)
+                pipeline.load_source(doc_source, lazy=True)
                 self._pipelines[source] = pipeline
                 self.logger.info(f"Successfully initialized pipeline for {source}")
         except Exception as e:
             self.logger.error(f"Error initializing pipeline for {source}: {e}")
             raise
 
-    async def get_pipeline(self, source: str) -> Any:
+    async def get_pipeline(self, source: str) -> RetrievalPipeline:
         """Get pipeline for a specific doc source"""
         if source not in self._pipelines:
             await self.initialize_pipeline(source)
@@ -38,7 +85,56 @@ class PipelineManager:
         """Search documents using the appropriate pipeline"""
         try:
             pipeline = await self.get_pipeline(source)
-            return pipeline.search_documents(query)
+            
+            settings = get_settings()
+            if settings.RETRIEVAL_MAX_BATCH <= 1:
+                if self.worker_pool is not None:
+                    return await self.executor.run(worker_pool.search_documents, source, query)
+                return await self.executor.run(pipeline.search_documents, query)
+            
+            if source not in self._batchers:
+                self._batchers[source] = MicroBatcher(
+                    lambda queries: self._search_batch(source, pipeline, queries),
+                    max_batch=settings.RETRIEVAL_MAX_BATCH,
+                    window_ms=settings.RETRIEVAL_BATCH_WINDOW_MS,
+                    # The executor bounds batches; queries get the same limit as unbatched ones
+                    max_in_flight=self.executor.max_workers + self.executor.max_queue
+                )
+            return await self._batchers[source].submit(query)
         except Exception as e:
             self.logger.error(f"Error searching documents: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def _search_batch(
+        self,
+        source: str,
+        pipeline: RetrievalPipeline,
+        queries: List[str]
+    ) -> List[Dict]:
+        """Run one coalesced batch of queries through the pipeline"""
+        if len(queries) > 1:
+            self.logger.debug(f"Searching batch of {len(queries)} queries")
+        if self.worker_pool is not None:
+            return await self.executor.run(worker_pool.search_documents_batch, source, queries)
+        return await self.executor.run(pipeline.search_documents_batch, queries)
+
+    async def get_cached_answer(
+        self,
+        source: str,
+        cache_id: Optional[int],
+        model: str
+    ) -> Optional[str]:
+        """Get a cached answer for a semantically cached search result"""
+        pipeline = await self.get_pipeline(source)
+        return pipeline.get_cached_answer(cache_id, model)
+
+    async def cache_answer(
+        self,
+        source: str,
+        cache_id: Optional[int],
+        model: str,
+        answer: str
+    ) -> None:
+        """Cache a generated answer with its search result"""
+        pipeline = await self.get_pipeline(source)
+        pipeline.cache_answer(cache_id, model, answer)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import multiprocessing
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, List
+from core.logger import setup_logger
+from retrieval_service.app.core.enums import DocSource
+from retrieval_service.app.retrieval.base import RetrievalPipeline
+from retrieval_service.app.storage import DataManager
+
+logger = setup_logger(__name__)
+
+# Pipelines of the current worker process
+_pipelines: Dict[str, RetrievalPipeline] = {}
+
+class WorkerPool(Executor):
+    """Pre-started retrieval worker processes.
+
+    Each worker loads the models once and opens every source's index
+    files memory-mapped, so index and chunk data are shared through the
+    page cache instead of being copied per process. Calls are sent over
+    the pool's pipes and only queries and formatted results are pickled.
+    Versions committed or rolled back by another process are picked up by
+    each worker's source registry on its next query.
+    """
+
+    def __init__(self, processes: int, sources: List[str]):
+        self.processes = processes
+        # Convert legacy data once here rather than in every starting worker
+        data_manager = DataManager()
+        for source in sources:
+            data_manager.upgrade(DocSource[source.upper()])
+
+        # Spawned workers do not inherit the server's threads or ONNX sessions
+        context = multiprocessing.get_context("spawn")
+        self._pool = context.Pool(processes, initializer=init_worker, initargs=(sources,))
+        logger.info(f"Started {processes} retrieval worker processes")
+
+    def submit(self, func: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Run a picklable function in a worker."""
+        future: Future = Future()
+        # Calls cannot be taken back from the pool once queued
+        future.set_running_or_notify_cancel()
+        self._pool.apply_async(
+            func,
+            args,
+            kwargs,
+            callback=future.set_result,
+            error_callback=future.set_exception
+        )
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """Let workers finish their queued calls, then exit."""
+        if cancel_futures:
+            self._pool.terminate()
+        else:
+            self._pool.close()
+        if wait:
+            self._pool.join()
+
+def init_worker(sources: List[str]) -> None:
+    """Load every source with data on disk into this worker."""
+    data_manager = DataManager()
+    for source in sources:
+        try:
+            doc_source = DocSource[source.upper()]
+            pipeline = RetrievalPipeline(doc_source)
+            if data_manager.check_data_exists(doc_source):
+                pipeline.registry.get(doc_source)
+            _pipelines[source] = pipeline
+        except Exception as e:
+            logger.error(f"Worker failed to load {source}: {e}")
+
+def _get_pipeline(source: str) -> RetrievalPipeline:
+    if source not in _pipelines:
+        _pipelines[source] = RetrievalPipeline(DocSource[source.upper()])
+    return _pipelines[source]
+
+def _detach(result: Dict) -> Dict:
+    # Semantic cache entries live in the worker, so their ids mean nothing to the caller
+    result = dict(result)
+    result.pop("cache_id", None)
+    return result
+
+def search_documents(source: str, query: str) -> Dict:
+    return _detach(_get_pipeline(source).search_documents(query))
+
+def search_documents_batch(source: str, queries: List[str]) -> List[Dict]:
+    return [_detach(result) for result in _get_pipeline(source).search_documents_batch(queries)]